@@ -33,93 +33,101 @@ void loop() {
         String command = Serial.readStringUntil('\n'); // Read command
         command.trim(); // Remove whitespace
 
+        // Optional "#<seq>" suffix from the host's command channel, echoed back in the ACK
+        String seq = "";
+        int seqIndex = command.indexOf('#');
+        if (seqIndex >= 0) {
+            seq = command.substring(seqIndex);
+            command = command.substring(0, seqIndex);
+        }
+
         // Process commands for Joint 3
         if (command == "J3_FWD") {
             joint3.setVelocity(MOTOR_SPEED);
-            Serial.println("ACK_J3_FWD");
+            Serial.println(String("ACK_J3_FWD") + seq);
         } else if (command == "J3_REV") {
             joint3.setVelocity(-MOTOR_SPEED);
-            Serial.println("ACK_J3_REV");
+            Serial.println(String("ACK_J3_REV") + seq);
         } else if (command == "J3_STOP") {
             joint3.setVelocity(0);
-            Serial.println("ACK_J3_STOP");
+            Serial.println(String("ACK_J3_STOP") + seq);
         }
 
         // Process commands for Joint 1
         else if (command == "J1_FWD") {
             joint1.setVelocity(MOTOR_SPEED);
-            Serial.println("ACK_J1_FWD");
+            Serial.println(String("ACK_J1_FWD") + seq);
         } else if (command == "J1_REV") {
             joint1.setVelocity(-MOTOR_SPEED);
-            Serial.println("ACK_J1_REV");
+            Serial.println(String("ACK_J1_REV") + seq);
         } else if (command == "J1_STOP") {
             joint1.setVelocity(0);
-            Serial.println("ACK_J1_STOP");
+            Serial.println(String("ACK_J1_STOP") + seq);
         }
 
         // Process commands for Joint 2
         else if (command == "J2_FWD") {
             joint2.setVelocity(MOTOR_SPEED);
-            Serial.println("ACK_J2_FWD");
+            Serial.println(String("ACK_J2_FWD") + seq);
         } else if (command == "J2_REV") {
             joint2.setVelocity(-MOTOR_SPEED);
-            Serial.println("ACK_J2_REV");
+            Serial.println(String("ACK_J2_REV") + seq);
         } else if (command == "J2_STOP") {
             joint2.setVelocity(0);
-            Serial.println("ACK_J2_STOP");
+            Serial.println(String("ACK_J2_STOP") + seq);
         }
 
         // Process commands for Joint 4
         else if (command == "J4_FWD") {
             joint4.setVelocity(MOTOR_SPEED);
-            Serial.println("ACK_J4_FWD");
+            Serial.println(String("ACK_J4_FWD") + seq);
         } else if (command == "J4_REV") {
             joint4.setVelocity(-MOTOR_SPEED);
-            Serial.println("ACK_J4_REV");
+            Serial.println(String("ACK_J4_REV") + seq);
         } else if (command == "J4_STOP") {
             joint4.setVelocity(0);
-            Serial.println("ACK_J4_STOP");
+            Serial.println(String("ACK_J4_STOP") + seq);
         }
 
         // Process commands for Joint 5
         else if (command == "J5_FWD") {
             joint5.setVelocity(MOTOR_SPEED);
-            Serial.println("ACK_J5_FWD");
+            Serial.println(String("ACK_J5_FWD") + seq);
         } else if (command == "J5_REV") {
             joint5.setVelocity(-MOTOR_SPEED);
-            Serial.println("ACK_J5_REV");
+            Serial.println(String("ACK_J5_REV") + seq);
         } else if (command == "J5_STOP") {
             joint5.setVelocity(0);
-            Serial.println("ACK_J5_STOP");
+            Serial.println(String("ACK_J5_STOP") + seq);
         }
 
         // Process commands for Joint 6
         else if (command == "J6_FWD") {
             joint6.setVelocity(MOTOR_SPEED);
-            Serial.println("ACK_J6_FWD");
+            Serial.println(String("ACK_J6_FWD") + seq);
         } else if (command == "J6_REV") {
             joint6.setVelocity(-MOTOR_SPEED);
-            Serial.println("ACK_J6_REV");
+            Serial.println(String("ACK_J6_REV") + seq);
         } else if (command == "J6_STOP") {
             joint6.setVelocity(0);
-            Serial.println("ACK_J6_STOP");
+            Serial.println(String("ACK_J6_STOP") + seq);
         }
 
         // Process commands for Joint 7
         else if (command == "J7_FWD") {
             joint7.setVelocity(MOTOR_SPEED);
-            Serial.println("ACK_J7_FWD");
+            Serial.println(String("ACK_J7_FWD") + seq);
         } else if (command == "J7_REV") {
             joint7.setVelocity(-MOTOR_SPEED);
-            Serial.println("ACK_J7_REV");
+            Serial.println(String("ACK_J7_REV") + seq);
         } else if (command == "J7_STOP") {
             joint7.setVelocity(0);
-            Serial.println("ACK_J7_STOP");
+            Serial.println(String("ACK_J7_STOP") + seq);
         }
 
         // Handle unknown command
         else {
-            Serial.println("ERR_UNKNOWN_CMD");
+            Serial.println(String("ERR_UNKNOWN_CMD") + seq);
         }
     }
 }
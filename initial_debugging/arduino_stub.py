@@ -0,0 +1,96 @@
+import os
+import random
+import select
+import threading
+import time
+import tty
+
+
+JOINT_COMMANDS = {f"J{joint}_{action}" for joint in range(1, 8) for action in ("FWD", "REV", "STOP")}
+
+
+class ArduinoStub:
+    """
+    Pseudo-terminal stand-in for joystick_velo_control.ino, for testing without hardware.
+
+    Point a script at `port` instead of the Arduino's COM port. Commands are acknowledged
+    after `ack_delay` seconds, and a fraction `loss` of them is silently dropped to exercise
+    retransmits. POSIX only (needs os.openpty).
+    """
+
+    def __init__(self, ack_delay=0.002, loss=0.0, seed=None):
+        self.ack_delay = ack_delay
+        self.loss = loss
+        self.random = random.Random(seed)
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.received = []
+        self.dropped = 0
+        self.on_line = None  # Optional callback(line, timestamp) for benchmarks
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return self.port
+
+    def close(self):
+        """
+        Stop the serving thread and close both ends of the pseudo-terminal.
+        """
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        for fd in (self.slave, self.master):
+            os.close(fd)
+        self.slave = self.master = None
+
+    def _serve(self):
+        buffer = b''
+        while self._running:
+            readable, _, _ = select.select([self.master], [], [], 0.1)
+            if not readable:
+                continue
+            try:
+                buffer += os.read(self.master, 4096)
+            except OSError:
+                return
+            *lines, buffer = buffer.split(b'\n')
+            for raw in lines:
+                self._handle(raw.decode(errors='replace').strip())
+
+    def _handle(self, line):
+        if not line:
+            return
+        if self.on_line is not None:
+            self.on_line(line, time.monotonic())
+        command, hash_sign, seq = line.partition('#')
+        self.received.append(line)
+        if self.random.random() < self.loss:
+            self.dropped += 1
+            return
+        if self.ack_delay:
+            time.sleep(self.ack_delay)
+        reply = f"ACK_{command}" if command in JOINT_COMMANDS else "ERR_UNKNOWN_CMD"
+        os.write(self.master, f"{reply}{hash_sign}{seq}\r\n".encode())
+
+
+def main():
+    stub = ArduinoStub(loss=0.05)
+    print(f"Arduino stand-in listening on {stub.start()} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1.0)
+            print(f"Received {len(stub.received)} commands, dropped {stub.dropped}")
+    except KeyboardInterrupt:
+        print("Exiting...")
+    finally:
+        stub.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+
+import serial
+
+import robstride_codec as codec
+from gamepad_input import AXIS, BUTTON, Gamepad
+from robstride_shadow import ParameterShadow
+from robstride_transport import Transport
+
+
+# Per-joint jog configuration. An input is either an axis (optionally with a reverse axis,
+# as for the L2/R2 pair) or a pair of buttons. Axis values go through AxisCurve, so
+# "deadzone", "expo", "trigger" and "invert" shape the response; max_speed is in rad/s.
+JOG_CONFIG = {
+    "J1": {"motor": 21, "axis": 5, "reverse_axis": 4, "trigger": True, "max_speed": 2.0, "expo": 0.5},
+    "J2": {"motor": 22, "axis": 1, "invert": True, "max_speed": 2.0, "expo": 0.5},
+    "J3": {"motor": 23, "axis": 3, "invert": True, "max_speed": 2.0, "expo": 0.5},
+    "J4": {"motor": 24, "axis": 0, "max_speed": 2.0, "expo": 0.5},
+    "J5": {"motor": 25, "axis": 2, "max_speed": 2.0, "expo": 0.5},
+    "J6": {"motor": 26, "button": 6, "reverse_button": 7, "max_speed": 1.0},
+    "J7": {"motor": 127, "button": 0, "reverse_button": 1, "max_speed": 1.0},
+}
+VELOCITY_QUANTUM = 0.02  # rad/s; smaller changes are not sent
+MAX_UPDATE_RATE = 50.0  # Hz, per joint
+MAX_ACC = codec.DEFAULT_MAX_ACC
+MAX_CURRENT = codec.DEFAULT_MAX_CURRENT
+
+
+class AxisCurve:
+    """
+    Maps an axis value to a velocity: deadzone, then a blend of linear and cubic (expo) response.
+
+    Triggers rest at -1, so with trigger=True the range [-1, 1] is first mapped onto [0, 1].
+    """
+
+    def __init__(self, max_speed, deadzone=0.1, expo=0.0, trigger=False, invert=False):
+        self.max_speed = max_speed
+        self.deadzone = deadzone
+        self.expo = expo
+        self.trigger = trigger
+        self.invert = invert
+
+    def __call__(self, value):
+        if self.trigger:
+            value = (value + 1.0) / 2.0
+        if self.invert:
+            value = -value
+        magnitude = abs(value)
+        if magnitude <= self.deadzone:
+            return 0.0
+        u = min(1.0, (magnitude - self.deadzone) / (1.0 - self.deadzone))
+        shaped = (1.0 - self.expo) * u + self.expo * u ** 3
+        return math.copysign(shaped * self.max_speed, value)
+
+
+class JointJog:
+    """
+    Velocity command for one joint, quantized and rate-limited before it goes to the motor.
+    """
+
+    def __init__(self, name, config, quantum, max_rate):
+        self.name = name
+        self.motor_id = config["motor"]
+        self.max_speed = config["max_speed"]
+        self.quantum = quantum
+        self.min_interval = 1.0 / max_rate
+        if "axis" in config:
+            self.kind = AXIS
+            self.controls = [config["axis"]] + ([config["reverse_axis"]] if "reverse_axis" in config else [])
+            self.curve = AxisCurve(config["max_speed"], config.get("deadzone", 0.1), config.get("expo", 0.0),
+                                   config.get("trigger", False), config.get("invert", False))
+        else:
+            self.kind = BUTTON
+            self.controls = [config["button"], config["reverse_button"]]
+            self.curve = None
+        # Triggers report a bogus resting value until they are first moved, so they only count
+        # once an event has been seen for them
+        self.live = set() if config.get("trigger") else set(self.controls)
+        self.sent = 0.0  # Last velocity written, None while a failed write waits to be resent
+        self.pending = None
+        self.last_send = -math.inf
+        self.flush_handle = None
+        self.updates = 0
+        self.unchanged = 0
+        self.deferred = 0
+
+    def velocity(self, gamepad):
+        values = []
+        for control in self.controls:
+            if control not in self.live:
+                values.append(0.0)
+            elif self.kind == AXIS:
+                values.append(self.curve(gamepad.get_axis(control)))
+            else:
+                values.append(self.max_speed if gamepad.get_button(control) else 0.0)
+        velocity = values[0] - (values[1] if len(values) > 1 else 0.0)
+        return round(velocity / self.quantum) * self.quantum
+
+
+class ArmJogger:
+    """
+    Turns controller changes into SPEED_TARGET writes, one joint at a time.
+
+    A write is sent only when a joint's quantized velocity changes, and at most once per
+    min_interval per joint; a change inside the interval is held back and the newest value
+    is sent when the interval ends. Writes do not wait for each other; one that fails or times
+    out is sent again, so a lost stop cannot leave a joint running.
+    """
+
+    def __init__(self, transport, gamepad, config=JOG_CONFIG, quantum=VELOCITY_QUANTUM,
+                 max_rate=MAX_UPDATE_RATE):
+        self.transport = transport
+        self.gamepad = gamepad
+        self.joints = [JointJog(name, joint_config, quantum, max_rate) for name, joint_config in config.items()]
+        self.loop = None
+        self.stopped = False
+        self.write_errors = 0
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        # Speed mode at zero velocity, same sequence as Motor::setVelocity
+        await asyncio.gather(*(self.transport.motor(joint.motor_id).set_velocity(0.0, MAX_ACC, MAX_CURRENT)
+                               for joint in self.joints))
+        for joint in self.joints:
+            # Subscriber runs on the gamepad thread; the update runs on the event loop
+            self.gamepad.subscribe(
+                lambda event, joint=joint: self.loop.call_soon_threadsafe(self.on_change, joint, event),
+                joint.kind, joint.controls)
+
+    def on_change(self, joint, event):
+        joint.live.add(event.control)
+        velocity = joint.velocity(self.gamepad)
+        if velocity == (joint.pending if joint.pending is not None else joint.sent):
+            joint.unchanged += 1
+            return
+        joint.pending = velocity
+        if joint.flush_handle is not None:
+            return
+        wait = joint.last_send + joint.min_interval - time.monotonic()
+        if wait > 0:
+            joint.deferred += 1
+            joint.flush_handle = self.loop.call_later(wait, self.flush, joint)
+        else:
+            self.flush(joint)
+
+    def flush(self, joint):
+        joint.flush_handle = None
+        velocity, joint.pending = joint.pending, None
+        if self.stopped or velocity is None or velocity == joint.sent:
+            return
+        joint.sent = velocity
+        joint.last_send = time.monotonic()
+        joint.updates += 1
+        task = asyncio.ensure_future(self.transport.motor(joint.motor_id).write(codec.SPEED_TARGET, velocity))
+        task.add_done_callback(lambda task: self._check_write(task, joint, velocity))
+
+    def _check_write(self, task, joint, velocity):
+        if not task.cancelled() and task.exception() is None:
+            return
+        self.write_errors += 1
+        if self.stopped or joint.sent != velocity:
+            return  # A newer velocity was sent meanwhile
+        # The motor may still run at the previous speed: send the value again, unless a newer
+        # one is already waiting
+        joint.sent = None
+        if joint.pending is None:
+            joint.pending = velocity
+        if joint.flush_handle is None:
+            wait = max(0.0, joint.last_send + joint.min_interval - time.monotonic())
+            joint.flush_handle = self.loop.call_later(wait, self.flush, joint)
+
+    async def stop(self):
+        self.stopped = True
+        for joint in self.joints:
+            if joint.flush_handle is not None:
+                joint.flush_handle.cancel()
+        await asyncio.gather(*(self.transport.motor(joint.motor_id).write(codec.SPEED_TARGET, 0.0, force=True)
+                               for joint in self.joints), return_exceptions=True)
+
+
+async def jog(port, baud_rate, gamepad, config):
+    async with Transport.open(port, baud_rate, shadow=ParameterShadow()) as transport:
+        print(f"Opened {port} at {baud_rate} baud rate.")
+        jogger = ArmJogger(transport, gamepad, config)
+        await jogger.start()
+        print(f"Jogging {', '.join(joint.name for joint in jogger.joints)} from {gamepad.name}")
+
+        running = True
+
+        def read_gamepad():
+            while running:
+                gamepad.wait(0.1)
+
+        reader = threading.Thread(target=read_gamepad, daemon=True)
+        reader.start()
+        try:
+            while True:
+                await asyncio.sleep(1.0)
+                print(", ".join(f"{joint.name} {joint.sent:+.2f}" if joint.sent is not None else f"{joint.name} ?"
+                                for joint in jogger.joints)
+                      + f" rad/s, writes {transport.frames_sent}, errors {jogger.write_errors}")
+        finally:
+            running = False
+            await jogger.stop()
+            for joint in jogger.joints:
+                print(f"{joint.name}: {joint.updates} updates, {joint.unchanged} unchanged, "
+                      f"{joint.deferred} deferred by the rate cap")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Proportional velocity jogging of the arm from a gamepad")
+    parser.add_argument('--config', help="JSON file with per-joint settings in the JOG_CONFIG format")
+    parser.add_argument('--backend', choices=['evdev', 'pygame'], help="input backend (default: evdev if installed)")
+    args = parser.parse_args()
+
+    config = JOG_CONFIG
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+
+    port = os.environ.get("ROBSTRIDE_PORT", "COM7")
+    baud_rate = 921600
+
+    try:
+        gamepad = Gamepad.open(args.backend)
+    except RuntimeError as error:
+        print(error)
+        return
+    try:
+        asyncio.run(jog(port, baud_rate, gamepad, config))
+    except serial.SerialException as e:
+        print(f"Serial error: {e}")
+    except KeyboardInterrupt:
+        print("Exiting...")
+    finally:
+        gamepad.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import struct
+import timeit
+
+import robstride_codec as codec
+
+
+# Legacy string-based encoder, copied from pos_control.py before the shared codec existed
+def legacy_float_to_ieee754_hex(value):
+    ieee754 = struct.pack('<f', value)
+    return ''.join(f'{byte:02x}' for byte in ieee754[::-1])
+
+
+def legacy_build_extended_header(comm_type, host_can_id, motor_can_id):
+    binary = f'{comm_type:08b}{0:08b}{host_can_id:08b}{motor_can_id:08b}'
+    binary = binary + '100'
+    binary = binary[3:]
+    hex_value = f'{int(binary, 2):08x}'
+    return [int(hex_value[i:i+2], 16) for i in range(0, len(hex_value), 2)]
+
+
+def legacy_build_command(comm_type, param_index, value=None, motor_can_id=127):
+    header = [0x41, 0x54]
+    tail = [0x0D, 0x0A]
+    extended_header = legacy_build_extended_header(comm_type, 253, motor_can_id)
+    data_length = [0x08]
+    if comm_type == 18:
+        param_index_bytes = [int(param_index[:2], 16), int(param_index[2:], 16)]
+        ieee_value = legacy_float_to_ieee754_hex(value)
+        value_bytes = [int(ieee_value[i:i+2], 16) for i in range(0, len(ieee_value), 2)]
+        data_area = param_index_bytes + [0x00, 0x00] + value_bytes[::-1]
+    elif comm_type == 17:
+        param_index_bytes = [int(param_index[:2], 16), int(param_index[2:], 16)]
+        data_area = param_index_bytes + [0x00] * 6
+    else:
+        data_area = [0x00] * 8
+    return header + extended_header + data_length + data_area + tail
+
+
+MOTOR_IDS = [21, 22, 23, 24, 25, 26, 127]
+
+
+def check_equivalence():
+    """
+    Make sure both encoders produce identical bytes before timing them.
+    """
+    encoder = codec.FrameEncoder()
+    for motor_id in MOTOR_IDS:
+        legacy = bytes(legacy_build_command(18, '1670', 1.25, motor_id))
+        assert legacy == bytes(encoder.write(motor_id, codec.POSITION_TARGET, 1.25))
+        assert bytes(legacy_build_command(17, '1970', motor_can_id=motor_id)) == encoder.read(motor_id, codec.MECH_POS)
+        assert bytes(legacy_build_command(3, None, motor_can_id=motor_id)) == encoder.enable(motor_id)
+
+
+def bench(label, func, frames_per_call, number=20000):
+    seconds = min(timeit.repeat(func, number=number, repeat=5))
+    rate = frames_per_call * number / seconds
+    print(f"{label:<40} {rate:>14,.0f} frames/s")
+    return rate
+
+
+def main():
+    check_equivalence()
+    encoder = codec.FrameEncoder()
+    frames = len(MOTOR_IDS)
+
+    def legacy_write():
+        for motor_id in MOTOR_IDS:
+            bytes(legacy_build_command(18, '1670', 0.5, motor_id))
+
+    def codec_write():
+        for motor_id in MOTOR_IDS:
+            encoder.write(motor_id, codec.POSITION_TARGET, 0.5)
+
+    def legacy_read():
+        for motor_id in MOTOR_IDS:
+            bytes(legacy_build_command(17, '1970', motor_can_id=motor_id))
+
+    def codec_read():
+        for motor_id in MOTOR_IDS:
+            encoder.read(motor_id, codec.MECH_POS)
+
+    batch = bytearray(codec.FRAME_LENGTH * frames)
+
+    def codec_batched_write():
+        offset = 0
+        for motor_id in MOTOR_IDS:
+            codec.pack_write_into(batch, offset, motor_id, codec.POSITION_TARGET, 0.5)
+            offset += codec.FRAME_LENGTH
+
+    legacy = bench("legacy build_command (type 18 write)", legacy_write, frames)
+    fast = bench("FrameEncoder.write (type 18)", codec_write, frames)
+    bench("pack_write_into batch of 7 (type 18)", codec_batched_write, frames)
+    print(f"write speedup: {fast / legacy:.1f}x")
+
+    legacy = bench("legacy build_command (type 17 read)", legacy_read, frames)
+    fast = bench("FrameEncoder.read (type 17)", codec_read, frames)
+    print(f"read speedup: {fast / legacy:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
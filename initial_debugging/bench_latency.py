@@ -0,0 +1,227 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+
+import serial
+
+import robstride_codec as codec
+from arduino_stub import ArduinoStub
+from joint_channel import CommandChannel
+from robstride_parser import decode_value
+from robstride_scheduler import summarize
+from robstride_sim import VirtualBus
+from robstride_transport import Transport
+
+# The joystick node's angle mapping, so the benchmark runs the node's own code. Its module has
+# no ROS imports; the source tree is used when the workspace is not sourced.
+try:
+    from motor_position_control.joystick_mapping import compute_target_angle
+except ImportError:
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ros2_ws', 'src',
+                                 'motor_position_control'))
+    from motor_position_control.joystick_mapping import compute_target_angle
+
+
+class FakeJoystick:
+    """
+    Stands in for pygame.joystick.Joystick so synthetic input can be injected.
+    """
+
+    def __init__(self):
+        self.buttons = {}
+        self.axes = {4: -1.0, 5: -1.0}  # L2/R2 rest at -1
+        self.hat = (0, 0)
+
+    def get_button(self, button):
+        return self.buttons.get(button, 0)
+
+    def get_axis(self, axis):
+        return self.axes.get(axis, 0.0)
+
+    def get_hat(self, hat):
+        return self.hat
+
+
+def report(scenario, stages, samples, duration, missing=0):
+    """
+    Build the machine-readable result: per-stage and end-to-end p50/p99/max in ms plus throughput.
+    missing counts samples left out because a stage's timestamp was never observed.
+    """
+    result = {
+        'scenario': scenario,
+        'samples': len(samples),
+        'missing': missing,
+        'duration_s': duration,
+        'throughput_hz': len(samples) / duration if duration > 0 else 0.0,
+        'stages_ms': {},
+    }
+    for previous, stage in zip(stages, stages[1:]):
+        deltas = [sample[stage] - sample[previous] for sample in samples]
+        result['stages_ms'][f"{previous}->{stage}"] = summarize(deltas)
+    result['end_to_end_ms'] = summarize([sample[stages[-1]] - sample[stages[0]] for sample in samples])
+    return result
+
+
+def bench_arm(count, spacing):
+    """
+    Synthetic button press -> read_joint_commands -> CommandChannel -> pty Arduino stand-in -> ACK.
+    The write stage is when the stand-in receives the line, i.e. the bytes are on the wire.
+    """
+    # Keep pygame's banner out of the JSON on stdout
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+    from arm_joint_joystick import J3_FWD_BUTTON, read_joint_commands
+
+    stub = ArduinoStub(ack_delay=0.0)
+    wire_times = {}
+    stub.on_line = lambda line, timestamp: wire_times.setdefault(line, timestamp)
+    ser = serial.Serial(stub.start(), 115200, timeout=0)
+    channel = CommandChannel(ser, window=1)
+    joystick = FakeJoystick()
+    last_sent = {}
+    samples = []
+    missing = 0
+
+    started = time.monotonic()
+    for i in range(count):
+        sample = {'input': time.monotonic()}
+        joystick.buttons[J3_FWD_BUTTON] = i % 2 == 0
+        commands = read_joint_commands(joystick)
+        sample['mapping'] = time.monotonic()
+        for joint, command in commands:
+            if command != last_sent.get(joint):
+                line = f"{command}#{channel.next_seq}"
+                channel.send(command, key=joint)
+                last_sent[joint] = command
+        while not channel.idle():
+            channel.poll()
+        sample['decode'] = time.monotonic()
+        write = wire_times.pop(line, None)
+        if not i:
+            pass  # The first pass sends all seven joints; keep only single-command samples
+        elif write is None:
+            # The stand-in never saw the line; a made-up time would add a zero-latency stage
+            missing += 1
+        else:
+            sample['write'] = write
+            samples.append(sample)
+        time.sleep(spacing)
+    duration = time.monotonic() - started
+    ser.close()
+    stub.close()
+    return report('arm_joint_joystick', ['input', 'mapping', 'write', 'decode'], samples, duration, missing)
+
+
+async def _bench_adapter(count, spacing):
+    bus = VirtualBus(motor_ids=[127], latency=0.0)
+    wire_times = {}
+    bus.on_frame = lambda frame: wire_times.setdefault(frame.comm_type, frame.timestamp)
+    samples = []
+    async with Transport.open(bus.start()) as transport:
+        encoder = transport.encoder
+        started = time.monotonic()
+        for i in range(count):
+            wire_times.clear()
+            sample = {'input': time.monotonic()}
+            _, angle = compute_target_angle(math.cos(i * 0.1), math.sin(i * 0.1), 0.0, 0.1)
+            sample['mapping'] = time.monotonic()
+            requests = [
+                (bytes(encoder.write(127, codec.POSITION_TARGET, angle)), (codec.COMM_TYPE_FEEDBACK, 127, None)),
+                (encoder.read(127, codec.MECH_POS), (codec.COMM_TYPE_READ, 127, codec.MECH_POS.index)),
+            ]
+            sample['encode'] = time.monotonic()
+            futures = transport.request_many(requests, timeout=0.5)
+            reply = (await asyncio.gather(*futures))[-1]
+            decode_value(reply, codec.MECH_POS)
+            sample['decode'] = time.monotonic()
+            sample['write'] = wire_times[codec.COMM_TYPE_WRITE]
+            sample['reply'] = reply.timestamp
+            samples.append(sample)
+            await asyncio.sleep(spacing)
+        duration = time.monotonic() - started
+    bus.stop()
+    return report('adapter_position', ['input', 'mapping', 'encode', 'write', 'reply', 'decode'],
+                  samples, duration)
+
+
+def bench_adapter(count, spacing):
+    """
+    Synthetic stick angle -> POSITION_TARGET write + MECH_POS read -> virtual bus -> decoded reply.
+    The write stage is when the virtual bus receives the frame; reply is when the transport reads the answer.
+    """
+    return asyncio.run(_bench_adapter(count, spacing))
+
+
+def bench_ros(count, spacing):
+    """
+    Joy message -> JoystickPositionControl.joystick_callback -> control timer -> serial write
+    -> pty stand-in. Includes the wait for the node's next control tick.
+    Skipped when the ROS 2 workspace is not sourced.
+    """
+    try:
+        import rclpy
+        from motor_position_control.joystick_position_control import JoystickPositionControl
+        from sensor_msgs.msg import Joy
+    except ImportError:
+        return {'scenario': 'ros_joystick_position_control', 'skipped': 'rclpy or motor_position_control not found'}
+
+    stub = ArduinoStub(ack_delay=0.0)
+    wire_times = []
+    stub.on_line = lambda line, timestamp: wire_times.append(timestamp)
+    # Zero threshold so every distinct stick position is sent
+    rclpy.init(args=['--ros-args', '-p', f'serial_port:={stub.start()}', '-p', 'send_threshold:=0.0'])
+    node = JoystickPositionControl()
+    samples = []
+    missing = 0
+    try:
+        started = time.monotonic()
+        for i in range(count):
+            msg = Joy()
+            msg.axes = [math.cos(i * 0.1), math.sin(i * 0.1)]
+            expected = len(wire_times) + 1
+            sample = {'input': time.monotonic()}
+            node.joystick_callback(msg)
+            deadline = time.monotonic() + 0.5
+            while len(wire_times) < expected and time.monotonic() < deadline:
+                rclpy.spin_once(node, timeout_sec=0.001)
+            if len(wire_times) < expected:
+                missing += 1
+            else:
+                sample['write'] = wire_times[expected - 1]
+                samples.append(sample)
+            time.sleep(spacing)
+        duration = time.monotonic() - started
+    finally:
+        node.serial_port.close()
+        node.destroy_node()
+        rclpy.shutdown()
+        stub.close()
+    return report('ros_joystick_position_control', ['input', 'write'], samples, duration, missing)
+
+
+SCENARIOS = {'arm': bench_arm, 'adapter': bench_adapter, 'ros': bench_ros}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end latency benchmarks against loopback serial endpoints")
+    parser.add_argument('--samples', type=int, default=500)
+    parser.add_argument('--spacing', type=float, default=0.001, help="seconds between samples")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help="comma-separated subset of " + ','.join(SCENARIOS))
+    parser.add_argument('--output', help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    results = [SCENARIOS[name](args.samples, args.spacing) for name in args.scenarios.split(',')]
+    text = json.dumps({'timestamp': time.time(), 'python': sys.version.split()[0], 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import asyncio
+import os
+import time
+
+import serial
+
+import robstride_codec as codec
+from robstride_transport import OK, Transport
+
+
+async def snapshot(port, baud_rate, motor_can_ids):
+    async with Transport.open(port, baud_rate) as transport:
+        print(f"Opened {port} at {baud_rate} baud rate.")
+        entries = [(motor_id, param) for motor_id in motor_can_ids for param in codec.PARAMETERS.values()]
+        started = time.monotonic()
+        results = await transport.read_many(entries)
+        elapsed = time.monotonic() - started
+
+        names = [param.name for param in codec.PARAMETERS.values()]
+        print("motor  " + "  ".join(f"{name:>21}" for name in names))
+        for motor_id in motor_can_ids:
+            cells = []
+            for name in names:
+                result = results[(motor_id, name)]
+                cells.append(f"{result.value:>21.4f}" if result.status == OK else f"{result.status:>21}")
+            print(f"{motor_id:>5}  " + "  ".join(cells))
+
+        answered = sum(result.status == OK for result in results.values())
+        # Every read is a request and a reply of FRAME_LENGTH bytes each way on the serial link
+        wire_time = len(entries) * codec.FRAME_LENGTH * 10 / baud_rate
+        print(f"{answered}/{len(entries)} parameters in {elapsed * 1000:.1f} ms "
+              f"(serial wire time {wire_time * 1000:.1f} ms)")
+
+
+def main():
+    # Configuration
+    port = os.environ.get("ROBSTRIDE_PORT", "COM7")  # e.g. the pty printed by robstride_sim.py
+    baud_rate = 921600
+    motor_can_ids = codec.ARM_MOTOR_IDS
+
+    try:
+        asyncio.run(snapshot(port, baud_rate, motor_can_ids))
+    except serial.SerialException as e:
+        print(f"Serial error: {e}")
+    except KeyboardInterrupt:
+        print("Exiting...")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import os
+import time
+from collections import namedtuple
+
+
+BUTTON = 'button'
+AXIS = 'axis'
+HAT = 'hat'
+
+# One change of one control. timestamp is on the time.monotonic() clock: the kernel's event
+# time for the evdev backend, the time the event was dequeued for the pygame backend.
+InputEvent = namedtuple('InputEvent', ['kind', 'control', 'value', 'timestamp'])
+
+
+class PygameSource:
+    """
+    Blocks in pygame.event.wait for joystick events from the first (or `index`th) controller.
+    """
+
+    def __init__(self, index=0):
+        # Keep pygame's banner out of the output of scripts that import this module
+        os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+        import pygame
+        self.pygame = pygame
+        pygame.init()
+        pygame.joystick.init()
+        if pygame.joystick.get_count() <= index:
+            pygame.quit()
+            raise RuntimeError("No joystick detected. Please connect one and restart.")
+        self.joystick = pygame.joystick.Joystick(index)
+        self.joystick.init()
+        self.name = self.joystick.get_name()
+
+    def initial_state(self):
+        joystick = self.joystick
+        buttons = {button: joystick.get_button(button) for button in range(joystick.get_numbuttons())}
+        axes = {axis: joystick.get_axis(axis) for axis in range(joystick.get_numaxes())}
+        hats = {hat: joystick.get_hat(hat) for hat in range(joystick.get_numhats())}
+        return buttons, axes, hats
+
+    def read(self, timeout):
+        """
+        Wait up to timeout seconds (None waits forever) and return the pending events.
+        """
+        pygame = self.pygame
+        first = pygame.event.wait() if timeout is None else pygame.event.wait(int(timeout * 1000))
+        events = []
+        for event in [first] + pygame.event.get():
+            now = time.monotonic()
+            if event.type == pygame.JOYBUTTONDOWN:
+                events.append(InputEvent(BUTTON, event.button, 1, now))
+            elif event.type == pygame.JOYBUTTONUP:
+                events.append(InputEvent(BUTTON, event.button, 0, now))
+            elif event.type == pygame.JOYAXISMOTION:
+                events.append(InputEvent(AXIS, event.axis, event.value, now))
+            elif event.type == pygame.JOYHATMOTION:
+                events.append(InputEvent(HAT, event.hat, tuple(event.value), now))
+            elif event.type == pygame.QUIT:
+                raise KeyboardInterrupt
+        return events
+
+    def close(self):
+        self.pygame.quit()
+
+
+class EvdevSource:
+    """
+    Reads a Linux input device directly, with the kernel's event timestamps (needs python-evdev).
+
+    Buttons and axes are numbered in key/axis code order, which is how SDL numbers them on
+    Linux, so button and axis indices match the pygame backend for the same controller.
+    """
+
+    def __init__(self, path=None):
+        import evdev
+        from evdev import ecodes
+        self.ecodes = ecodes
+        if path is None:
+            path = self.find_gamepad(evdev)
+        self.device = evdev.InputDevice(path)
+        self.name = self.device.name
+        capabilities = self.device.capabilities()
+        self.button_index = {code: i for i, code in enumerate(
+            sorted(code for code in capabilities.get(ecodes.EV_KEY, []) if code >= ecodes.BTN_MISC))}
+        self.hat_codes = {ecodes.ABS_HAT0X: (0, 0), ecodes.ABS_HAT0Y: (0, 1)}
+        abs_codes = sorted(code for code, _ in capabilities.get(ecodes.EV_ABS, []))
+        self.axis_index = {code: i for i, code in enumerate(c for c in abs_codes if c not in self.hat_codes)}
+        self.axis_range = {}
+        for code in self.axis_index:
+            info = self.device.absinfo(code)
+            self.axis_range[code] = (info.min, max(1, info.max - info.min))
+        self.hat_values = {0: [0, 0]}
+
+    @staticmethod
+    def find_gamepad(evdev):
+        for path in evdev.list_devices():
+            device = evdev.InputDevice(path)
+            keys = device.capabilities().get(evdev.ecodes.EV_KEY, [])
+            if evdev.ecodes.BTN_GAMEPAD in keys or evdev.ecodes.BTN_JOYSTICK in keys:
+                return path
+        raise RuntimeError("No joystick detected. Please connect one and restart.")
+
+    def _axis_value(self, code, raw):
+        minimum, span = self.axis_range[code]
+        return 2.0 * (raw - minimum) / span - 1.0
+
+    def initial_state(self):
+        active = set(self.device.active_keys())
+        buttons = {index: int(code in active) for code, index in self.button_index.items()}
+        axes = {index: self._axis_value(code, self.device.absinfo(code).value)
+                for code, index in self.axis_index.items()}
+        for code, (hat, component) in self.hat_codes.items():
+            try:
+                self.hat_values[hat][component] = self.device.absinfo(code).value
+            except OSError:
+                pass
+        hats = {hat: (value[0], -value[1]) for hat, value in self.hat_values.items()}
+        return buttons, axes, hats
+
+    def read(self, timeout):
+        import select
+        readable, _, _ = select.select([self.device.fd], [], [], timeout)
+        if not readable:
+            return []
+        ecodes = self.ecodes
+        # Kernel timestamps are on the wall clock; move them onto the monotonic clock
+        offset = time.time() - time.monotonic()
+        events = []
+        for event in self.device.read():
+            timestamp = event.timestamp() - offset
+            if event.type == ecodes.EV_KEY and event.code in self.button_index:
+                if event.value in (0, 1):  # 2 is autorepeat
+                    events.append(InputEvent(BUTTON, self.button_index[event.code], event.value, timestamp))
+            elif event.type == ecodes.EV_ABS and event.code in self.axis_index:
+                events.append(InputEvent(AXIS, self.axis_index[event.code],
+                                         self._axis_value(event.code, event.value), timestamp))
+            elif event.type == ecodes.EV_ABS and event.code in self.hat_codes:
+                hat, component = self.hat_codes[event.code]
+                self.hat_values[hat][component] = event.value
+                x, y = self.hat_values[hat]
+                # evdev has down positive, SDL has up positive
+                events.append(InputEvent(HAT, hat, (x, -y), timestamp))
+        return events
+
+    def close(self):
+        self.device.close()
+
+
+class Gamepad:
+    """
+    Event-driven controller state shared by the joystick scripts.
+
+    wait() blocks until the controller reports something, so an idle loop costs no CPU. Each
+    change becomes an InputEvent that is applied to the cached state and passed to every
+    subscriber whose filter matches; axis changes smaller than axis_threshold are dropped.
+    get_button/get_axis/get_hat read the cached state, with the same signatures as
+    pygame.joystick.Joystick.
+    """
+
+    def __init__(self, source, axis_threshold=0.01):
+        self.source = source
+        self.name = source.name
+        self.axis_threshold = axis_threshold
+        self.buttons, self.axes, self.hats = source.initial_state()
+        self.subscribers = []
+        self.events = 0
+
+    @classmethod
+    def open(cls, backend=None, **kwargs):
+        """
+        Open the first controller; backend is 'evdev', 'pygame' or None for evdev when available.
+        """
+        if backend is None:
+            try:
+                import evdev  # noqa: F401
+                backend = 'evdev'
+            except ImportError:
+                backend = 'pygame'
+        source = EvdevSource() if backend == 'evdev' else PygameSource()
+        return cls(source, **kwargs)
+
+    def subscribe(self, callback, kind=None, controls=None):
+        """
+        Call callback(event) for changes of the given kind and control numbers (None means all).
+        """
+        self.subscribers.append((callback, kind, None if controls is None else set(controls)))
+
+    def get_button(self, button):
+        return self.buttons.get(button, 0)
+
+    def get_axis(self, axis):
+        return self.axes.get(axis, 0.0)
+
+    def get_hat(self, hat):
+        return self.hats.get(hat, (0, 0))
+
+    def wait(self, timeout=None):
+        """
+        Block for up to timeout seconds, dispatch the changes and return them.
+        """
+        changes = []
+        for event in self.source.read(timeout):
+            if event.kind == BUTTON:
+                state = self.buttons
+            elif event.kind == AXIS:
+                state = self.axes
+                # Small moves are dropped, but rest and end positions always get through
+                if (abs(event.value - state.get(event.control, 0.0)) < self.axis_threshold
+                        and event.value not in (-1.0, 0.0, 1.0)):
+                    continue
+            else:
+                state = self.hats
+            if state.get(event.control) == event.value:
+                continue
+            state[event.control] = event.value
+            changes.append(event)
+            for callback, kind, controls in self.subscribers:
+                if (kind is None or kind == event.kind) and (controls is None or event.control in controls):
+                    callback(event)
+        self.events += len(changes)
+        return changes
+
+    def close(self):
+        self.source.close()
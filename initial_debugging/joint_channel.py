@@ -0,0 +1,134 @@
+import time
+from collections import OrderedDict
+
+
+SEQ_MODULO = 1 << 16
+
+
+class CommandChannel:
+    """
+    Windowed, sequence-numbered line protocol for joystick_velo_control.ino.
+
+    Each command goes out as "<command>#<seq>\\n" and the sketch answers "ACK_<command>#<seq>",
+    or "ERR_<reason>#<seq>" for a command it rejects; a rejected command is failed, not resent.
+    Up to `window` commands can be unacknowledged at once, and only the ones whose ACK is
+    overdue are retransmitted. A newer command with the same key (e.g. the joint name)
+    replaces an older queued or unacknowledged one, so a stale J3_FWD is never resent after J3_STOP.
+    Nothing here blocks: call poll() from the main loop to process ACKs and retransmits.
+    """
+
+    def __init__(self, ser, window=8, ack_timeout=0.5, retry_limit=3):
+        self.ser = ser
+        self.window = window
+        self.ack_timeout = ack_timeout
+        self.retry_limit = retry_limit
+        self.next_seq = 0
+        self.queue = OrderedDict()  # key -> command waiting for a window slot
+        self.in_flight = OrderedDict()  # seq -> [command, key, sent_time, attempts]
+        self.rx_buffer = bytearray()
+        self.sent = 0
+        self.acked = 0
+        self.retransmits = 0
+        self.superseded = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def send(self, command, key=None):
+        """
+        Queue a command; it is written immediately if the window has room.
+        """
+        if key is None:
+            key = command
+        for seq, entry in list(self.in_flight.items()):
+            if entry[1] == key:
+                del self.in_flight[seq]
+                self.superseded += 1
+        if key in self.queue:
+            self.superseded += 1
+            del self.queue[key]
+        self.queue[key] = command
+        self._fill_window(time.monotonic())
+
+    def idle(self):
+        return not self.queue and not self.in_flight
+
+    def poll(self, now=None):
+        """
+        Process received ACKs, retransmit overdue commands and send queued ones.
+        Returns the list of (key, command) pairs that ran out of retries.
+        """
+        if now is None:
+            now = time.monotonic()
+        waiting = self.ser.in_waiting
+        if waiting:
+            self.rx_buffer += self.ser.read(waiting)
+            self._process_lines()
+
+        failures = []
+        for seq, entry in list(self.in_flight.items()):
+            command, key, sent_time, attempts = entry
+            if now - sent_time < self.ack_timeout:
+                continue
+            if attempts >= self.retry_limit:
+                del self.in_flight[seq]
+                self.failed += 1
+                failures.append((key, command))
+                print(f"Error: Failed to receive ACK for {command} after {self.retry_limit} retries.")
+                continue
+            self._write(command, seq)
+            entry[2] = now
+            entry[3] = attempts + 1
+            self.retransmits += 1
+
+        self._fill_window(now)
+        return failures
+
+    def _fill_window(self, now):
+        while self.queue and len(self.in_flight) < self.window:
+            key, command = self.queue.popitem(last=False)
+            seq = self.next_seq
+            self.next_seq = (self.next_seq + 1) % SEQ_MODULO
+            self._write(command, seq)
+            self.in_flight[seq] = [command, key, now, 1]
+            self.sent += 1
+
+    def _write(self, command, seq):
+        self.ser.write(f"{command}#{seq}\n".encode())
+
+    def _process_lines(self):
+        while True:
+            newline = self.rx_buffer.find(b'\n')
+            if newline < 0:
+                return
+            line = self.rx_buffer[:newline].decode(errors='replace').strip()
+            del self.rx_buffer[:newline + 1]
+            if line.startswith("ERR_") and '#' in line:
+                self._reject(line)
+                continue
+            if not line.startswith("ACK_") or '#' not in line:
+                if line:
+                    print(f"Received: {line}")
+                continue
+            command, _, seq = line[4:].rpartition('#')
+            try:
+                seq = int(seq)
+            except ValueError:
+                continue
+            entry = self.in_flight.get(seq)
+            if entry is not None and entry[0] == command:
+                del self.in_flight[seq]
+                self.acked += 1
+
+    def _reject(self, line):
+        # A NACK names only the sequence number; the same command would be rejected again
+        error, _, seq = line.rpartition('#')
+        try:
+            entry = self.in_flight.pop(int(seq), None)
+        except ValueError:
+            entry = None
+        if entry is None:
+            print(f"Received: {line}")
+            return
+        self.failed += 1
+        self.rejected += 1
+        print(f"Error: {entry[0]} was rejected with {error}.")
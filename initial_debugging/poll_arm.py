@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+import os
+import serial
+
+import robstride_codec as codec
+from robstride_scheduler import PollScheduler, arm_targets
+from robstride_transport import Transport
+
+
+def print_stats(stats):
+    """
+    Print a one-screen summary of the scheduler statistics.
+    """
+    jitter = stats['jitter_ms']
+    print(f"rate {stats['achieved_rate']:.1f}/{stats['target_rate']:.0f} Hz, "
+          f"missed {stats['missed_deadlines']}, timeouts {stats['timeouts']} "
+          f"(late {stats['late_replies']}, lost {stats['lost_replies']}), "
+          f"invalid replies {stats['invalid_replies']}, "
+          f"bus load {stats['bus_load'] * 100:.1f}%, jitter p99 {jitter['p99'] or 0:.2f} ms")
+    for motor_id, params in stats['motors'].items():
+        parts = []
+        for name, entry in params.items():
+            latency = entry['latency_ms']
+            age = entry['age_ms']
+            if age is None:
+                parts.append(f"{name}: no data")
+            else:
+                parts.append(f"{name}: age {age:.1f} ms, p50 {latency['p50']:.2f} / p99 {latency['p99']:.2f} ms")
+        print(f"  motor {motor_id}: " + ", ".join(parts))
+
+
+def publish_cycle(writer, scheduler, cycle_started):
+    """
+    Publish one telemetry sample per motor whose MECH_POS was read in this cycle.
+    """
+    samples = []
+    for motor_id in sorted({motor_id for motor_id, _ in scheduler.targets}):
+        position = scheduler.latest.get((motor_id, codec.MECH_POS.index))
+        if position is None or position.timestamp < cycle_started:
+            continue
+        velocity = scheduler.latest.get((motor_id, codec.MECH_VEL.index))
+        samples.append((position.timestamp, motor_id, position.value,
+                        velocity.value if velocity is not None else float('nan')))
+    writer.publish(samples)
+
+
+async def poll(port, baud_rate, rate, telemetry=None, capture=None):
+    async with Transport.open(port, baud_rate, capture=capture) as transport:
+        print(f"Opened {port} at {baud_rate} baud rate.")
+        scheduler = PollScheduler(transport, arm_targets(), rate=rate)
+        if telemetry is not None:
+            scheduler.on_cycle = lambda scheduler, started: publish_cycle(telemetry, scheduler, started)
+        task = asyncio.ensure_future(scheduler.run())
+        try:
+            while not task.done():
+                await asyncio.sleep(1.0)
+                print_stats(scheduler.stats())
+        finally:
+            scheduler.stop()
+            await task
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Poll every arm joint at a fixed rate")
+    parser.add_argument('--telemetry', action='store_true',
+                        help="publish the samples to shared memory for robstride_telemetry readers")
+    parser.add_argument('--capture', help="record all bus traffic to this capture file")
+    args = parser.parse_args()
+
+    # Configuration
+    port = os.environ.get("ROBSTRIDE_PORT", "COM7")  # e.g. the pty printed by robstride_sim.py
+    baud_rate = 921600
+    rate = 100  # Hz, MECH_POS and MECH_VEL for every joint each cycle
+
+    telemetry = None
+    if args.telemetry:
+        # Imported here so plain polling does not need NumPy
+        from robstride_telemetry import TelemetryWriter
+        try:
+            telemetry = TelemetryWriter()
+        except FileExistsError as e:
+            print(e)
+            return
+    capture = None
+    if args.capture:
+        from robstride_capture import CaptureWriter, exit_on_sigterm
+        capture = CaptureWriter(args.capture)
+        exit_on_sigterm()
+    try:
+        asyncio.run(poll(port, baud_rate, rate, telemetry, capture))
+    except serial.SerialException as e:
+        print(f"Serial error: {e}")
+    except KeyboardInterrupt:
+        print("Exiting...")
+    finally:
+        if telemetry is not None:
+            telemetry.close()
+        if capture is not None:
+            capture.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,12 @@
-import pygame
+from gamepad_input import AXIS, BUTTON, HAT, Gamepad
 
-# Initialize pygame
-pygame.init()
-
-# Initialize joystick
-pygame.joystick.init()
-
-# Check if a joystick is connected
-if pygame.joystick.get_count() == 0:
-    print("No joystick detected. Please connect one and restart.")
-    pygame.quit()
+# Open the first joystick (evdev when installed, otherwise pygame)
+try:
+    gamepad = Gamepad.open()
+except RuntimeError as error:
+    print(error)
     exit()
 
-# Get the first joystick
-joystick = pygame.joystick.Joystick(0)
-joystick.init()
-
 # Deadzone threshold (for triggers)
 DEADZONE = 0.2
 
@@ -45,49 +36,48 @@ dpad_map = {
     (1, 0): "13 (D-pad Right)",
 }
 
-# Main loop
-running = True
+# Show the most recent input; called only when a control changes
 current_input = ""
 
-while running:
-    pygame.event.pump()  # Process events
 
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-
-        # Button Press
-        elif event.type == pygame.JOYBUTTONDOWN:
-            button_name = button_map.get(event.button, f"{event.button}")
+def show(event):
+    global current_input
+    if event.kind == BUTTON:
+        # Button Press / Release
+        if event.value:
+            button_name = button_map.get(event.control, f"{event.control}")
             current_input = f"Button {button_name} Pressed"
-
-        # Button Release
-        elif event.type == pygame.JOYBUTTONUP:
+        else:
             current_input = ""
 
-        # Axis Movement (L2/R2 Triggers)
-        elif event.type == pygame.JOYAXISMOTION:
-            axis_value = joystick.get_axis(event.axis)
-
-            # Apply Deadzone for triggers
-            if abs(axis_value) > DEADZONE:
-                axis_name = axis_map.get(event.axis, f"Axis {event.axis}")
-                current_input = f"Axis {axis_name}: {axis_value:.2f}"
-            else:
-                current_input = ""
+    elif event.kind == AXIS:
+        # Axis Movement (L2/R2 Triggers), with the deadzone applied
+        if abs(event.value) > DEADZONE:
+            axis_name = axis_map.get(event.control, f"Axis {event.control}")
+            current_input = f"Axis {axis_name}: {event.value:.2f}"
+        else:
+            current_input = ""
 
+    elif event.kind == HAT:
         # D-pad (Hat Switch) as Buttons
-        elif event.type == pygame.JOYHATMOTION:
-            hat_value = joystick.get_hat(0)
-            if hat_value in dpad_map:
-                current_input = f"Button {dpad_map[hat_value]} Pressed"
-            else:
-                current_input = ""
+        if event.value in dpad_map:
+            current_input = f"Button {dpad_map[event.value]} Pressed"
+        else:
+            current_input = ""
 
     # Clear console and print current input
     if current_input:
         print("\033c", end="")  # Clear console
         print(current_input)
 
-# Quit pygame
-pygame.quit()
+
+gamepad.subscribe(show)
+
+# Main loop: sleeps until the controller reports a change
+try:
+    while True:
+        gamepad.wait()
+except KeyboardInterrupt:
+    pass
+finally:
+    gamepad.close()
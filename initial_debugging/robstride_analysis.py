@@ -0,0 +1,211 @@
+import argparse
+import time
+
+import numpy as np
+
+import robstride_codec as codec
+from robstride_capture import INDEX, RX, TX, CaptureReader
+
+
+# One decoded frame per row. motor_id is the motor the frame was sent to or came from, index is
+# only meaningful for parameter reads and writes, value is bytes 4-7 as a little-endian float32.
+REPLY_TIMEOUT = 1.0  # Seconds after which an unanswered read request counts as lost
+
+DECODED_DTYPE = np.dtype([('time', 'f8'), ('direction', 'u1'), ('comm_type', 'u1'), ('motor_id', 'u1'),
+                          ('index', 'u2'), ('value', 'f8')])
+
+
+def decode(records):
+    """
+    Decode capture records (robstride_capture.RECORD_DTYPE) into DECODED_DTYPE, all at once.
+    """
+    records = records[records['direction'] != INDEX]
+    decoded = np.empty(len(records), DECODED_DTYPE)
+    decoded['time'] = records['timestamp'] / 1e9
+    decoded['direction'] = records['direction']
+    can_id = records['can_id']
+    decoded['comm_type'] = can_id >> 24
+    # Replies carry the motor in bits 8-15, frames from the host in bits 0-7
+    decoded['motor_id'] = np.where(records['direction'] == RX, (can_id >> 8) & 0xFF, can_id & 0xFF)
+    data = records['data']
+    decoded['index'] = (data[:, 0].astype(np.uint16) << 8) | data[:, 1]
+    decoded['value'] = np.ascontiguousarray(data[:, 4:8]).view('<f4')[:, 0]
+    return decoded
+
+
+def load(path, start=None, end=None):
+    """
+    Decoded frames of a capture file, optionally only those between start and end (seconds).
+    """
+    return decode(CaptureReader(path).between(start, end))
+
+
+def parameter_series(decoded, motor_id, param):
+    """
+    (times, values) of the read replies for one motor parameter.
+    """
+    mask = ((decoded['direction'] == RX) & (decoded['comm_type'] == codec.COMM_TYPE_READ)
+            & (decoded['motor_id'] == motor_id) & (decoded['index'] == param.index))
+    return decoded['time'][mask], decoded['value'][mask]
+
+
+def command_series(decoded, motor_id, param):
+    """
+    (times, values) of the writes of one motor parameter sent by the host.
+    """
+    mask = ((decoded['direction'] == TX) & (decoded['comm_type'] == codec.COMM_TYPE_WRITE)
+            & (decoded['motor_id'] == motor_id) & (decoded['index'] == param.index))
+    return decoded['time'][mask], decoded['value'][mask]
+
+
+def velocity_from_position(times, positions):
+    """
+    Velocity by central differences over the (unevenly spaced) sample times.
+
+    Frames parsed from one serial read share a timestamp; such samples are averaged into one
+    before differentiating, and each gets the velocity of that merged sample.
+    """
+    unique_times, inverse = np.unique(times, return_inverse=True)
+    if len(unique_times) < 2:
+        return np.zeros(len(times))
+    merged = np.bincount(inverse, weights=positions) / np.bincount(inverse)
+    return np.gradient(merged, unique_times)[inverse]
+
+
+def interval_stats(times):
+    """
+    Sample intervals and their jitter (deviation from the median interval), in milliseconds.
+    """
+    intervals = np.diff(times) * 1000
+    if not len(intervals):
+        return {'median_ms': None, 'jitter_p99_ms': None, 'max_gap_ms': None}
+    median = np.median(intervals)
+    return {
+        'median_ms': float(median),
+        'jitter_p99_ms': float(np.percentile(np.abs(intervals - median), 99)),
+        'max_gap_ms': float(intervals.max()),
+    }
+
+
+def tracking_error(decoded, motor_id):
+    """
+    (times, errors) of MECH_POS against the POSITION_TARGET last written before each reading.
+    Readings from before the first target are left out.
+    """
+    times, positions = parameter_series(decoded, motor_id, codec.MECH_POS)
+    target_times, targets = command_series(decoded, motor_id, codec.POSITION_TARGET)
+    latest = np.searchsorted(target_times, times, side='right') - 1
+    valid = latest >= 0
+    return times[valid], positions[valid] - targets[latest[valid]]
+
+
+def request_latency(decoded, timeout=REPLY_TIMEOUT):
+    """
+    Seconds from each parameter read request to its reply, as {(motor_id, index): latencies}.
+
+    Replies are matched to the requests for the same motor and parameter in the order they were
+    sent, as the motor answers them. A request left unanswered for `timeout` seconds counts as
+    lost, and a reply with no outstanding request is left out.
+    """
+    is_read = decoded['comm_type'] == codec.COMM_TYPE_READ
+    requests = decoded[is_read & (decoded['direction'] == TX)]
+    replies = decoded[is_read & (decoded['direction'] == RX)]
+    request_keys = requests['motor_id'].astype(np.uint32) << 16 | requests['index']
+    reply_keys = replies['motor_id'].astype(np.uint32) << 16 | replies['index']
+    latencies = {}
+    for key in np.unique(reply_keys):
+        sent = requests['time'][request_keys == key]
+        received = replies['time'][reply_keys == key]
+        # Requests sent at or before each reply; those from `oldest` on are still outstanding
+        sent_before = np.searchsorted(sent, received, side='right')
+        matched = []
+        oldest = 0
+        for reply_time, count in zip(received, sent_before):
+            while oldest < count and reply_time - sent[oldest] > timeout:
+                oldest += 1
+            if oldest < count:
+                matched.append(reply_time - sent[oldest])
+                oldest += 1
+        latencies[(int(key >> 16), int(key & 0xFFFF))] = np.array(matched)
+    return latencies
+
+
+def _percentiles_ms(values):
+    if not len(values):
+        return None
+    p50, p99 = np.percentile(values, [50, 99]) * 1000
+    return {'p50': float(p50), 'p99': float(p99), 'max': float(values.max() * 1000)}
+
+
+def report(decoded):
+    """
+    Per-motor summary: MECH_POS sample rate and interval jitter, velocity derived from position
+    against the MECH_VEL readings, tracking error and MECH_POS request latency.
+    """
+    motors = {}
+    # Group the frames by motor once, so the per-motor series below each scan one motor's frames
+    by_motor = decoded[np.argsort(decoded['motor_id'], kind='stable')]
+    motor_ids, starts = np.unique(by_motor['motor_id'], return_index=True)
+    ends = np.append(starts[1:], len(by_motor))
+    for motor_id, start, end in zip(motor_ids, starts, ends):
+        motor_id = int(motor_id)
+        frames = by_motor[start:end]
+        if not np.any((frames['direction'] == RX) & (frames['comm_type'] == codec.COMM_TYPE_READ)):
+            continue
+        times, positions = parameter_series(frames, motor_id, codec.MECH_POS)
+        entry = {'samples': int(len(times))}
+        span = times[-1] - times[0] if len(times) > 1 else 0.0
+        entry['rate_hz'] = (len(times) - 1) / span if span > 0 else 0.0
+        entry['intervals'] = interval_stats(times)
+
+        velocity_times, velocities = parameter_series(frames, motor_id, codec.MECH_VEL)
+        entry['velocity_rms_diff'] = None
+        if len(times) > 1 and len(velocity_times):
+            derived = np.interp(velocity_times, times, velocity_from_position(times, positions))
+            entry['velocity_rms_diff'] = float(np.sqrt(np.mean((derived - velocities) ** 2)))
+
+        _, errors = tracking_error(frames, motor_id)
+        entry['tracking_rms'] = float(np.sqrt(np.mean(errors ** 2))) if len(errors) else None
+        entry['tracking_max'] = float(np.abs(errors).max()) if len(errors) else None
+        latencies = request_latency(frames).get((motor_id, codec.MECH_POS.index), np.empty(0))
+        entry['latency_ms'] = _percentiles_ms(latencies)
+        motors[motor_id] = entry
+    return motors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a capture file per joint")
+    parser.add_argument('path')
+    parser.add_argument('--start', type=float, help="seconds from the start of the capture")
+    parser.add_argument('--duration', type=float, help="seconds to analyze")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    reader = CaptureReader(args.path)
+    first, _ = reader.time_range()
+    if first is None:
+        print("Empty capture.")
+        return
+    start = first + args.start if args.start is not None else None
+    end = (start if start is not None else first) + args.duration if args.duration is not None else None
+    decoded = decode(reader.between(start, end))
+    motors = report(decoded)
+    for motor_id, entry in motors.items():
+        intervals = entry['intervals']
+        latency = entry['latency_ms']
+        line = f"Motor {motor_id:>3}: {entry['samples']} MECH_POS samples at {entry['rate_hz']:.1f} Hz"
+        if intervals['median_ms'] is not None:
+            line += (f", interval {intervals['median_ms']:.2f} ms (jitter p99 {intervals['jitter_p99_ms']:.2f}, "
+                     f"max gap {intervals['max_gap_ms']:.1f} ms)")
+        if latency is not None:
+            line += f", latency p50 {latency['p50']:.2f} / p99 {latency['p99']:.2f} ms"
+        if entry['velocity_rms_diff'] is not None:
+            line += f", velocity rms diff {entry['velocity_rms_diff']:.4f} rad/s"
+        if entry['tracking_rms'] is not None:
+            line += f", tracking rms {entry['tracking_rms']:.4f} / max {entry['tracking_max']:.4f} rad"
+        print(line)
+    print(f"Analyzed {len(decoded)} frames in {time.monotonic() - started:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import asyncio
+import time
+from collections import namedtuple
+
+import robstride_codec as codec
+from robstride_transport import DEFAULT_TIMEOUT, run_on_serial
+
+
+# One bring-up step: call(motor, timeout) returns the Motor coroutine to await. settle is a fixed wait
+# after the reply, for a step whose effect the motor only applies some time after acknowledging it;
+# every step below completes with its reply, so none of them has one.
+Step = namedtuple('Step', ['name', 'call', 'settle'], defaults=[0.0])
+
+# Per-motor result: ok is False if a step got no reply after all retries; step_times are the
+# seconds each completed step took, in order
+BringUpReport = namedtuple('BringUpReport', ['motor_id', 'ok', 'elapsed', 'step_times', 'retries', 'failed_step'])
+
+POSITION_MODE = [
+    Step('run mode', lambda motor, timeout: motor.write(codec.RUN_MODE, codec.MODE_POSITION, timeout)),
+    Step('enable', lambda motor, timeout: motor.enable(timeout)),
+]
+SPEED_MODE = [
+    Step('run mode', lambda motor, timeout: motor.write(codec.RUN_MODE, codec.MODE_SPEED, timeout)),
+    Step('enable', lambda motor, timeout: motor.enable(timeout)),
+]
+SPEED_MODE_LIMITED = SPEED_MODE + [
+    Step('max current',
+         lambda motor, timeout: motor.write(codec.SPEED_MAX_CURRENT, codec.DEFAULT_MAX_CURRENT, timeout)),
+]
+# Stop the position loop where it is, then make the current position zero
+ZERO_POSITION = [
+    Step('speed limit', lambda motor, timeout: motor.write(codec.POSITION_SPEED_LIMIT, 0.0, timeout)),
+    Step('target', lambda motor, timeout: motor.write(codec.POSITION_TARGET, 0.0, timeout)),
+    Step('reset', lambda motor, timeout: motor.reset_position(timeout)),
+]
+
+
+async def bring_up_motor(motor, steps, timeout=DEFAULT_TIMEOUT, retries=2):
+    """
+    Run steps on one motor, each as soon as the previous one was acknowledged.
+    A step without a reply is sent again up to `retries` times before the motor is given up.
+    """
+    started = time.monotonic()
+    step_times = []
+    retried = 0
+    for step in steps:
+        step_started = time.monotonic()
+        for attempt in range(retries + 1):
+            try:
+                await step.call(motor, timeout)
+                break
+            except asyncio.TimeoutError:
+                if attempt == retries:
+                    return BringUpReport(motor.motor_id, False, time.monotonic() - started, step_times,
+                                         retried, step.name)
+                retried += 1
+        if step.settle:
+            await asyncio.sleep(step.settle)
+        step_times.append(time.monotonic() - step_started)
+    return BringUpReport(motor.motor_id, True, time.monotonic() - started, step_times, retried, None)
+
+
+async def bring_up(transport, motor_ids, steps, timeout=DEFAULT_TIMEOUT, retries=2):
+    """
+    Run steps on all motors at once. Motors do not wait for each other, so the whole bring-up
+    takes as long as the slowest motor's round trips. Returns one BringUpReport per motor.
+    """
+    return list(await asyncio.gather(*(bring_up_motor(transport.motor(motor_id), steps, timeout, retries)
+                                       for motor_id in motor_ids)))
+
+
+def bring_up_serial(ser, motor_ids, steps, timeout=DEFAULT_TIMEOUT, retries=2):
+    """
+    Blocking bring-up on a serial port the caller already has open; the port stays open.
+    """
+    return run_on_serial(ser, bring_up, motor_ids, steps, timeout, retries)
+
+
+def print_report(reports):
+    for report in reports:
+        steps = ", ".join(f"{step_time * 1000:.1f}" for step_time in report.step_times)
+        if report.ok:
+            print(f"Motor {report.motor_id} ready in {report.elapsed * 1000:.1f} ms (steps {steps} ms"
+                  + (f", {report.retries} retries)" if report.retries else ")"))
+        else:
+            print(f"Motor {report.motor_id} did not answer '{report.failed_step}' "
+                  f"after {report.elapsed * 1000:.1f} ms")
+    if reports:
+        print(f"Bring-up of {len(reports)} motors took {max(report.elapsed for report in reports) * 1000:.1f} ms")
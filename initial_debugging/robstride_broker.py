@@ -0,0 +1,314 @@
+import argparse
+import asyncio
+import json
+import os
+import select
+import socket
+import struct
+import threading
+import time
+
+import serial
+
+import robstride_codec as codec
+from robstride_parser import FrameParser
+
+
+BROKER_PREFIX = "unix:"  # Port names starting with this are broker sockets, e.g. unix:/tmp/robstride.sock
+DEFAULT_SOCKET = "/tmp/robstride.sock"
+CLIENT_BUFFER_LIMIT = 64 * 1024  # Bytes queued for a client before its frames are dropped
+_INT = struct.Struct('i')
+
+
+def encode(frame):
+    """
+    Re-encode a parsed frame in the adapter's "AT" framing.
+    """
+    return codec.FRAME_HEAD + codec.id_header(frame.can_id) + bytes([len(frame.data)]) + frame.data + codec.FRAME_TAIL
+
+
+def open_port(port, baud_rate=921600, timeout=None, motors=None, comm_types=None):
+    """
+    Open the adapter directly, or through the broker when port is "unix:<socket path>".
+    motors and comm_types only apply to the broker: the frames the client wants to receive.
+    """
+    if port.startswith(BROKER_PREFIX):
+        return BrokerSerial(port[len(BROKER_PREFIX):], timeout, motors, comm_types)
+    return serial.Serial(port, baud_rate, timeout=timeout)
+
+
+class BrokerClient:
+    """
+    One connected client: its receive filter and its share of the broker's counters.
+    """
+
+    def __init__(self, writer, motors, comm_types):
+        self.writer = writer
+        self.handler = None  # The task serving the client
+        self.motors = None if motors is None else set(motors)
+        self.comm_types = None if comm_types is None else set(comm_types)
+        self.parser = FrameParser()
+        self.frames_received = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+
+    def wants(self, frame):
+        return ((self.motors is None or frame.motor_id in self.motors)
+                and (self.comm_types is None or frame.comm_type in self.comm_types))
+
+
+class Broker:
+    """
+    Owns the adapter's serial port and shares it with clients on a Unix domain socket.
+
+    A client opens with one JSON line, {"motors": [...], "comm_types": [...]} (either may be
+    left out to receive everything), and from then on exchanges plain "AT" frames. Frames from
+    the adapter go to every client whose filter matches. Frames from clients are parsed, so
+    only whole frames reach the bus, and everything that arrives within one event-loop pass
+    goes out in a single serial write. A client that stops reading loses its frames once
+    CLIENT_BUFFER_LIMIT bytes are queued for it, instead of holding up the others.
+
+    Replies are not routed to the client that sent the request: the motors' replies carry no
+    request ID, so every client whose filter matches sees them, and a Transport counts the
+    ones it did not ask for as unmatched.
+    """
+
+    def __init__(self, ser, path=DEFAULT_SOCKET, buffer_limit=CLIENT_BUFFER_LIMIT, capture=None):
+        self.ser = ser
+        self.path = path
+        self.buffer_limit = buffer_limit
+        self.capture = capture  # Optional robstride_capture.CaptureWriter; sees every client's traffic
+        self.parser = FrameParser(capacity=65536)
+        self.clients = []
+        self.outgoing = []
+        self.frames_from_bus = 0
+        self.frames_to_bus = 0
+        self.serial_writes = 0
+        self._loop = None
+        self._running = False
+        self._thread = None
+        self._failed = None
+
+    async def serve(self):
+        """
+        Serve clients until the adapter fails, then close them and raise serial.SerialException.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._failed = self._loop.create_future()
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # Left behind by a broker that did not shut down cleanly
+        server = await asyncio.start_unix_server(self._serve_client, self.path)
+        self._running = True
+        self._thread = threading.Thread(target=self._read_serial, daemon=True)
+        self._thread.start()
+        try:
+            async with server:
+                await self._failed
+        finally:
+            self._running = False
+            self._thread.join(timeout=1.0)
+            # Closing a client's socket ends its handler; let them finish before the loop stops
+            handlers = [client.handler for client in self.clients]
+            for client in self.clients:
+                client.writer.close()
+            if handlers:
+                await asyncio.wait(handlers, timeout=1.0)
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def _fail(self, error):
+        if not self._failed.done():
+            self._failed.set_exception(serial.SerialException(f"adapter failed: {error}"))
+
+    async def _serve_client(self, reader, writer):
+        try:
+            request = json.loads(await reader.readline() or b'{}')
+        except ValueError:
+            request = None
+        except asyncio.CancelledError:
+            request = None  # Shut down during the handshake: the client is closed below
+        if (not isinstance(request, dict)
+                or not all(isinstance(request.get(key), (list, type(None))) for key in ('motors', 'comm_types'))):
+            writer.close()
+            return
+        client = BrokerClient(writer, request.get('motors'), request.get('comm_types'))
+        client.handler = asyncio.current_task()
+        self.clients.append(client)
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                frames = client.parser.feed(data)
+                if frames:
+                    client.frames_received += len(frames)
+                    if not self.outgoing:
+                        self._loop.call_soon(self._flush)
+                    self.outgoing.extend(encode(frame) for frame in frames)
+        except (ConnectionError, asyncio.CancelledError):
+            # Cancelled at shutdown; ending normally keeps asyncio's stream callback from
+            # logging the cancellation as an error
+            pass
+        finally:
+            self.clients.remove(client)
+            writer.close()
+
+    def _flush(self):
+        frames, self.outgoing = self.outgoing, []
+        data = b''.join(frames)
+        # Stamped before the write, so the capture never has a reply ahead of its request
+        sent_at = time.monotonic()
+        try:
+            self.ser.write(data)
+        except OSError as error:
+            self._fail(error)
+            return
+        if self.capture is not None:
+            self.capture.feed_tx(data, sent_at)
+        self.frames_to_bus += len(frames)
+        self.serial_writes += 1
+
+    def _read_serial(self):
+        while self._running:
+            try:
+                data = self.ser.read(self.ser.in_waiting or 1)
+            except OSError as error:
+                # Also serial.SerialException, e.g. the adapter was unplugged
+                if self._running:
+                    self._loop.call_soon_threadsafe(self._fail, error)
+                break
+            if data:
+                self._loop.call_soon_threadsafe(self._on_data, data, time.monotonic())
+
+    def _on_data(self, data, timestamp):
+        frames = self.parser.feed(data, timestamp)
+        self.frames_from_bus += len(frames)
+        if self.capture is not None:
+            for frame in frames:
+                self.capture.observe(frame)
+        for client in self.clients:
+            wanted = [frame for frame in frames if client.wants(frame)]
+            if not wanted:
+                continue
+            if client.writer.transport.get_write_buffer_size() > self.buffer_limit:
+                client.frames_dropped += len(wanted)
+                continue
+            client.writer.write(b''.join(encode(frame) for frame in wanted))
+            client.frames_sent += len(wanted)
+
+    async def report(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            print(f"{len(self.clients)} clients, {self.frames_from_bus} frames from the bus, "
+                  f"{self.frames_to_bus} to the bus in {self.serial_writes} writes, "
+                  f"{sum(client.frames_dropped for client in self.clients)} dropped for slow clients")
+
+
+class BrokerSerial:
+    """
+    Client side of the broker with the subset of the pyserial interface the scripts use
+    (read, write, in_waiting, timeout, reset_input_buffer, close), so Transport and the
+    blocking scripts run unchanged on a shared adapter.
+    """
+
+    def __init__(self, path=DEFAULT_SOCKET, timeout=None, motors=None, comm_types=None):
+        self.port = BROKER_PREFIX + path
+        self.timeout = timeout
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.sock.connect(path)
+        except OSError as e:
+            self.sock.close()
+            raise serial.SerialException(f"could not connect to broker at {path}: {e}")
+        request = {}
+        if motors is not None:
+            request['motors'] = list(motors)
+        if comm_types is not None:
+            request['comm_types'] = list(comm_types)
+        self.sock.sendall(json.dumps(request).encode() + b'\n')
+        self.is_open = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def in_waiting(self):
+        # POSIX only, like the broker itself; imported here so the module loads on Windows too
+        import fcntl
+        import termios
+        return _INT.unpack(fcntl.ioctl(self.sock.fileno(), termios.FIONREAD, bytes(_INT.size)))[0]
+
+    def read(self, size=1):
+        """
+        Read up to size bytes, waiting at most timeout seconds (forever if None) like pyserial.
+        """
+        data = bytearray()
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while len(data) < size:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            readable, _, _ = select.select([self.sock], [], [], remaining)
+            if not readable:
+                break
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise serial.SerialException("broker closed the connection")
+            data += chunk
+        return bytes(data)
+
+    def write(self, data):
+        self.sock.sendall(data)
+        return len(data)
+
+    def reset_input_buffer(self):
+        while self.in_waiting:
+            self.sock.recv(self.in_waiting)
+
+    def close(self):
+        if self.is_open:
+            self.is_open = False
+            self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Share one USB-CAN adapter between several tools")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET,
+                        help=f"socket path; clients use ROBSTRIDE_PORT={BROKER_PREFIX}<path>")
+    parser.add_argument('--report', type=float, default=10.0, help="seconds between statistics lines")
+    parser.add_argument('--capture', help="record all bus traffic to this capture file")
+    args = parser.parse_args()
+
+    port = os.environ.get("ROBSTRIDE_PORT", "COM7")
+    baud_rate = 921600
+
+    async def run(ser, capture):
+        broker = Broker(ser, args.socket, capture=capture)
+        print(f"Opened {port} at {baud_rate} baud rate. Clients connect to {BROKER_PREFIX}{args.socket}")
+        reporter = asyncio.ensure_future(broker.report(args.report))
+        try:
+            await broker.serve()
+        finally:
+            reporter.cancel()
+
+    capture = None
+    if args.capture:
+        # Imported here so the broker does not need NumPy unless it captures
+        from robstride_capture import CaptureWriter, exit_on_sigterm
+        capture = CaptureWriter(args.capture)
+        exit_on_sigterm()
+    try:
+        with serial.Serial(port, baud_rate, timeout=0.05) as ser:
+            asyncio.run(run(ser, capture))
+    except serial.SerialException as e:
+        print(f"Serial error: {e}")
+    except KeyboardInterrupt:
+        print("Exiting...")
+    finally:
+        if capture is not None:
+            capture.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+import argparse
+import atexit
+import bisect
+import math
+import os
+import signal
+import struct
+import sys
+import threading
+import time
+
+import numpy as np
+
+import robstride_codec as codec
+from robstride_parser import FrameParser, decode_value
+
+
+MAGIC = b'RSCAP\x00\x01\x00'
+# File header: magic, record size, records per index block
+_HEADER = struct.Struct('<8sHH4x')
+HEADER_SIZE = _HEADER.size
+
+TX = 0  # Host to bus
+RX = 1  # Bus to host
+INDEX = 0xFF  # Direction field of an index record
+DIRECTIONS = {TX: 'tx', RX: 'rx'}
+
+# Every record has the same size, so record k starts at HEADER_SIZE + k * RECORD_DTYPE.itemsize.
+# timestamp is time.monotonic() in nanoseconds; can_id is the 29-bit CAN ID.
+RECORD_DTYPE = np.dtype([('timestamp', '<u8'), ('direction', 'u1'), ('length', 'u1'), ('reserved', '<u2'),
+                         ('can_id', '<u4'), ('data', 'u1', (codec.DATA_LENGTH,))])
+_RECORD = struct.Struct('<QBBHI8s')
+INDEX_INTERVAL = 1024  # Frame records between index records
+FLUSH_RECORDS = 4096  # Records buffered before they are appended to the file
+REORDER_WINDOW = 1.0  # Seconds of the newest records held back from a flush, so late ones still sort in
+FLUSH_INTERVAL = 1.0  # Seconds between background flushes of the records older than REORDER_WINDOW
+
+
+class CaptureWriter:
+    """
+    Appends frames to a capture file.
+
+    An index record comes before every index_interval frame records: it carries the timestamp
+    of the frame after it and, in its data bytes, the number of frames before it. Index records
+    therefore sit at every (index_interval + 1)th slot, and a reader finds a time by a binary
+    search over them before it looks at any frame record.
+
+    Frames are not always recorded in time order (a reply can be recorded after a request sent
+    later, with its earlier receive time), so they are buffered and sorted by timestamp before
+    they are appended. A flush keeps back the last REORDER_WINDOW seconds for the next one;
+    close() writes everything.
+
+    So that a crash loses at most the last REORDER_WINDOW + FLUSH_INTERVAL seconds, a background
+    thread writes out the older records every FLUSH_INTERVAL (timestamps are time.monotonic()),
+    and close() runs at exit if the caller did not get to it.
+    """
+
+    def __init__(self, path, index_interval=INDEX_INTERVAL):
+        self.path = path
+        self.index_interval = index_interval
+        self.file = open(path, 'wb')
+        self.file.write(_HEADER.pack(MAGIC, RECORD_DTYPE.itemsize, index_interval))
+        self.buffer = []  # (timestamp_ns, direction, length, can_id, data) not yet written
+        self.tx_parser = FrameParser()
+        self.frames = 0
+        self._flush_at = FLUSH_RECORDS
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def record(self, direction, can_id, data, timestamp):
+        entry = (int(timestamp * 1e9), direction, len(data), can_id, bytes(data))
+        with self._lock:
+            self.buffer.append(entry)
+            if len(self.buffer) >= self._flush_at:
+                self._write(hold=REORDER_WINDOW)
+
+    def observe(self, frame):
+        """
+        Record a received frame; meant for Transport.subscribe.
+        """
+        self.record(RX, frame.can_id, frame.data, frame.timestamp)
+
+    def feed_tx(self, data, timestamp):
+        """
+        Record the frames in bytes written to the adapter.
+        """
+        for frame in self.tx_parser.feed(data, timestamp):
+            self.record(TX, frame.can_id, frame.data, timestamp)
+
+    def _write(self, hold=0.0, now=None):
+        """
+        Append the buffered records in timestamp order, except those within `hold` seconds of
+        `now` (by default the newest record). Called with the lock held.
+        """
+        self.buffer.sort(key=lambda entry: entry[0])
+        count = len(self.buffer)
+        if hold and self.buffer:
+            newest = self.buffer[-1][0] if now is None else int(now * 1e9)
+            count = bisect.bisect_right(self.buffer, (newest - int(hold * 1e9), math.inf))
+        records = []
+        for timestamp_ns, direction, length, can_id, data in self.buffer[:count]:
+            if self.frames % self.index_interval == 0:
+                records.append(_RECORD.pack(timestamp_ns, INDEX, 0, 0, 0, struct.pack('<Q', self.frames)))
+            records.append(_RECORD.pack(timestamp_ns, direction, length, 0, can_id, data))
+            self.frames += 1
+        self.file.write(b''.join(records))
+        del self.buffer[:count]
+        self._flush_at = len(self.buffer) + FLUSH_RECORDS
+
+    def _flush_periodically(self):
+        while not self._closed.wait(FLUSH_INTERVAL):
+            with self._lock:
+                if self.file.closed:
+                    return
+                self._write(hold=REORDER_WINDOW, now=time.monotonic())
+                self.file.flush()
+
+    def flush(self):
+        """
+        Write every buffered record. Frames recorded afterwards with an earlier timestamp than
+        the last one written can no longer be sorted in.
+        """
+        with self._lock:
+            self._write()
+            self.file.flush()
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._flusher.join()
+        self.flush()
+        self.file.close()
+        atexit.unregister(self.close)
+
+
+def exit_on_sigterm():
+    """
+    Turn SIGTERM into SystemExit, so that `finally` blocks and atexit handlers (and with them
+    CaptureWriter.close) still run when a capturing process is terminated.
+    """
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+
+class CaptureReader:
+    """
+    Memory-maps a capture file; only the pages that are looked at are read from disk.
+
+    records is a NumPy view of every record, index records included. Timestamps in the results
+    are seconds on the capturing machine's time.monotonic() clock.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            magic, record_size, self.index_interval = _HEADER.unpack(f.read(HEADER_SIZE))
+        if magic != MAGIC or record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(f"{path} is not a capture file")
+        count = (os.path.getsize(path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+        self.records = np.memmap(path, RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(count,))
+        self.index = self.records[::self.index_interval + 1]
+
+    def __len__(self):
+        return len(self.records) - len(self.index)
+
+    def time_range(self):
+        if not len(self):
+            return None, None
+        return self.records[1]['timestamp'] / 1e9, self.records[-1]['timestamp'] / 1e9
+
+    def seek(self, timestamp):
+        """
+        Slot of the first frame record at or after timestamp (seconds).
+        """
+        timestamp_ns = int(timestamp * 1e9)
+        stride = self.index_interval + 1
+        block = max(0, int(np.searchsorted(self.index['timestamp'], timestamp_ns, side='right')) - 1)
+        start = block * stride + 1
+        frames = self.records[start:start + self.index_interval]
+        return start + int(np.searchsorted(frames['timestamp'], timestamp_ns))
+
+    def between(self, start=None, end=None):
+        """
+        Frame records with start <= timestamp < end, as a structured array (a copy).
+        """
+        first = self.seek(start) if start is not None else 0
+        last = self.seek(end) if end is not None else len(self.records)
+        records = self.records[first:last]
+        return np.array(records[records['direction'] != INDEX])
+
+    def frames(self, start=None, end=None):
+        """
+        Yield the frame records between start and end as they were on the wire.
+        """
+        for record in self.between(start, end):
+            yield record['direction'], record['timestamp'] / 1e9, encode(record)
+
+
+def encode(record):
+    """
+    The "AT" frame of a capture record.
+    """
+    length = int(record['length'])
+    return (codec.FRAME_HEAD + codec.id_header(int(record['can_id'])) + bytes([length])
+            + record['data'][:length].tobytes() + codec.FRAME_TAIL)
+
+
+def replay(reader, on_frame, speed=1.0, start=None, end=None, direction=RX):
+    """
+    Feed the captured frames of one direction through a FrameParser and call on_frame(frame)
+    for each parsed frame, spaced as in the capture divided by speed (0 replays at full speed).
+    Frames keep their captured timestamps. Returns the parser.
+    """
+    parser = FrameParser()
+    started = time.monotonic()
+    first = None
+    for record_direction, timestamp, data in reader.frames(start, end):
+        if record_direction != direction:
+            continue
+        if first is None:
+            first = timestamp
+        if speed:
+            delay = (timestamp - first) / speed - (time.monotonic() - started)
+            if delay > 0:
+                time.sleep(delay)
+        for frame in parser.feed(data, timestamp):
+            on_frame(frame)
+    return parser
+
+
+def print_frame(frame, direction=RX):
+    param = codec.PARAMETERS.get(frame.index)
+    # Frames from the host carry the motor in bits 0-7, replies in bits 8-15
+    motor_id = frame.motor_id if direction == RX else frame.can_id & 0xFF
+    text = f"{frame.timestamp:.6f} {DIRECTIONS[direction]} type {frame.comm_type:>2} motor {motor_id:>3}"
+    if (param is not None and frame.comm_type == codec.COMM_TYPE_READ and direction == RX
+            and len(frame.data) >= codec.DATA_LENGTH):
+        text += f" {param.name} = {decode_value(frame, param):.4f}"
+    else:
+        text += " " + frame.data.hex(' ')
+    print(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and replay a capture file")
+    parser.add_argument('path')
+    parser.add_argument('--replay', action='store_true', help="replay the frames instead of summarizing")
+    parser.add_argument('--speed', type=float, default=1.0, help="replay speed factor; 0 is as fast as possible")
+    parser.add_argument('--direction', choices=['rx', 'tx'], default='rx')
+    parser.add_argument('--start', type=float, help="seconds from the start of the capture")
+    parser.add_argument('--duration', type=float, help="seconds to replay")
+    args = parser.parse_args()
+
+    reader = CaptureReader(args.path)
+    first, last = reader.time_range()
+    if first is None:
+        print("Empty capture.")
+        return
+    start = first + args.start if args.start is not None else None
+    end = (start if start is not None else first) + args.duration if args.duration is not None else None
+    if not args.replay:
+        records = reader.between(start, end)
+        span = (records['timestamp'][-1] - records['timestamp'][0]) / 1e9 if len(records) else 0.0
+        print(f"{len(reader)} frames over {last - first:.3f} s, {len(reader.index)} index records")
+        for direction, name in DIRECTIONS.items():
+            count = int(np.count_nonzero(records['direction'] == direction))
+            rate = count / span if span > 0 else 0.0
+            print(f"  {name}: {count} frames, {rate:.0f} frames/s")
+        return
+
+    try:
+        direction = RX if args.direction == 'rx' else TX
+        started = time.monotonic()
+        parser = replay(reader, lambda frame: print_frame(frame, direction), args.speed, start, end, direction)
+        print(f"Replayed {parser.frame_count} frames in {time.monotonic() - started:.3f} s, "
+              f"{parser.dropped_bytes} bytes dropped by the parser")
+    except KeyboardInterrupt:
+        print("Exiting...")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import struct
+from collections import namedtuple
+
+
+# Default host CAN ID used by every script and by RobstrideControl.h
+HOST_CAN_ID = 253
+
+# Joint IDs used by the arm sketch (joystick_velo_control.ino)
+ARM_MOTOR_IDS = [21, 22, 23, 24, 25, 26, 127]
+
+# Communication types
+COMM_TYPE_FEEDBACK = 2
+COMM_TYPE_ENABLE = 3
+COMM_TYPE_DISABLE = 4
+COMM_TYPE_RESET = 6
+COMM_TYPE_READ = 17
+COMM_TYPE_WRITE = 18
+
+# Parameter data types
+FLOAT = 'float'
+INT16 = 'int16'
+INT8 = 'int8'
+
+Parameter = namedtuple('Parameter', ['name', 'index', 'type'])
+
+# Parameter definitions (same table as RobstrideControl.h)
+RUN_MODE = Parameter('RUN_MODE', 0x0570, INT8)
+SPEED_MAX_CURRENT = Parameter('SPEED_MAX_CURRENT', 0x1870, FLOAT)
+SPEED_TARGET = Parameter('SPEED_TARGET', 0x0A70, FLOAT)
+POSITION_SPEED_LIMIT = Parameter('POSITION_SPEED_LIMIT', 0x1770, FLOAT)
+POSITION_TARGET = Parameter('POSITION_TARGET', 0x1670, FLOAT)
+MECH_POS = Parameter('MECH_POS', 0x1970, FLOAT)
+MECH_VEL = Parameter('MECH_VEL', 0x1B70, FLOAT)
+SPEED_ACCELERATION = Parameter('SPEED_ACCELERATION', 0x2270, FLOAT)
+POSITION_03_SPEED = Parameter('POSITION_03_SPEED', 0x2470, FLOAT)
+POSITION_ACCELERATION = Parameter('POSITION_ACCELERATION', 0x2570, FLOAT)
+
+PARAMETERS = {
+    param.index: param for param in (
+        RUN_MODE, SPEED_MAX_CURRENT, SPEED_TARGET, POSITION_SPEED_LIMIT, POSITION_TARGET,
+        MECH_POS, MECH_VEL, SPEED_ACCELERATION, POSITION_03_SPEED, POSITION_ACCELERATION,
+    )
+}
+
+# RUN_MODE values
+MODE_POSITION = 1
+MODE_SPEED = 2
+
+# Constants for default settings (same as RobstrideControl.h)
+DEFAULT_MAX_CURRENT = 23.0
+DEFAULT_SPEED = 10.0
+DEFAULT_MAX_ACC = 20.0
+
+# Frame layout: "AT" + 4-byte extended header + data length + 8 data bytes + "\r\n"
+FRAME_HEAD = b'AT'
+FRAME_TAIL = b'\r\n'
+FRAME_LENGTH = 17
+DATA_OFFSET = 7
+DATA_LENGTH = 8
+
+_ID = struct.Struct('>I')
+_DATA_INDEX = struct.Struct('>H6x')
+# The index is big-endian but the value is little-endian, so the index goes in byte-swapped
+_DATA_VALUE = {
+    FLOAT: struct.Struct('<H2xf'),
+    INT16: struct.Struct('<H2xH2x'),
+    INT8: struct.Struct('<H2xB3x'),
+}
+
+_prefix_cache = {}
+_frame_cache = {}
+
+
+def can_id(comm_type, host_can_id, motor_can_id):
+    """
+    Return the 29-bit CAN ID for a command sent from the host to a motor.
+    """
+    return (comm_type << 24) | (host_can_id << 8) | motor_can_id
+
+
+def id_header(raw_can_id):
+    """
+    Encode the adapter's 4-byte extended header: the CAN ID shifted left by 3 with '100' appended.
+    """
+    return _ID.pack((raw_can_id << 3) | 0b100)
+
+
+def extended_header(comm_type, host_can_id, motor_can_id):
+    """
+    Extended header for a command sent from the host to a motor.
+    """
+    return id_header(can_id(comm_type, host_can_id, motor_can_id))
+
+
+def frame_prefix(comm_type, motor_can_id, host_can_id=HOST_CAN_ID):
+    """
+    Return the cached "AT" + extended header + data length bytes for a command.
+    """
+    key = (comm_type, host_can_id, motor_can_id)
+    prefix = _prefix_cache.get(key)
+    if prefix is None:
+        prefix = FRAME_HEAD + extended_header(comm_type, host_can_id, motor_can_id) + bytes([DATA_LENGTH])
+        _prefix_cache[key] = prefix
+    return prefix
+
+
+def _swap16(value):
+    return ((value & 0xFF) << 8) | (value >> 8)
+
+
+def pack_write_into(buffer, offset, motor_can_id, param, value, host_can_id=HOST_CAN_ID):
+    """
+    Pack a type 18 parameter write into buffer at offset, for batching several frames in one write.
+    """
+    buffer[offset:offset + DATA_OFFSET] = frame_prefix(COMM_TYPE_WRITE, motor_can_id, host_can_id)
+    if param.type != FLOAT:
+        value = int(value)
+    _DATA_VALUE[param.type].pack_into(buffer, offset + DATA_OFFSET, _swap16(param.index), value)
+    buffer[offset + FRAME_LENGTH - 2:offset + FRAME_LENGTH] = FRAME_TAIL
+
+
+def static_frame(comm_type, motor_can_id, param=None, host_can_id=HOST_CAN_ID):
+    """
+    Return the cached bytes of a frame whose data does not depend on a value
+    (enable, disable, reset position and parameter reads).
+    """
+    key = (comm_type, host_can_id, motor_can_id, param)
+    frame = _frame_cache.get(key)
+    if frame is None:
+        frame = bytearray(FRAME_LENGTH)
+        frame[:DATA_OFFSET] = frame_prefix(comm_type, motor_can_id, host_can_id)
+        if comm_type == COMM_TYPE_RESET:
+            frame[DATA_OFFSET] = 0x01
+        elif param is not None:
+            _DATA_INDEX.pack_into(frame, DATA_OFFSET, param.index)
+        frame[FRAME_LENGTH - 2:] = FRAME_TAIL
+        frame = bytes(frame)
+        _frame_cache[key] = frame
+    return frame
+
+
+def build_frame(comm_type, motor_can_id, param=None, value=None, host_can_id=HOST_CAN_ID):
+    """
+    Build a complete frame for comm types 3, 4, 6, 17 and 18 as a new bytes object.
+    """
+    if comm_type == COMM_TYPE_WRITE:
+        frame = bytearray(FRAME_LENGTH)
+        pack_write_into(frame, 0, motor_can_id, param, value, host_can_id)
+        return bytes(frame)
+    return static_frame(comm_type, motor_can_id, param, host_can_id)
+
+
+class FrameEncoder:
+    """
+    Encodes commands for the motors behind one host ID.
+
+    Writes are packed into a single reusable bytearray, which is overwritten by the next
+    write, so hand it to ser.write (or copy it) before encoding another frame.
+    Every other command returns cached immutable bytes.
+    """
+
+    def __init__(self, host_can_id=HOST_CAN_ID):
+        self.host_can_id = host_can_id
+        self.buffer = bytearray(FRAME_LENGTH)
+
+    def write(self, motor_can_id, param, value):
+        pack_write_into(self.buffer, 0, motor_can_id, param, value, self.host_can_id)
+        return self.buffer
+
+    def read(self, motor_can_id, param):
+        return static_frame(COMM_TYPE_READ, motor_can_id, param, self.host_can_id)
+
+    def enable(self, motor_can_id):
+        return static_frame(COMM_TYPE_ENABLE, motor_can_id, host_can_id=self.host_can_id)
+
+    def disable(self, motor_can_id):
+        return static_frame(COMM_TYPE_DISABLE, motor_can_id, host_can_id=self.host_can_id)
+
+    def reset_position(self, motor_can_id):
+        return static_frame(COMM_TYPE_RESET, motor_can_id, host_can_id=self.host_can_id)
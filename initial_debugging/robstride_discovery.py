@@ -0,0 +1,132 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import serial
+
+import robstride_codec as codec
+from robstride_parser import decode_value
+from robstride_scheduler import CAN_BITRATE, CAN_FRAME_BITS
+from robstride_transport import Transport, run_on_serial
+
+
+MAX_MOTOR_ID = 127
+SCAN_TIMEOUT = 0.1  # Seconds after the last probe is sent that replies are still collected
+CHECK_TIMEOUT = 0.01  # The same for the quick sweep that checks a cached result
+SCAN_CHUNK = 32  # Probes per serial write
+PROBE = codec.RUN_MODE  # Harmless to read, and tells which mode a motor is in
+CACHE_PATH = os.environ.get("ROBSTRIDE_CACHE", os.path.expanduser("~/.robstride_motors.json"))
+
+
+async def scan(transport, motor_ids=range(1, MAX_MOTOR_ID + 1), timeout=SCAN_TIMEOUT, chunk=SCAN_CHUNK):
+    """
+    Probe every ID with a RUN_MODE read and return {motor_id: run mode} of those that answered
+    (None for a reply too short to carry the mode).
+
+    The probes go out in chunks of `chunk` frames, spaced by the chunk's time on the CAN bus so
+    the adapter's queue is not overrun, and all of them share one deadline: `timeout` seconds
+    after the last chunk is on the bus. The scan ends early once every ID has answered.
+    """
+    motor_ids = list(motor_ids)
+    requests = [(transport.encoder.read(motor_id, PROBE), (codec.COMM_TYPE_READ, motor_id, PROBE.index))
+                for motor_id in motor_ids]
+    chunk_time = chunk * CAN_FRAME_BITS / CAN_BITRATE
+    chunks = range(0, len(requests), chunk)
+    deadline = time.monotonic() + len(chunks) * chunk_time + timeout
+    futures = []
+    for start in chunks:
+        if start:
+            await asyncio.sleep(chunk_time)
+        futures += transport.request_many(requests[start:start + chunk], max(0.0, deadline - time.monotonic()))
+    replies = await asyncio.gather(*futures, return_exceptions=True)
+    found = {}
+    for motor_id, frame in zip(motor_ids, replies):
+        if isinstance(frame, Exception):
+            continue
+        try:
+            found[motor_id] = decode_value(frame, PROBE)
+        except ValueError:
+            found[motor_id] = None  # It answered, so it is there, but the mode is unknown
+    return found
+
+
+def load_cache(port, path=CACHE_PATH):
+    """
+    Motor IDs last found behind port, or None.
+    """
+    try:
+        with open(path) as f:
+            return json.load(f).get(port)
+    except (OSError, ValueError):
+        return None
+
+
+def save_cache(port, motor_ids, path=CACHE_PATH):
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    cache[port] = sorted(motor_ids)
+    with open(path, "w") as f:
+        json.dump(cache, f, indent=2)
+
+
+async def discover(transport, port, rescan=False, timeout=SCAN_TIMEOUT, path=CACHE_PATH):
+    """
+    Motor IDs on the bus behind port, sorted.
+
+    With a cached result the whole ID range is swept with the short CHECK_TIMEOUT: once every
+    cached motor answers within it, so would a motor added since, and the IDs found are used
+    (and cached, if new ones showed up). If a cached motor is missing, or with rescan, the
+    range is scanned again with the full timeout and the result replaces the cache.
+    """
+    cached = None if rescan else load_cache(port, path)
+    if cached:
+        found = await scan(transport, timeout=min(timeout, CHECK_TIMEOUT))
+        if set(cached) <= set(found):
+            if len(found) != len(cached):
+                save_cache(port, found, path)
+            return sorted(found)
+    found = sorted(await scan(transport, timeout=timeout))
+    save_cache(port, found, path)
+    return found
+
+
+def discover_serial(ser, port, rescan=False, timeout=SCAN_TIMEOUT):
+    """
+    Blocking discover() on a serial port the caller already has open; the port stays open.
+    """
+    return run_on_serial(ser, discover, port, rescan, timeout)
+
+
+async def run_scan(port, baud_rate, rescan, timeout):
+    async with Transport.open(port, baud_rate) as transport:
+        print(f"Opened {port} at {baud_rate} baud rate.")
+        started = time.monotonic()
+        motor_ids = await discover(transport, port, rescan, timeout)
+        elapsed = time.monotonic() - started
+    print(f"Found {len(motor_ids)} motors in {elapsed * 1000:.1f} ms: {motor_ids}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the motor CAN IDs that answer on the bus")
+    parser.add_argument('--rescan', action='store_true', help=f"ignore the cache in {CACHE_PATH}")
+    parser.add_argument('--timeout', type=float, default=SCAN_TIMEOUT,
+                        help="seconds to wait for replies after the last probe")
+    args = parser.parse_args()
+
+    port = os.environ.get("ROBSTRIDE_PORT", "COM7")
+    baud_rate = 921600
+    try:
+        asyncio.run(run_scan(port, baud_rate, args.rescan, args.timeout))
+    except serial.SerialException as e:
+        print(f"Serial error: {e}")
+    except KeyboardInterrupt:
+        print("Exiting...")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+
+LOG_LEVEL = os.environ.get("ROBSTRIDE_LOG", "DEBUG")  # DEBUG shows every frame; INFO hides the dumps
+LOGGER_NAME = "robstride"  # Logger the scripts log frames to; LOG_LEVEL applies to it only
+QUEUE_CAPACITY = 10000  # Records waiting for the writer thread before new ones are dropped
+
+
+class HexFrame:
+    """
+    Lazy hex dump of a frame: the bytes are only formatted if a handler actually writes the record.
+    """
+
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        # A bytearray may be reused by the caller before the writer thread gets to it
+        self.data = bytes(data)
+
+    def __str__(self):
+        return self.data.hex(' ')
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records on a bounded queue without blocking; when the queue is full the record is
+    dropped and counted instead.
+
+    Unlike the stock QueueHandler it does not format the message before enqueueing it, so
+    building a frame dump happens on the writer thread, not in the caller's loop.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """
+    The queue handler on the root logger and the background listener that writes its records.
+
+    The level is set on the LOGGER_NAME logger, not the root, so other libraries (asyncio's
+    debug messages, say) stay at their default of warnings only.
+    """
+
+    def __init__(self, level=LOG_LEVEL, capacity=QUEUE_CAPACITY, stream=None):
+        self.queue = queue.Queue(capacity)
+        self.handler = DroppingQueueHandler(self.queue)
+        output = logging.StreamHandler(stream if stream is not None else sys.stdout)
+        output.setFormatter(logging.Formatter("%(message)s"))
+        self.listener = logging.handlers.QueueListener(self.queue, output)
+        logging.getLogger().addHandler(self.handler)
+        logging.getLogger(LOGGER_NAME).setLevel(level)
+        self.listener.start()
+        self.running = True
+
+    @property
+    def dropped(self):
+        return self.handler.dropped
+
+    def drain(self):
+        """
+        Wait until the writer thread has written every record queued so far.
+        """
+        if self.running:
+            self.queue.join()
+
+    def stop(self):
+        """
+        Write out what is still queued and stop the writer thread.
+        """
+        if not self.running:
+            return
+        self.running = False
+        logging.getLogger().removeHandler(self.handler)
+        self.listener.stop()
+        if self.handler.dropped:
+            print(f"{self.handler.dropped} log records dropped because the log queue was full")
+
+
+_pipeline = None
+
+
+def setup(level=LOG_LEVEL, capacity=QUEUE_CAPACITY, stream=None):
+    """
+    Route logging through a LogPipeline (once per process) and stop it at exit.
+    """
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = LogPipeline(level, capacity, stream)
+        atexit.register(_pipeline.stop)
+    return _pipeline
+
+
+def echo(*args, **kwargs):
+    """
+    print() for user-facing lines: waits for the queued log records first, so the line comes
+    after the frames logged before it and does not depend on the log level.
+    """
+    if _pipeline is not None:
+        _pipeline.drain()
+    print(*args, **kwargs)
+
+
+def prompt(text):
+    """
+    input() whose prompt, like echo(), comes after the frames logged before it.
+    """
+    if _pipeline is not None:
+        _pipeline.drain()
+    return input(text)
@@ -0,0 +1,135 @@
+import struct
+import time
+from collections import namedtuple
+
+import robstride_codec as codec
+
+
+# A decoded reply. For replies the motor's CAN ID sits in bits 8-15 of the CAN ID and the
+# host ID in bits 0-7; index is only set for parameter reads and writes (comm types 17/18).
+Frame = namedtuple('Frame', ['comm_type', 'motor_id', 'index', 'data', 'can_id', 'timestamp'])
+
+_ID = struct.Struct('>I')
+_INDEX = struct.Struct('>H')
+_VALUE = {
+    codec.FLOAT: struct.Struct('<f'),
+    codec.INT16: struct.Struct('<h'),
+    codec.INT8: struct.Struct('<B'),
+}
+
+_HEAD = codec.FRAME_HEAD
+_MIN_LENGTH = codec.DATA_OFFSET + len(codec.FRAME_TAIL)  # Frame with no data bytes
+
+
+def decode_value(frame, param=None):
+    """
+    Decode the value carried in bytes 4-7 of a parameter read reply.
+    Raises ValueError if the frame is too short to carry one.
+    """
+    if param is None:
+        param = codec.PARAMETERS.get(frame.index)
+    value_type = param.type if param is not None else codec.FLOAT
+    if len(frame.data) < codec.DATA_LENGTH:
+        raise ValueError(f"reply from motor {frame.motor_id} for parameter 0x{frame.index or 0:04x} "
+                         f"has {len(frame.data)} data bytes, expected {codec.DATA_LENGTH}")
+    return _VALUE[value_type].unpack_from(frame.data, 4)[0]
+
+
+class FrameParser:
+    """
+    Incremental parser for the adapter's "AT ... \\r\\n" frames.
+
+    Bytes are fed in arbitrary chunks and kept in a fixed-size receive buffer, so a frame
+    split across reads is completed by the next chunk. Anything that does not form a valid
+    frame is skipped and counted in dropped_bytes, and parsing resumes at the next "AT".
+    """
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.buffer = bytearray(capacity)
+        self.start = 0
+        self.end = 0
+        self.frame_count = 0
+        self.dropped_bytes = 0
+
+    def pending(self):
+        return self.end - self.start
+
+    def reset(self):
+        self.start = 0
+        self.end = 0
+
+    def feed(self, chunk, timestamp=None):
+        """
+        Add received bytes and return the list of frames completed by them.
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        size = len(chunk)
+        if size > self.capacity:
+            self.dropped_bytes += size - self.capacity
+            chunk = chunk[size - self.capacity:]
+            size = self.capacity
+        if self.end + size > self.capacity:
+            self._make_room(size)
+        self.buffer[self.end:self.end + size] = chunk
+        self.end += size
+        return self._parse(timestamp)
+
+    def _make_room(self, size):
+        # Drop the oldest unparsed bytes if the buffer would overflow, then move the rest to the front
+        overflow = self.end - self.start + size - self.capacity
+        if overflow > 0:
+            self.start += overflow
+            self.dropped_bytes += overflow
+        pending = self.end - self.start
+        self.buffer[:pending] = self.buffer[self.start:self.end]
+        self.start = 0
+        self.end = pending
+
+    def _parse(self, timestamp):
+        frames = []
+        buffer = self.buffer
+        pos = self.start
+        end = self.end
+        while True:
+            head = buffer.find(_HEAD, pos, end)
+            if head < 0:
+                # Keep a trailing "A" in case the next chunk starts with "T"
+                keep = 1 if end > pos and buffer[end - 1] == _HEAD[0] else 0
+                self.dropped_bytes += end - pos - keep
+                pos = end - keep
+                break
+            self.dropped_bytes += head - pos
+            pos = head
+            if end - pos < codec.DATA_OFFSET:
+                break
+            data_length = buffer[pos + codec.DATA_OFFSET - 1]
+            if data_length > codec.DATA_LENGTH:
+                # Corrupt header: skip this "A" and look for the next frame
+                pos += 1
+                self.dropped_bytes += 1
+                continue
+            frame_end = pos + _MIN_LENGTH + data_length
+            if frame_end > end:
+                break
+            if buffer[frame_end - 2] != 0x0D or buffer[frame_end - 1] != 0x0A:
+                pos += 1
+                self.dropped_bytes += 1
+                continue
+
+            can_id = _ID.unpack_from(buffer, pos + 2)[0] >> 3
+            comm_type = can_id >> 24
+            data = bytes(buffer[pos + codec.DATA_OFFSET:frame_end - 2])
+            index = None
+            if comm_type in (codec.COMM_TYPE_READ, codec.COMM_TYPE_WRITE) and data_length >= 2:
+                index = _INDEX.unpack_from(data)[0]
+            frames.append(Frame(comm_type, (can_id >> 8) & 0xFF, index, data, can_id, timestamp))
+            pos = frame_end
+
+        if pos == end:
+            pos = end = 0
+        self.start = pos
+        self.end = end
+        self.frame_count += len(frames)
+        return frames
@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+import serial
+
+import robstride_codec as codec
+from robstride_shadow import ParameterShadow
+from robstride_transport import DEFAULT_TIMEOUT, TIMEOUT, Transport
+
+
+TRAPEZOID = 'trapezoid'
+SCURVE = 's-curve'
+PROFILES = (TRAPEZOID, SCURVE)
+
+# Plan for m moves of n joints: duration, accel_time (m,); start, goal, speed, acceleration (m, n).
+# speed and acceleration are the per-joint cruise speed and peak acceleration that make every
+# joint of a move start and finish together (for a trapezoid, the POSITION_SPEED_LIMIT and
+# POSITION_ACCELERATION to send).
+MovePlan = namedtuple('MovePlan', ['start', 'goal', 'duration', 'accel_time', 'speed', 'acceleration',
+                                   'profile'])
+
+
+def plan_moves(start, goal, max_speed, max_acc, profile=TRAPEZOID):
+    """
+    Plan one or more synchronized multi-joint moves at once.
+
+    start and goal have shape (m, n) or (n,); max_speed and max_acc broadcast against them.
+    All joints of a move share the same normalized velocity profile, scaled by their distance,
+    so they accelerate, cruise and stop together and the move is a straight line in joint
+    space. The shared accel time and duration are the shortest that keep every joint within
+    its limits. An S-curve ramps the acceleration sinusoidally, which needs pi/2 times the
+    accel time of a trapezoid for the same peak acceleration.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"profile must be one of {PROFILES}")
+    start = np.atleast_2d(np.asarray(start, dtype=float))
+    goal = np.atleast_2d(np.asarray(goal, dtype=float))
+    distance = np.abs(goal - start)
+    max_speed = np.broadcast_to(np.asarray(max_speed, dtype=float), distance.shape)
+    max_acc = np.broadcast_to(np.asarray(max_acc, dtype=float), distance.shape)
+    if profile == SCURVE:
+        max_acc = max_acc * (2.0 / np.pi)  # Average acceleration of a sinusoidal ramp
+
+    # With accel time ta and cruise-plus-one-ramp time c = T - ta, joint i needs
+    # c >= d_i / V_i and c * ta >= d_i / A_i; the binding joints give these maxima
+    speed_bound = (distance / max_speed).max(axis=1)
+    acc_bound = (distance / max_acc).max(axis=1)
+    reaches_speed = acc_bound <= speed_bound ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        accel_time = np.where(reaches_speed, acc_bound / speed_bound, np.sqrt(acc_bound))
+        duration = np.where(reaches_speed, speed_bound + accel_time, 2.0 * accel_time)
+        cruise = (duration - accel_time)[:, None]
+        speed = np.where(cruise > 0, distance / cruise, 0.0)
+        acceleration = np.where(accel_time[:, None] > 0, speed / accel_time[:, None], 0.0)
+    accel_time = np.nan_to_num(accel_time)
+    duration = np.nan_to_num(duration)
+    if profile == SCURVE:
+        acceleration = acceleration * (np.pi / 2.0)  # Peak of the sinusoidal ramp
+    return MovePlan(start, goal, duration, accel_time, speed, acceleration, profile)
+
+
+def sample_move(plan, index, rate):
+    """
+    Positions of move `index` sampled at `rate` Hz, shape (samples, n), for streaming it with
+    robstride_trajectory.TrajectoryExecutor instead of relying on the motors' own profile.
+    """
+    duration = plan.duration[index]
+    ta = plan.accel_time[index]
+    t = np.append(np.arange(0.0, duration, 1.0 / rate), duration)
+    # Normalized distance covered by time t of a profile with unit cruise speed
+    cruise = duration - ta
+    if ta <= 0:
+        return t, np.repeat(plan.goal[index][None, :], len(t), axis=0)
+    if plan.profile == TRAPEZOID:
+        ramp = lambda x: x * x / (2 * ta)  # noqa: E731
+    else:
+        ramp = lambda x: x / 2 - ta / (2 * np.pi) * np.sin(np.pi * x / ta)  # noqa: E731
+    covered = np.where(t < ta, ramp(t),
+                       np.where(t <= cruise, ta / 2 + (t - ta),
+                                cruise - ramp(np.clip(duration - t, 0.0, ta))))
+    fraction = np.clip(covered / cruise, 0.0, 1.0)[:, None]
+    start, goal = plan.start[index], plan.goal[index]
+    return t, start + fraction * (goal - start)
+
+
+class MovePlanner:
+    """
+    Runs planned moves on the motors' own position-mode profile.
+
+    The motors only run trapezoids, so an S-curve plan is sent as the trapezoid with the same
+    timing; stream sample_move through robstride_trajectory for the S-curve shape itself. Each
+    move becomes one write_many batch: POSITION_SPEED_LIMIT, POSITION_ACCELERATION and
+    POSITION_TARGET for every joint, pipelined on the link. With a ParameterShadow on the
+    transport, limits that did not change since the previous move are left out.
+    """
+
+    def __init__(self, transport, motor_ids, max_speed=codec.DEFAULT_SPEED, max_acc=codec.DEFAULT_MAX_ACC,
+                 profile=TRAPEZOID):
+        self.transport = transport
+        self.motor_ids = list(motor_ids)
+        self.max_speed = max_speed
+        self.max_acc = max_acc
+        self.profile = profile
+        self.moves_sent = 0
+        self.timeouts = 0
+
+    async def prepare(self):
+        """
+        Position mode and enable for every joint, all motors in parallel. Each motor is told to
+        hold its measured position before it is enabled, so enabling does not move it.
+        Returns the measured positions.
+        """
+        async def setup(motor):
+            position = await motor.read(codec.MECH_POS)
+            await motor.write(codec.RUN_MODE, codec.MODE_POSITION)
+            await motor.write(codec.POSITION_TARGET, position)
+            await motor.enable()
+            return position
+        return await asyncio.gather(*(setup(self.transport.motor(motor_id)) for motor_id in self.motor_ids))
+
+    def plan(self, start, goals):
+        """
+        Plan a queue of moves: goals has shape (m, n); each move starts where the previous ends.
+        """
+        goals = np.atleast_2d(np.asarray(goals, dtype=float))
+        starts = np.vstack([np.asarray(start, dtype=float)[None, :], goals[:-1]])
+        return plan_moves(starts, goals, self.max_speed, self.max_acc, self.profile)
+
+    def entries(self, plan, index):
+        entries = []
+        accel_time = plan.accel_time[index]
+        for column, motor_id in enumerate(self.motor_ids):
+            speed = plan.speed[index, column]
+            if speed > 0:
+                # Limits go first so the motor never starts towards the target with old ones.
+                # A joint that does not move keeps its previous limits rather than getting zeros.
+                entries.append((motor_id, codec.POSITION_SPEED_LIMIT, float(speed)))
+                # The motors' own profile is a trapezoid. The one with the plan's speed and accel
+                # time covers the same distance in the same time as the S-curve, so every joint
+                # still finishes together; plan.acceleration would be the S-curve's peak.
+                entries.append((motor_id, codec.POSITION_ACCELERATION, float(speed / accel_time)))
+            entries.append((motor_id, codec.POSITION_TARGET, float(plan.goal[index, column])))
+        return entries
+
+    async def send(self, plan, index, timeout=DEFAULT_TIMEOUT):
+        results = await self.transport.write_many(self.entries(plan, index), timeout,
+                                                  window=3 * len(self.motor_ids))
+        self.timeouts += sum(result.status == TIMEOUT for result in results.values())
+        self.moves_sent += 1
+
+    async def run(self, plan):
+        """
+        Send the moves of a plan one after another, each when the previous one should be done.
+        """
+        deadline = time.monotonic()
+        for index in range(len(plan.duration)):
+            now = time.monotonic()
+            if now < deadline:
+                await asyncio.sleep(deadline - now)
+            await self.send(plan, index)
+            deadline = max(deadline, now) + plan.duration[index]
+
+
+async def run_moves(port, baud_rate, motor_ids, goals, profile):
+    async with Transport.open(port, baud_rate, shadow=ParameterShadow()) as transport:
+        print(f"Opened {port} at {baud_rate} baud rate.")
+        planner = MovePlanner(transport, motor_ids, profile=profile)
+        start = await planner.prepare()
+        plan = planner.plan(start, goals)
+        print(f"{len(goals)} moves, {plan.duration.sum():.2f} s total")
+        await planner.run(plan)
+        await asyncio.sleep(plan.duration[-1])
+        print(f"Sent {planner.moves_sent} moves, {transport.shadow.writes_suppressed} unchanged limits skipped, "
+              f"{planner.timeouts} timeouts")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synchronized multi-joint moves through a list of random goals")
+    parser.add_argument('--motors', default=','.join(str(motor_id) for motor_id in codec.ARM_MOTOR_IDS),
+                        help="comma-separated motor CAN IDs")
+    parser.add_argument('--moves', type=int, default=5)
+    parser.add_argument('--range', type=float, default=1.0, help="goals are drawn from [-range, range] rad")
+    parser.add_argument('--profile', choices=PROFILES, default=TRAPEZOID)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    motor_ids = [int(motor_id) for motor_id in args.motors.split(',')]
+    goals = np.random.default_rng(args.seed).uniform(-args.range, args.range, (args.moves, len(motor_ids)))
+    port = os.environ.get("ROBSTRIDE_PORT", "COM7")
+    baud_rate = 921600
+    try:
+        asyncio.run(run_moves(port, baud_rate, motor_ids, goals, args.profile))
+    except serial.SerialException as e:
+        print(f"Serial error: {e}")
+    except KeyboardInterrupt:
+        print("Exiting...")
+
+
+if __name__ == "__main__":
+    main()
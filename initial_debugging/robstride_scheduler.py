@@ -0,0 +1,191 @@
+import asyncio
+import time
+from collections import deque, namedtuple
+
+import robstride_codec as codec
+from robstride_parser import decode_value
+
+
+# Bits in an extended CAN frame with 8 data bytes, before bit stuffing
+CAN_FRAME_BITS = 131
+CAN_BITRATE = 1000000
+TIMEOUT_PERIODS = 3  # Default read timeout, in poll periods
+STARTUP_TIMEOUT = 0.1  # Seconds the first cycle waits, while the link and the motors warm up
+
+Sample = namedtuple('Sample', ['value', 'timestamp', 'latency'])
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of a sequence; None when it is empty.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(values, scale=1000.0):
+    """
+    p50/p90/p99/max of a sequence of seconds, in milliseconds.
+    """
+    if not values:
+        return {'p50': None, 'p90': None, 'p99': None, 'max': None}
+    return {
+        'p50': percentile(values, 0.50) * scale,
+        'p90': percentile(values, 0.90) * scale,
+        'p99': percentile(values, 0.99) * scale,
+        'max': max(values) * scale,
+    }
+
+
+def arm_targets(params=(codec.MECH_POS, codec.MECH_VEL), motor_ids=codec.ARM_MOTOR_IDS):
+    return [(motor_id, param) for motor_id in motor_ids for param in params]
+
+
+class PollScheduler:
+    """
+    Polls a set of (motor ID, parameter) pairs at a fixed rate over one Transport.
+
+    Every cycle starts on a fixed deadline grid and puts all of its reads on the link back to
+    back, then waits for the replies. A cycle that runs past the next deadline counts as
+    missed and the schedule skips ahead instead of trying to catch up.
+
+    Replies are matched to reads in the order they were sent, so a reply that comes after its
+    read timed out would answer the next cycle's read. The next cycle therefore first waits for
+    that late reply with Transport.expect, and counts it in late_replies rather than taking it
+    as a fresh sample. If only one reply comes for the two, the old one was lost: it counts in
+    lost_replies and the reply is the fresh sample.
+    """
+
+    def __init__(self, transport, targets, rate=100.0, timeout=None, window=1000,
+                 startup_timeout=STARTUP_TIMEOUT):
+        self.transport = transport
+        self.targets = list(targets)
+        self.rate = rate
+        self.period = 1.0 / rate
+        self.timeout = timeout if timeout is not None else TIMEOUT_PERIODS * self.period
+        self.startup_timeout = max(startup_timeout, self.timeout)
+        self.requests = [
+            (transport.encoder.read(motor_id, param), (codec.COMM_TYPE_READ, motor_id, param.index))
+            for motor_id, param in self.targets
+        ]
+        self.latest = {}
+        self.latencies = {key: deque(maxlen=window) for key in self._keys()}
+        self.jitter = deque(maxlen=window)
+        self.cycles = 0
+        self.missed_deadlines = 0
+        self.timeouts = 0  # Reads not answered within the timeout
+        self.late_replies = 0  # Of those, the ones answered later after all
+        self.lost_replies = 0  # And the ones never answered
+        self.invalid_replies = 0  # Replies too short to carry a value
+        self._overdue = set()  # Keys of timed-out reads whose replies may still come
+        self.started = None
+        self.on_cycle = None  # Optional callback(scheduler, cycle start time) after every cycle
+        self._running = False
+
+    def _keys(self):
+        return [(motor_id, param.index) for motor_id, param in self.targets]
+
+    def value(self, motor_id, param):
+        sample = self.latest.get((motor_id, param.index))
+        return sample.value if sample is not None else None
+
+    def stop(self):
+        self._running = False
+
+    async def run(self, duration=None):
+        self._running = True
+        self.started = time.monotonic()
+        deadline = self.started
+        while self._running:
+            now = time.monotonic()
+            if duration is not None and now - self.started >= duration:
+                break
+            if now < deadline:
+                await asyncio.sleep(deadline - now)
+            self.jitter.append(time.monotonic() - deadline)
+            await self.poll_once()
+
+            deadline += self.period
+            now = time.monotonic()
+            if now > deadline:
+                skipped = int((now - deadline) / self.period) + 1
+                self.missed_deadlines += skipped
+                deadline += skipped * self.period
+        self._running = False
+
+    async def poll_once(self):
+        """
+        Send one read for every target and wait for all replies (or their timeouts).
+        """
+        transport = self.transport
+        timeout = self.timeout if self.cycles else self.startup_timeout
+        # Queued ahead of this cycle's reads, so a late reply cannot be taken for a fresh one
+        overdue = {key: transport.expect(key, timeout) for key in self._overdue}
+        sent_at = time.monotonic()
+        futures = transport.request_many(self.requests, timeout)
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        await asyncio.gather(*overdue.values(), return_exceptions=True)
+        self._overdue = set()
+        for (motor_id, param), (_, reply_key), frame in zip(self.targets, self.requests, results):
+            late = overdue.get(reply_key)
+            if late is not None:
+                if late.exception() is not None:
+                    self.lost_replies += 1
+                elif isinstance(frame, Exception):
+                    # The one reply that came answers this cycle's read; the earlier one was lost
+                    self.lost_replies += 1
+                    frame = late.result()
+                else:
+                    self.late_replies += 1
+            if isinstance(frame, Exception):
+                self.timeouts += 1
+                if isinstance(frame, asyncio.TimeoutError):
+                    self._overdue.add(reply_key)
+                continue
+            try:
+                value = decode_value(frame, param)
+            except ValueError:
+                self.invalid_replies += 1
+                continue
+            key = (motor_id, param.index)
+            latency = frame.timestamp - sent_at
+            self.latest[key] = Sample(value, frame.timestamp, latency)
+            self.latencies[key].append(latency)
+        self.cycles += 1
+        if self.on_cycle is not None:
+            self.on_cycle(self, sent_at)
+
+    def stats(self):
+        """
+        Snapshot of achieved rate, deadline misses, jitter, bus load and per-motor latency and sample age.
+        """
+        now = time.monotonic()
+        elapsed = now - self.started if self.started is not None else 0.0
+        achieved_rate = self.cycles / elapsed if elapsed > 0 else 0.0
+        # Every read is one request frame plus one reply frame
+        frames_per_second = achieved_rate * len(self.targets) * 2
+        motors = {}
+        for motor_id, param in self.targets:
+            key = (motor_id, param.index)
+            sample = self.latest.get(key)
+            entry = motors.setdefault(motor_id, {})
+            entry[param.name] = {
+                'age_ms': (now - sample.timestamp) * 1000 if sample is not None else None,
+                'latency_ms': summarize(self.latencies[key]),
+            }
+        return {
+            'target_rate': self.rate,
+            'achieved_rate': achieved_rate,
+            'cycles': self.cycles,
+            'missed_deadlines': self.missed_deadlines,
+            'timeouts': self.timeouts,
+            'late_replies': self.late_replies,
+            'lost_replies': self.lost_replies,
+            'invalid_replies': self.invalid_replies,
+            'jitter_ms': summarize(self.jitter),
+            'bus_load': frames_per_second * CAN_FRAME_BITS / CAN_BITRATE,
+            'motors': motors,
+        }
@@ -0,0 +1,112 @@
+import struct
+import time
+
+import robstride_codec as codec
+
+
+_FLOAT32 = struct.Struct('<f')
+
+# Mode field (bits 22-23) of a type 2 feedback frame's CAN ID
+FEEDBACK_MODE_RESET = 0
+FEEDBACK_MODE_RUN = 2
+
+
+def wire_value(param, value):
+    """
+    The value as the motor will store it: rounded to float32, or truncated for integer parameters.
+    """
+    if param.type == codec.FLOAT:
+        return _FLOAT32.unpack(_FLOAT32.pack(value))[0]
+    return int(value)
+
+
+class ParameterShadow:
+    """
+    Host-side copy of the last value written to and read from each motor parameter.
+
+    A write is only needed when the value differs from the shadow. Reads are served from the
+    shadow for read_ttl seconds (never, if read_ttl is None). Enabling a motor drops its cached
+    reads; disabling or resetting it, or changing RUN_MODE, forgets everything written as well.
+    """
+
+    def __init__(self, read_ttl=None):
+        self.read_ttl = read_ttl
+        self.written = {}
+        self.read = {}
+        self.enabled = set()
+        self.writes_sent = 0
+        self.writes_suppressed = 0
+
+    def needs_write(self, motor_id, param, value):
+        if self.written.get((motor_id, param.index)) == wire_value(param, value):
+            self.writes_suppressed += 1
+            return False
+        return True
+
+    def record_write(self, motor_id, param, value):
+        if param is codec.RUN_MODE and self.written.get((motor_id, param.index)) != int(value):
+            self._forget_writes(motor_id)
+        self.written[(motor_id, param.index)] = wire_value(param, value)
+        self.writes_sent += 1
+
+    def cached_read(self, motor_id, param, now=None):
+        """
+        Return the shadowed value if it is younger than read_ttl, otherwise None.
+        """
+        if self.read_ttl is None:
+            return None
+        entry = self.read.get((motor_id, param.index))
+        if entry is None:
+            return None
+        value, timestamp = entry
+        if now is None:
+            now = time.monotonic()
+        if now - timestamp > self.read_ttl:
+            return None
+        return value
+
+    def record_read(self, motor_id, param, value, timestamp):
+        self.read[(motor_id, param.index)] = (value, timestamp)
+
+    def is_enabled(self, motor_id):
+        return motor_id in self.enabled
+
+    def on_enable(self, motor_id):
+        self._forget_reads(motor_id)
+        self.enabled.add(motor_id)
+
+    def on_disable(self, motor_id):
+        self.invalidate(motor_id)
+
+    def on_reset(self, motor_id):
+        self.invalidate(motor_id)
+
+    def invalidate(self, motor_id=None):
+        """
+        Forget everything known about one motor, or about all motors if motor_id is None.
+        """
+        if motor_id is None:
+            self.written.clear()
+            self.read.clear()
+            self.enabled.clear()
+            return
+        self._forget_writes(motor_id)
+        self._forget_reads(motor_id)
+        self.enabled.discard(motor_id)
+
+    def observe(self, frame):
+        """
+        Watch feedback frames: a motor that reports it is no longer running has lost its state.
+        """
+        if frame.comm_type != codec.COMM_TYPE_FEEDBACK or frame.motor_id not in self.enabled:
+            return
+        if (frame.can_id >> 22) & 0x3 != FEEDBACK_MODE_RUN:
+            self.invalidate(frame.motor_id)
+
+    def _forget_writes(self, motor_id):
+        for key in [key for key in self.written if key[0] == motor_id]:
+            del self.written[key]
+
+    def _forget_reads(self, motor_id):
+        for key in [key for key in self.read if key[0] == motor_id]:
+            del self.read[key]
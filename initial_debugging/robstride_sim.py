@@ -0,0 +1,267 @@
+import argparse
+import heapq
+import math
+import os
+import random
+import select
+import struct
+import threading
+import time
+import tty
+
+import robstride_codec as codec
+from robstride_parser import FrameParser, decode_value
+
+
+# Feedback frame (comm type 2) scaling
+POSITION_RANGE = 4 * math.pi  # rad
+VELOCITY_RANGE = 44.0  # rad/s
+TORQUE_RANGE = 17.0  # Nm
+
+_FEEDBACK = struct.Struct('>HHHH')
+_VALUE = {
+    codec.FLOAT: struct.Struct('<f'),
+    codec.INT16: struct.Struct('<h2x'),
+    codec.INT8: struct.Struct('<B3x'),
+}
+
+
+def _to_u16(value, value_range):
+    scaled = (value + value_range) / (2 * value_range) * 65535
+    return int(min(65535, max(0, scaled)))
+
+
+def _clamp(value, limit):
+    return max(-limit, min(limit, value))
+
+
+class SimMotor:
+    """
+    One simulated motor: parameter table plus first-order velocity dynamics.
+
+    In speed mode the velocity follows SPEED_TARGET; in position mode it follows a proportional
+    command towards POSITION_TARGET capped at POSITION_SPEED_LIMIT. Either way the velocity
+    approaches its command with time constant `tau`, limited by the mode's acceleration.
+    """
+
+    def __init__(self, motor_id, tau=0.02, position_gain=20.0):
+        self.motor_id = motor_id
+        self.tau = tau
+        self.position_gain = position_gain
+        self.enabled = False
+        self.position = 0.0
+        self.velocity = 0.0
+        self.temperature = 30.0
+        self.params = {
+            codec.RUN_MODE.index: 0,
+            codec.SPEED_MAX_CURRENT.index: codec.DEFAULT_MAX_CURRENT,
+            codec.SPEED_TARGET.index: 0.0,
+            codec.POSITION_SPEED_LIMIT.index: codec.DEFAULT_SPEED,
+            codec.POSITION_TARGET.index: 0.0,
+            codec.SPEED_ACCELERATION.index: codec.DEFAULT_MAX_ACC,
+            codec.POSITION_03_SPEED.index: codec.DEFAULT_SPEED,
+            codec.POSITION_ACCELERATION.index: codec.DEFAULT_MAX_ACC,
+        }
+        self.last_update = time.monotonic()
+
+    def advance(self, now):
+        dt = now - self.last_update
+        self.last_update = now
+        if dt <= 0.0:
+            return  # Frames handled in the same batch; inf * 0 would turn the state into NaN
+        # Integrate in steps of at most 1 ms so large gaps between requests stay stable
+        steps = max(1, min(1000, int(dt / 0.001) + 1))
+        for _ in range(steps):
+            self.step(dt / steps)
+
+    def step(self, dt):
+        mode = self.params[codec.RUN_MODE.index]
+        if not self.enabled:
+            command, acceleration = 0.0, math.inf
+        elif mode == codec.MODE_SPEED:
+            command = self.params[codec.SPEED_TARGET.index]
+            acceleration = self.params[codec.SPEED_ACCELERATION.index]
+        elif mode == codec.MODE_POSITION:
+            error = self.params[codec.POSITION_TARGET.index] - self.position
+            command = _clamp(self.position_gain * error, self.params[codec.POSITION_SPEED_LIMIT.index])
+            acceleration = self.params[codec.POSITION_ACCELERATION.index]
+        else:
+            command, acceleration = 0.0, math.inf
+        change = (command - self.velocity) * (1.0 - math.exp(-dt / self.tau))
+        self.velocity += _clamp(change, acceleration * dt)
+        self.position += self.velocity * dt
+
+    def read(self, index):
+        if index == codec.MECH_POS.index:
+            return self.position
+        if index == codec.MECH_VEL.index:
+            return self.velocity
+        return self.params.get(index, 0.0)
+
+    def write(self, index, value):
+        self.params[index] = value
+
+    def reset_position(self):
+        # Keep a position-mode target where it was relative to the motor, so zeroing does not cause a jump
+        self.params[codec.POSITION_TARGET.index] -= self.position
+        self.position = 0.0
+
+    def feedback_data(self):
+        return _FEEDBACK.pack(
+            _to_u16(self.position, POSITION_RANGE),
+            _to_u16(self.velocity, VELOCITY_RANGE),
+            _to_u16(0.0, TORQUE_RANGE),
+            int(self.temperature * 10),
+        )
+
+
+class VirtualBus:
+    """
+    Pseudo-terminal that speaks the USB-CAN adapter's "AT" framing on behalf of simulated motors.
+
+    Answers comm types 3, 4, 6 and 18 with a type 2 feedback frame and type 17 with the
+    parameter value, after `latency` plus up to `jitter` seconds. A fraction `loss` of the
+    incoming frames is dropped without being applied or answered. POSIX only (needs os.openpty).
+    """
+
+    def __init__(self, motor_ids=codec.ARM_MOTOR_IDS, latency=0.0002, jitter=0.0, loss=0.0, seed=None):
+        self.motors = {motor_id: SimMotor(motor_id) for motor_id in motor_ids}
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.random = random.Random(seed)
+        self.parser = FrameParser(capacity=65536)
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.outbox = []
+        self.frames_received = 0
+        self.frames_replied = 0
+        self.frames_lost = 0
+        self.unknown_motor = 0
+        self.on_frame = None  # Optional callback(frame) for benchmarks; frame.timestamp is the receive time
+        self._sequence = 0
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _serve(self):
+        while self._running:
+            now = time.monotonic()
+            timeout = 0.1
+            if self.outbox:
+                timeout = max(0.0, self.outbox[0][0] - now)
+            readable, _, _ = select.select([self.master], [], [], timeout)
+            if readable:
+                try:
+                    data = os.read(self.master, 65536)
+                except OSError:
+                    return
+                now = time.monotonic()
+                for frame in self.parser.feed(data, now):
+                    self._handle(frame, now)
+            self._flush(time.monotonic())
+
+    def _flush(self, now):
+        due = []
+        while self.outbox and self.outbox[0][0] <= now:
+            due.append(heapq.heappop(self.outbox)[2])
+        if due:
+            os.write(self.master, b''.join(due))
+            self.frames_replied += len(due)
+
+    def _reply(self, comm_type, status, motor_id, host_id, data, now):
+        raw_can_id = (comm_type << 24) | (status << 16) | (motor_id << 8) | host_id
+        frame = codec.FRAME_HEAD + codec.id_header(raw_can_id) + bytes([len(data)]) + data + codec.FRAME_TAIL
+        delay = self.latency + (self.random.uniform(0.0, self.jitter) if self.jitter else 0.0)
+        self._sequence += 1
+        heapq.heappush(self.outbox, (now + delay, self._sequence, frame))
+
+    def _handle(self, frame, now):
+        self.frames_received += 1
+        if self.on_frame is not None:
+            self.on_frame(frame)
+        if self.loss and self.random.random() < self.loss:
+            self.frames_lost += 1
+            return
+        # Host-to-motor frames carry the motor in bits 0-7 and the host in bits 8-15
+        motor_id = frame.can_id & 0xFF
+        host_id = (frame.can_id >> 8) & 0xFF
+        motor = self.motors.get(motor_id)
+        if motor is None:
+            self.unknown_motor += 1
+            return
+        motor.advance(now)
+
+        comm_type = frame.comm_type
+        if comm_type == codec.COMM_TYPE_READ:
+            param = codec.PARAMETERS.get(frame.index)
+            value_type = param.type if param is not None else codec.FLOAT
+            value = motor.read(frame.index)
+            if value_type != codec.FLOAT:
+                value = int(value)
+            data = frame.data[:4] + _VALUE[value_type].pack(value)
+            self._reply(codec.COMM_TYPE_READ, 0, motor_id, host_id, data, now)
+            return
+        if comm_type == codec.COMM_TYPE_ENABLE:
+            motor.enabled = True
+        elif comm_type == codec.COMM_TYPE_DISABLE:
+            motor.enabled = False
+        elif comm_type == codec.COMM_TYPE_RESET:
+            if frame.data[:1] == b'\x01':
+                motor.reset_position()
+        elif comm_type == codec.COMM_TYPE_WRITE:
+            try:
+                motor.write(frame.index, decode_value(frame))
+            except ValueError:
+                return  # Too short to carry a value; a real motor would not answer either
+        else:
+            return
+        mode = 2 if motor.enabled else 0  # Feedback mode field: 0 reset, 2 run
+        self._reply(codec.COMM_TYPE_FEEDBACK, mode << 6, motor_id, host_id, motor.feedback_data(), now)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Virtual RobStride motor bus on a pseudo-terminal")
+    parser.add_argument('--motors', default=','.join(str(motor_id) for motor_id in codec.ARM_MOTOR_IDS),
+                        help="comma-separated motor CAN IDs")
+    parser.add_argument('--latency', type=float, default=0.0002, help="reply latency in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random reply delay in seconds")
+    parser.add_argument('--loss', type=float, default=0.0, help="fraction of frames dropped")
+    parser.add_argument('--link', help="also expose the pty under this path (symlink)")
+    args = parser.parse_args()
+
+    bus = VirtualBus([int(motor_id) for motor_id in args.motors.split(',')],
+                     latency=args.latency, jitter=args.jitter, loss=args.loss)
+    port = bus.start()
+    if args.link:
+        if os.path.lexists(args.link):
+            os.remove(args.link)
+        os.symlink(port, args.link)
+        port = args.link
+    print(f"Virtual RobStride bus on {port} with motors {sorted(bus.motors)} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1.0)
+            print(f"received {bus.frames_received}, replied {bus.frames_replied}, lost {bus.frames_lost}")
+    except KeyboardInterrupt:
+        print("Exiting...")
+    finally:
+        bus.stop()
+        if args.link and os.path.islink(args.link):
+            os.remove(args.link)
+
+
+if __name__ == "__main__":
+    main()
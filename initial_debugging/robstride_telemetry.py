@@ -0,0 +1,275 @@
+import argparse
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+DEFAULT_NAME = "robstride_telemetry"
+DEFAULT_CAPACITY = 65536  # Samples kept in the ring; at 7 motors x 100 Hz about 90 s of history
+MAX_MOTORS = 256  # The latest table has one row per possible motor CAN ID
+MAGIC = 0x52535431  # "RST1"
+READ_TIMEOUT = 0.1  # Seconds a read waits for a writer that is mid-publish before giving up
+
+SAMPLE_DTYPE = np.dtype([('timestamp', 'f8'), ('motor_id', 'u1'), ('position', 'f4'), ('velocity', 'f4')],
+                        align=True)
+# sequence is the seqlock counter: odd while the writer is updating. head counts every sample
+# ever written, so sample k lives in ring slot k % capacity. writer_pid is the writing process.
+HEADER_DTYPE = np.dtype([('magic', 'u4'), ('capacity', 'u4'), ('sequence', 'u8'), ('head', 'u8'),
+                         ('writer_pid', 'u4')], align=True)
+HEADER_SIZE = 64
+
+
+def _layout(capacity):
+    latest_offset = HEADER_SIZE
+    ring_offset = latest_offset + MAX_MOTORS * SAMPLE_DTYPE.itemsize
+    return latest_offset, ring_offset, ring_offset + capacity * SAMPLE_DTYPE.itemsize
+
+
+def _process_alive(pid):
+    if os.name != 'posix':
+        # Windows frees a block once no process has it open, so an existing one is in use
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Exists, but belongs to another user
+    return True
+
+
+_written = set()  # Blocks created by a TelemetryWriter in this process
+
+
+def _attach(name):
+    """
+    Open an existing block without registering it with this process's resource tracker, which
+    would otherwise unlink it when a reader exits (track=False only exists from Python 3.13).
+    """
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name)
+        # A block this process writes stays registered, so that the writer's unlink() matches
+        if os.name == 'posix' and name not in _written:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+class _Segment:
+    """
+    NumPy views of the header, the latest-sample table and the ring inside one shared memory block.
+    """
+
+    def __init__(self, shm, capacity):
+        self.shm = shm
+        latest_offset, ring_offset, _ = _layout(capacity)
+        self.header = np.ndarray((), HEADER_DTYPE, buffer=shm.buf)
+        self.latest = np.ndarray((MAX_MOTORS,), SAMPLE_DTYPE, buffer=shm.buf, offset=latest_offset)
+        self.ring = np.ndarray((capacity,), SAMPLE_DTYPE, buffer=shm.buf, offset=ring_offset)
+        self.capacity = capacity
+
+    def release(self):
+        # The views must go before the block can be closed
+        del self.header, self.latest, self.ring
+        self.shm.close()
+
+
+def _remove_stale(name):
+    """
+    Unlink a telemetry block left behind by a writer that did not shut down cleanly. Raises
+    FileExistsError if the block belongs to a running writer or is not a telemetry buffer.
+    """
+    existing = _attach(name)
+    header = np.ndarray((), HEADER_DTYPE, buffer=existing.buf) if existing.size >= HEADER_SIZE else None
+    is_telemetry = header is not None and header['magic'] == MAGIC
+    pid = int(header['writer_pid']) if is_telemetry else None
+    del header
+    existing.close()
+    if not is_telemetry:
+        raise FileExistsError(f"shared memory block {name} exists and is not a telemetry buffer")
+    if _process_alive(pid):
+        raise FileExistsError(f"telemetry block {name} is in use by writer process {pid}")
+    # Opened with tracking this time, so that unlink() leaves the resource tracker consistent
+    stale = shared_memory.SharedMemory(name)
+    stale.close()
+    stale.unlink()
+
+
+class TelemetryWriter:
+    """
+    Single producer of the telemetry block: publishes decoded samples for any number of readers.
+
+    Each publish() is one seqlock write: the sequence turns odd, the samples go into the ring and
+    the latest table, head advances and the sequence turns even again. There must be only one
+    writer per block: a writer only replaces an existing block whose writer process is gone.
+    """
+
+    def __init__(self, name=DEFAULT_NAME, capacity=DEFAULT_CAPACITY):
+        size = _layout(capacity)[2]
+        try:
+            shm = shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            _remove_stale(name)
+            shm = shared_memory.SharedMemory(name, create=True, size=size)
+        self.name = name
+        _written.add(name)
+        self.segment = _Segment(shm, capacity)
+        self.segment.latest['motor_id'] = np.arange(MAX_MOTORS)
+        header = self.segment.header
+        header['capacity'] = capacity
+        header['sequence'] = 0
+        header['head'] = 0
+        header['writer_pid'] = os.getpid()
+        header['magic'] = MAGIC
+        self.samples_written = 0
+
+    def publish(self, samples):
+        """
+        Append samples, a SAMPLE_DTYPE array or a list of (timestamp, motor_id, position, velocity).
+        """
+        samples = np.asarray(samples, dtype=SAMPLE_DTYPE)
+        count = len(samples)
+        if not count:
+            return
+        segment = self.segment
+        header = segment.header
+        capacity = segment.capacity
+        if count > capacity:
+            samples = samples[-capacity:]
+        head = int(header['head'])
+        header['sequence'] += 1
+        # Sample k goes to slot k % capacity; a batch larger than the ring keeps only its tail
+        slots = (head + count - len(samples) + np.arange(len(samples))) % capacity
+        segment.ring[slots] = samples
+        # For a motor with several samples in the batch the last one wins, as with sequential writes
+        segment.latest[samples['motor_id']] = samples
+        header['head'] = head + count
+        header['sequence'] += 1
+        self.samples_written += count
+
+    def close(self):
+        shm = self.segment.shm
+        self.segment.release()
+        shm.unlink()
+        _written.discard(self.name)
+
+
+class TelemetryReader:
+    """
+    Reads the telemetry block of a TelemetryWriter in the same or another process.
+
+    Reads follow the seqlock protocol: copy the data between two loads of the sequence and
+    retry if the writer was active meanwhile, so a reader never sees a half-written batch and
+    never blocks the writer. Nothing goes through the bus or a pipe; the only copy is the
+    one of the requested rows. A read that cannot complete within READ_TIMEOUT (the writer
+    died mid-publish) raises TimeoutError.
+    """
+
+    def __init__(self, name=DEFAULT_NAME):
+        shm = _attach(name)
+        header = np.ndarray((), HEADER_DTYPE, buffer=shm.buf)
+        if header['magic'] != MAGIC:
+            del header
+            shm.close()
+            raise RuntimeError(f"shared memory block {name} is not a telemetry buffer")
+        capacity = int(header['capacity'])
+        del header
+        self.segment = _Segment(shm, capacity)
+        self.retries = 0
+        self.lost = 0
+        self.cursor = int(self.segment.header['head'])
+
+    def _read(self, copy):
+        header = self.segment.header
+        attempts = 0
+        deadline = None
+        while True:
+            sequence = int(header['sequence'])
+            if not sequence & 1:
+                result = copy(int(header['head']))
+                if int(header['sequence']) == sequence:
+                    return result
+            self.retries += 1
+            attempts += 1
+            # A publish takes microseconds: retry at once a few times, then back off. A sequence
+            # that stays odd means the writer died mid-publish.
+            if deadline is None:
+                deadline = time.monotonic() + READ_TIMEOUT
+            elif time.monotonic() >= deadline:
+                raise TimeoutError(f"telemetry writer did not finish an update within {READ_TIMEOUT} s")
+            time.sleep(0 if attempts < 100 else 0.0001)
+
+    def latest(self, motor_ids=None):
+        """
+        Latest sample of each motor that has published one, or of the given motor IDs.
+        """
+        table = self.segment.latest
+        if motor_ids is None:
+            return self._read(lambda head: table[table['timestamp'] > 0].copy())
+        rows = np.asarray(motor_ids, dtype=int)
+        return self._read(lambda head: table[rows].copy())
+
+    def history(self, count):
+        """
+        The last count samples in publish order (fewer if the ring does not hold that many yet).
+        """
+        return self._read(lambda head: self._rows(max(0, head - count), head))
+
+    def new_samples(self):
+        """
+        Samples published since the previous call (or since the reader was opened). If the
+        writer lapped the reader, the overwritten samples are skipped and counted in lost.
+        """
+        def copy(head):
+            start = max(self.cursor, head - self.segment.capacity)
+            return start, head, self._rows(start, head)
+
+        start, head, samples = self._read(copy)
+        self.lost += start - self.cursor
+        self.cursor = head
+        return samples
+
+    def _rows(self, start, end):
+        capacity = self.segment.capacity
+        start = max(start, end - capacity)
+        slots = np.arange(start, end) % capacity
+        return self.segment.ring[slots]
+
+    def close(self):
+        self.segment.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the motor state published by poll_arm.py --telemetry")
+    parser.add_argument('--name', default=DEFAULT_NAME, help="shared memory block name")
+    parser.add_argument('--interval', type=float, default=0.5, help="seconds between updates")
+    args = parser.parse_args()
+
+    try:
+        reader = TelemetryReader(args.name)
+    except FileNotFoundError:
+        print(f"No telemetry block {args.name}; start poll_arm.py --telemetry first.")
+        return
+    try:
+        while True:
+            time.sleep(args.interval)
+            samples = reader.new_samples()
+            now = time.monotonic()
+            for sample in reader.latest():
+                print(f"Motor {sample['motor_id']:>3}: position {sample['position']:8.4f} rad, "
+                      f"velocity {sample['velocity']:8.4f} rad/s, age {(now - sample['timestamp']) * 1000:6.1f} ms")
+            print(f"{len(samples) / args.interval:.0f} samples/s, {reader.lost} lost, {reader.retries} retries")
+    except TimeoutError as e:
+        print(e)
+    except KeyboardInterrupt:
+        print("Exiting...")
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
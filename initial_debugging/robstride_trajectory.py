@@ -0,0 +1,302 @@
+import argparse
+import asyncio
+import os
+import time
+from collections import deque, namedtuple
+
+import numpy as np
+import serial
+
+import robstride_codec as codec
+from robstride_parser import decode_value
+from robstride_scheduler import CAN_BITRATE, CAN_FRAME_BITS
+from robstride_transport import Transport
+
+
+# Setpoints sampled at a fixed rate: times has shape (n,), positions (n, motors)
+Trajectory = namedtuple('Trajectory', ['times', 'positions', 'motor_ids'])
+
+METHODS = ('linear', 'cubic', 'quintic')
+SERIAL_BITS_PER_BYTE = 10  # 8N1
+
+
+def waypoint_velocities(times, waypoints):
+    """
+    Velocity at each waypoint: the mean of the neighbouring slopes, zero at the ends and
+    wherever the path turns around, so the interpolation does not overshoot a waypoint.
+    """
+    slopes = np.diff(waypoints, axis=0) / np.diff(times)[:, None]
+    velocities = np.zeros_like(waypoints)
+    if len(slopes) > 1:
+        inner = 0.5 * (slopes[:-1] + slopes[1:])
+        inner[np.sign(slopes[:-1]) != np.sign(slopes[1:])] = 0.0
+        velocities[1:-1] = inner
+    return velocities
+
+
+def interpolate(times, waypoints, rate, method='cubic'):
+    """
+    Sample waypoints (shape (k, motors), reached at the k increasing `times`) at `rate` Hz.
+
+    linear joins the waypoints with straight segments; cubic is a Hermite spline through
+    them (continuous velocity); quintic also brings the acceleration to zero at every
+    waypoint. All motors are evaluated at once.
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}")
+    times = np.asarray(times, dtype=float)
+    waypoints = np.asarray(waypoints, dtype=float)
+    if waypoints.ndim == 1:
+        waypoints = waypoints[:, None]
+    count = int(np.floor((times[-1] - times[0]) * rate)) + 1
+    samples = times[0] + np.arange(count) / rate
+    if samples[-1] < times[-1]:
+        samples = np.append(samples, times[-1])
+
+    # Segment index and normalized time s in [0, 1] of every sample
+    segment = np.clip(np.searchsorted(times, samples, side='right') - 1, 0, len(times) - 2)
+    duration = times[segment + 1] - times[segment]
+    s = ((samples - times[segment]) / duration)[:, None]
+    p0 = waypoints[segment]
+    p1 = waypoints[segment + 1]
+    if method == 'linear':
+        return samples, p0 + s * (p1 - p0)
+
+    velocities = waypoint_velocities(times, waypoints)
+    h = duration[:, None]
+    v0 = velocities[segment] * h
+    v1 = velocities[segment + 1] * h
+    s2 = s * s
+    s3 = s2 * s
+    if method == 'cubic':
+        return samples, ((2 * s3 - 3 * s2 + 1) * p0 + (s3 - 2 * s2 + s) * v0
+                         + (-2 * s3 + 3 * s2) * p1 + (s3 - s2) * v1)
+    s4 = s3 * s
+    s5 = s4 * s
+    return samples, ((1 - 10 * s3 + 15 * s4 - 6 * s5) * p0 + (s - 6 * s3 + 8 * s4 - 3 * s5) * v0
+                     + (10 * s3 - 15 * s4 + 6 * s5) * p1 + (-4 * s3 + 7 * s4 - 3 * s5) * v1)
+
+
+def plan(motor_ids, times, waypoints, rate=250.0, method='cubic'):
+    samples, positions = interpolate(times, waypoints, rate, method)
+    return Trajectory(samples - samples[0], positions, list(motor_ids))
+
+
+def max_stream_rate(motor_count, baud_rate=921600, reads_per_tick=None):
+    """
+    Highest setpoint rate the serial link and the CAN bus can carry for motor_count motors,
+    with one position write and one MECH_POS read per motor per tick.
+    """
+    if reads_per_tick is None:
+        reads_per_tick = motor_count
+    frames = motor_count + reads_per_tick
+    serial_rate = baud_rate / (SERIAL_BITS_PER_BYTE * codec.FRAME_LENGTH * frames)
+    # Every request on the CAN bus is answered by one reply
+    can_rate = CAN_BITRATE / (CAN_FRAME_BITS * 2 * frames)
+    return min(serial_rate, can_rate)
+
+
+class TrajectoryExecutor:
+    """
+    Streams a Trajectory as POSITION_TARGET writes over one Transport.
+
+    Every tick sends the setpoint for the current time to all motors in one write, together
+    with a MECH_POS read per motor. Flow control: while `window` earlier ticks still wait for
+    their replies the link is treated as full and the tick is skipped, so the next one sends
+    the newest setpoint instead of a backlog of stale ones. Measured positions are compared
+    with the trajectory at the time they were read to give the tracking error.
+    """
+
+    def __init__(self, transport, window=2, timeout=0.05):
+        self.transport = transport
+        self.window = window
+        self.timeout = timeout
+        self.in_flight = deque()
+        self.ticks_sent = 0
+        self.ticks_skipped = 0
+        self.timeouts = 0
+        self.invalid_replies = 0  # MECH_POS replies too short to carry a value
+        self.measurements = []  # (time since start, motor column, position)
+
+    async def prepare(self, trajectory, acceleration=100.0, speed_margin=1.5, tolerance=0.01,
+                      settle_timeout=5.0):
+        """
+        Put the motors in position mode at the trajectory's first setpoint, with a speed limit
+        above the trajectory's peak speed so the host, not the motor, shapes the motion.
+
+        Returns once every motor's MECH_POS is within tolerance (rad) of the first setpoint, so
+        run() does not start with a jump. Raises TimeoutError if that takes longer than the
+        slowest motor's move at its speed limit plus settle_timeout s.
+        """
+        times, positions = trajectory.times, trajectory.positions
+        if len(times) > 1:
+            peak = np.abs(np.diff(positions, axis=0) / np.diff(times)[:, None]).max(axis=0)
+        else:
+            peak = np.zeros(positions.shape[1])
+        speeds = np.maximum(peak * speed_margin, 0.5)
+
+        entries = [(motor_id, codec.MECH_POS) for motor_id in trajectory.motor_ids]
+        start = await self.transport.read_many(entries, self.timeout, as_array=True)
+        # A full turn for a motor whose position could not be read
+        distance = np.where(start['ok'], np.abs(start['value'] - positions[0]), 2 * np.pi)
+        move_time = float((distance / speeds + speeds / acceleration).max())
+
+        await asyncio.gather(*(
+            self.transport.motor(motor_id).set_position(
+                float(positions[0, column]), speed=float(speeds[column]), max_acc=acceleration)
+            for column, motor_id in enumerate(trajectory.motor_ids)))
+
+        timeout = move_time + settle_timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            measured = await self.transport.read_many(entries, self.timeout, as_array=True)
+            away = ~measured['ok'] | (np.abs(measured['value'] - positions[0]) > tolerance)
+            if not away.any():
+                return
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"motors {measured['motor_id'][away].tolist()} did not reach the first "
+                                   f"setpoint within {timeout:.1f} s")
+            await asyncio.sleep(0.01)
+
+    def _batch(self, trajectory, row):
+        transport = self.transport
+        motor_ids = trajectory.motor_ids
+        host_can_id = transport.encoder.host_can_id
+        requests = [(codec.build_frame(codec.COMM_TYPE_WRITE, motor_id, codec.POSITION_TARGET,
+                                       float(trajectory.positions[row, column]), host_can_id),
+                     (codec.COMM_TYPE_FEEDBACK, motor_id, None))
+                    for column, motor_id in enumerate(motor_ids)]
+        requests += [(transport.encoder.read(motor_id, codec.MECH_POS),
+                      (codec.COMM_TYPE_READ, motor_id, codec.MECH_POS.index)) for motor_id in motor_ids]
+        return requests
+
+    async def _collect(self, futures, motor_count, started):
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        for column, frame in enumerate(results[motor_count:]):
+            if isinstance(frame, Exception):
+                self.timeouts += 1
+                continue
+            try:
+                position = decode_value(frame, codec.MECH_POS)
+            except ValueError:
+                self.invalid_replies += 1
+                continue
+            self.measurements.append((frame.timestamp - started, column, position))
+
+    async def run(self, trajectory, rate=None):
+        """
+        Stream the whole trajectory in real time and return the execution report.
+        """
+        times = trajectory.times
+        if rate is None:
+            rate = 1.0 / (times[1] - times[0]) if len(times) > 1 else 250.0
+        period = 1.0 / rate
+        motor_count = len(trajectory.motor_ids)
+        started = time.monotonic()
+        deadline = started
+        while True:
+            now = time.monotonic()
+            if now < deadline:
+                await asyncio.sleep(deadline - now)
+            elapsed = time.monotonic() - started
+            while self.in_flight and self.in_flight[0].done():
+                self.in_flight.popleft()
+            if len(self.in_flight) >= self.window:
+                self.ticks_skipped += 1
+            else:
+                row = min(int(np.searchsorted(times, elapsed, side='right')) - 1, len(times) - 1)
+                futures = self.transport.request_many(self._batch(trajectory, max(row, 0)), self.timeout)
+                self.in_flight.append(asyncio.ensure_future(self._collect(futures, motor_count, started)))
+                self.ticks_sent += 1
+            if elapsed >= times[-1]:
+                break
+            deadline += period
+            now = time.monotonic()
+            if now > deadline:
+                deadline += (int((now - deadline) / period) + 1) * period
+        await asyncio.gather(*self.in_flight)
+        return self.report(trajectory, time.monotonic() - started)
+
+    def tracking_error(self, trajectory):
+        """
+        Measured minus commanded position per motor column, as (times, columns, errors) arrays.
+        """
+        if not self.measurements:
+            return np.empty(0), np.empty(0, dtype=int), np.empty(0)
+        samples = np.array(self.measurements)
+        at, columns, measured = samples[:, 0], samples[:, 1].astype(int), samples[:, 2]
+        commanded = np.empty_like(measured)
+        for column in range(len(trajectory.motor_ids)):
+            mask = columns == column
+            commanded[mask] = np.interp(at[mask], trajectory.times, trajectory.positions[:, column])
+        return at, columns, measured - commanded
+
+    def report(self, trajectory, duration):
+        _, columns, errors = self.tracking_error(trajectory)
+        motors = {}
+        for column, motor_id in enumerate(trajectory.motor_ids):
+            error = errors[columns == column]
+            motors[motor_id] = {
+                'samples': int(error.size),
+                'rms_error': float(np.sqrt(np.mean(error ** 2))) if error.size else None,
+                'max_error': float(np.abs(error).max()) if error.size else None,
+            }
+        return {
+            'duration_s': duration,
+            'ticks_sent': self.ticks_sent,
+            'ticks_skipped': self.ticks_skipped,
+            'achieved_rate': self.ticks_sent / duration if duration > 0 else 0.0,
+            'timeouts': self.timeouts,
+            'invalid_replies': self.invalid_replies,
+            'motors': motors,
+        }
+
+
+async def execute(port, baud_rate, trajectory, rate):
+    async with Transport.open(port, baud_rate) as transport:
+        print(f"Opened {port} at {baud_rate} baud rate.")
+        executor = TrajectoryExecutor(transport)
+        await executor.prepare(trajectory)
+        report = await executor.run(trajectory, rate)
+    print(f"{report['ticks_sent']} ticks at {report['achieved_rate']:.0f} Hz, "
+          f"{report['ticks_skipped']} skipped for back-pressure, {report['timeouts']} timeouts")
+    for motor_id, entry in report['motors'].items():
+        if entry['samples']:
+            print(f"  motor {motor_id}: rms error {entry['rms_error']:.4f} rad, max {entry['max_error']:.4f} rad")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream an interpolated multi-joint trajectory to the motors")
+    parser.add_argument('--motors', default=','.join(str(motor_id) for motor_id in codec.ARM_MOTOR_IDS),
+                        help="comma-separated motor CAN IDs")
+    parser.add_argument('--waypoints', default="0,1,-0.5,0",
+                        help="comma-separated positions in rad, the same for every motor")
+    parser.add_argument('--segment', type=float, default=1.0, help="seconds between waypoints")
+    parser.add_argument('--rate', type=float, default=250.0, help="setpoint rate in Hz")
+    parser.add_argument('--method', choices=METHODS, default='cubic')
+    args = parser.parse_args()
+
+    motor_ids = [int(motor_id) for motor_id in args.motors.split(',')]
+    baud_rate = 921600
+    rate = args.rate
+    limit = max_stream_rate(len(motor_ids), baud_rate)
+    if rate > limit:
+        print(f"{rate:.0f} Hz does not fit on the link for {len(motor_ids)} motors; using {limit:.0f} Hz")
+        rate = limit
+    positions = [float(value) for value in args.waypoints.split(',')]
+    waypoints = np.repeat(np.array(positions)[:, None], len(motor_ids), axis=1)
+    trajectory = plan(motor_ids, np.arange(len(positions)) * args.segment, waypoints, rate, args.method)
+
+    port = os.environ.get("ROBSTRIDE_PORT", "COM7")
+    try:
+        asyncio.run(execute(port, baud_rate, trajectory, rate))
+    except serial.SerialException as e:
+        print(f"Serial error: {e}")
+    except TimeoutError as e:
+        print(e)
+    except KeyboardInterrupt:
+        print("Exiting...")
+
+
+if __name__ == "__main__":
+    main()
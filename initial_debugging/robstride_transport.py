@@ -0,0 +1,407 @@
+import asyncio
+import threading
+import time
+from collections import deque, namedtuple
+
+import robstride_codec as codec
+from robstride_broker import open_port
+from robstride_parser import FrameParser, decode_value
+
+
+DEFAULT_TIMEOUT = 0.05  # Seconds to wait for a reply before failing a request
+DEFAULT_WINDOW = 32  # Requests read_many/write_many keep in flight at once
+
+# Per-entry status of read_many/write_many
+OK = 'ok'
+TIMEOUT = 'timeout'
+SKIPPED = 'skipped'  # Write left out because the shadow already holds the value
+INVALID = 'invalid'  # Read answered by a reply too short to carry a value
+
+# Outcome of one read_many/write_many entry; value is None unless a read succeeded
+BulkResult = namedtuple('BulkResult', ['value', 'status', 'latency'])
+
+
+def run_on_serial(ser, func, *args):
+    """
+    Run `await func(transport, *args)` on a serial port the caller already has open and return
+    the result. The port stays open for the caller's own blocking reads and writes.
+    """
+    async def run():
+        transport = Transport(ser)
+        transport.start()
+        try:
+            return await func(transport, *args)
+        finally:
+            transport.stop()
+
+    # The reader thread only notices stop() between reads, so keep them short meanwhile
+    read_timeout = ser.timeout
+    ser.timeout = 0.05
+    try:
+        return asyncio.run(run())
+    finally:
+        ser.timeout = read_timeout
+
+
+def reply_key(frame):
+    """
+    Key used to match a received frame to the request waiting for it.
+    Parameter reads are answered with a type 17 frame carrying the same index; enable,
+    disable, reset and writes are answered with a type 2 feedback frame.
+    """
+    return (frame.comm_type, frame.motor_id, frame.index)
+
+
+class Transport:
+    """
+    Asyncio front end for the USB-CAN adapter.
+
+    A background thread blocks on the serial port and hands received bytes to the event loop,
+    where they are parsed and matched to pending requests by (comm type, motor ID, parameter
+    index). Requests for the same key are answered in the order they were sent, so any number
+    of reads across different motors can be in flight at once.
+    """
+
+    def __init__(self, ser, host_can_id=codec.HOST_CAN_ID, shadow=None, capture=None):
+        self.ser = ser
+        self.encoder = codec.FrameEncoder(host_can_id)
+        self.parser = FrameParser()
+        self.shadow = shadow
+        self.capture = capture  # Optional robstride_capture.CaptureWriter for both directions
+        self.pending = {}
+        self.listeners = []
+        if shadow is not None:
+            self.subscribe(shadow.observe)
+        if capture is not None:
+            self.subscribe(capture.observe)
+        self.frames_sent = 0
+        self.timeouts = 0
+        self.unmatched = 0
+        self._loop = None
+        self._thread = None
+        self._running = False
+
+    @classmethod
+    def open(cls, port, baud_rate=921600, **kwargs):
+        """
+        Open the adapter's serial port, or the broker's socket for a "unix:" port. The short read
+        timeout lets the reader thread notice close().
+        """
+        return cls(open_port(port, baud_rate, timeout=0.05), **kwargs)
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._running = True
+        self._thread = threading.Thread(target=self._read_serial, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.stop()
+        self.ser.close()
+
+    def stop(self):
+        """
+        Stop the reader thread and fail pending requests, leaving the serial port open.
+        """
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        for futures in self.pending.values():
+            for future in futures:
+                if not future.done():
+                    future.cancel()
+        self.pending.clear()
+
+    def subscribe(self, callback):
+        """
+        Call callback(frame) for every frame received, matched or not.
+        """
+        self.listeners.append(callback)
+
+    def motor(self, motor_id):
+        return Motor(self, motor_id)
+
+    def write(self, data, frame_count=1):
+        # Stamped before the write: the reader thread may stamp the reply before write() returns
+        sent_at = time.monotonic()
+        self.ser.write(data)
+        self.frames_sent += frame_count
+        if self.capture is not None:
+            self.capture.feed_tx(data, sent_at)
+
+    def request(self, frame, key, timeout=DEFAULT_TIMEOUT):
+        """
+        Send frame and return a future resolved with the first reply matching key.
+        The future fails with asyncio.TimeoutError if no reply arrives within timeout seconds.
+        """
+        future = self._expect(key, timeout)
+        self.write(frame)
+        return future
+
+    def expect(self, key, timeout=DEFAULT_TIMEOUT):
+        """
+        Return a future for the next reply matching key without sending anything, e.g. to take
+        the late reply to a request that already timed out before it can answer a newer one.
+        """
+        return self._expect(key, timeout)
+
+    def request_many(self, requests, timeout=DEFAULT_TIMEOUT):
+        """
+        Send several (frame, key) requests in a single write and return their futures in order.
+        Frames must be independent bytes objects, not the encoder's reusable write buffer.
+        """
+        futures = [self._expect(key, timeout) for _, key in requests]
+        self.write(b''.join(frame for frame, _ in requests), len(requests))
+        return futures
+
+    async def pipeline(self, requests, timeout=DEFAULT_TIMEOUT, window=DEFAULT_WINDOW):
+        """
+        Send (frame, key) requests keeping up to `window` of them in flight, starting the next
+        one as soon as any reply arrives. Returns (frame or exception, sent time) in request order.
+        Requests cut off by stop(), and any not yet sent, get a ConnectionAbortedError.
+        """
+        results = [None] * len(requests)
+        sent_at = [None] * len(requests)
+        index_of = {}
+        next_index = 0
+
+        def launch(count):
+            nonlocal next_index
+            batch = requests[next_index:next_index + count]
+            now = time.monotonic()
+            for offset, future in enumerate(self.request_many(batch, timeout)):
+                index_of[future] = next_index + offset
+                sent_at[next_index + offset] = now
+            next_index += len(batch)
+
+        launch(window)
+        while index_of:
+            done, _ = await asyncio.wait(list(index_of), return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                index = index_of.pop(future)
+                if future.cancelled():
+                    results[index] = ConnectionAbortedError("transport stopped before the reply arrived")
+                else:
+                    results[index] = future.exception() or future.result()
+            if self._running:
+                launch(len(done))
+        for index in range(next_index, len(requests)):
+            results[index] = ConnectionAbortedError("transport stopped before the request was sent")
+        return list(zip(results, sent_at))
+
+    async def read_many(self, entries, timeout=DEFAULT_TIMEOUT, window=DEFAULT_WINDOW, as_array=False):
+        """
+        Read [(motor_id, param)] pipelined on the link.
+
+        Returns {(motor_id, param.name): BulkResult}, or with as_array=True a NumPy structured
+        array with one row per entry (motor_id, index, value, ok, latency) in entry order.
+        A reply too short to carry a value gets status INVALID.
+        Raises ValueError if a (motor_id, param) pair appears more than once.
+        """
+        self._check_unique(entries)
+        requests = [(self.encoder.read(motor_id, param), (codec.COMM_TYPE_READ, motor_id, param.index))
+                    for motor_id, param in entries]
+        results = []
+        for (motor_id, param), (frame, sent_at) in zip(entries, await self.pipeline(requests, timeout, window)):
+            if isinstance(frame, Exception):
+                results.append(BulkResult(None, TIMEOUT, None))
+                continue
+            try:
+                value = decode_value(frame, param)
+            except ValueError:
+                results.append(BulkResult(None, INVALID, frame.timestamp - sent_at))
+                continue
+            if self.shadow is not None:
+                self.shadow.record_read(motor_id, param, value, frame.timestamp)
+            results.append(BulkResult(value, OK, frame.timestamp - sent_at))
+        return self._bulk_output(entries, results, as_array)
+
+    async def write_many(self, entries, timeout=DEFAULT_TIMEOUT, window=DEFAULT_WINDOW, force=False,
+                         as_array=False):
+        """
+        Write [(motor_id, param, value)] pipelined on the link, in entry order.
+
+        With a shadow, unchanged values are not sent (status SKIPPED) unless force is set.
+        Returns the same shapes as read_many; value is None for writes. Raises ValueError if a
+        (motor_id, param) pair appears more than once.
+        """
+        self._check_unique(entries)
+        shadow = self.shadow
+        requests = []
+        sent = []
+        results = [BulkResult(None, SKIPPED, None)] * len(entries)
+        for position, (motor_id, param, value) in enumerate(entries):
+            if shadow is not None and not force and not shadow.needs_write(motor_id, param, value):
+                continue
+            requests.append((codec.build_frame(codec.COMM_TYPE_WRITE, motor_id, param, value,
+                                               self.encoder.host_can_id),
+                             (codec.COMM_TYPE_FEEDBACK, motor_id, None)))
+            sent.append(position)
+        for position, (frame, sent_at) in zip(sent, await self.pipeline(requests, timeout, window)):
+            if isinstance(frame, Exception):
+                results[position] = BulkResult(None, TIMEOUT, None)
+                continue
+            motor_id, param, value = entries[position]
+            if shadow is not None:
+                shadow.record_write(motor_id, param, value)
+            results[position] = BulkResult(None, OK, frame.timestamp - sent_at)
+        return self._bulk_output([entry[:2] for entry in entries], results, as_array)
+
+    @staticmethod
+    def _check_unique(entries):
+        # Results are keyed by (motor_id, param), so a repeated pair would lose a result
+        seen = set()
+        for motor_id, param, *_ in entries:
+            if (motor_id, param.index) in seen:
+                raise ValueError(f"{param.name} of motor {motor_id} appears more than once")
+            seen.add((motor_id, param.index))
+
+    @staticmethod
+    def _bulk_output(entries, results, as_array):
+        if not as_array:
+            return {(motor_id, param.name): result for (motor_id, param), result in zip(entries, results)}
+        # NumPy is only needed by callers that ask for an array
+        import numpy as np
+        array = np.zeros(len(entries), dtype=[('motor_id', 'u1'), ('index', 'u2'), ('value', 'f8'),
+                                              ('ok', '?'), ('latency', 'f8')])
+        for row, ((motor_id, param), result) in enumerate(zip(entries, results)):
+            array[row] = (motor_id, param.index,
+                          result.value if result.value is not None else np.nan,
+                          result.status in (OK, SKIPPED),
+                          result.latency if result.latency is not None else np.nan)
+        return array
+
+    def _expect(self, key, timeout):
+        future = self._loop.create_future()
+        self.pending.setdefault(key, deque()).append(future)
+        timer = self._loop.call_later(timeout, self._expire, key, future)
+        future.add_done_callback(lambda _: timer.cancel())
+        return future
+
+    def _expire(self, key, future):
+        if future.done():
+            return
+        self.timeouts += 1
+        futures = self.pending.get(key)
+        if futures is not None:
+            futures.remove(future)
+            if not futures:
+                del self.pending[key]
+        future.set_exception(asyncio.TimeoutError(f"No reply for {key} after timeout"))
+
+    def _read_serial(self):
+        while self._running:
+            try:
+                data = self.ser.read(self.ser.in_waiting or 1)
+            except OSError:
+                # Port closed underneath the thread
+                break
+            if data:
+                self._loop.call_soon_threadsafe(self._on_data, data, time.monotonic())
+
+    def _on_data(self, data, timestamp):
+        for frame in self.parser.feed(data, timestamp):
+            key = reply_key(frame)
+            futures = self.pending.get(key)
+            if futures:
+                future = futures.popleft()
+                if not futures:
+                    del self.pending[key]
+                future.set_result(frame)
+            else:
+                self.unmatched += 1
+            for listener in self.listeners:
+                listener(frame)
+
+
+class Motor:
+    """
+    Per-motor view of a Transport. Every call resolves as soon as the motor's reply is parsed.
+
+    When the transport has a ParameterShadow, writes of unchanged values, enables of a motor
+    that is already enabled and reads younger than the shadow's TTL never reach the bus;
+    those calls return None (or the cached value for reads) immediately.
+    """
+
+    def __init__(self, transport, motor_id):
+        self.transport = transport
+        self.motor_id = motor_id
+
+    def _feedback_key(self):
+        return (codec.COMM_TYPE_FEEDBACK, self.motor_id, None)
+
+    async def read(self, param, timeout=DEFAULT_TIMEOUT):
+        shadow = self.transport.shadow
+        if shadow is not None:
+            value = shadow.cached_read(self.motor_id, param)
+            if value is not None:
+                return value
+        frame = await self.transport.request(
+            self.transport.encoder.read(self.motor_id, param),
+            (codec.COMM_TYPE_READ, self.motor_id, param.index), timeout)
+        value = decode_value(frame, param)
+        if shadow is not None:
+            shadow.record_read(self.motor_id, param, value, frame.timestamp)
+        return value
+
+    async def write(self, param, value, timeout=DEFAULT_TIMEOUT, force=False):
+        shadow = self.transport.shadow
+        if shadow is not None and not force and not shadow.needs_write(self.motor_id, param, value):
+            return None
+        frame = await self.transport.request(
+            self.transport.encoder.write(self.motor_id, param, value), self._feedback_key(), timeout)
+        if shadow is not None:
+            shadow.record_write(self.motor_id, param, value)
+        return frame
+
+    async def enable(self, timeout=DEFAULT_TIMEOUT, force=False):
+        shadow = self.transport.shadow
+        if shadow is not None and not force and shadow.is_enabled(self.motor_id):
+            return None
+        frame = await self.transport.request(
+            self.transport.encoder.enable(self.motor_id), self._feedback_key(), timeout)
+        if shadow is not None:
+            shadow.on_enable(self.motor_id)
+        return frame
+
+    async def disable(self, timeout=DEFAULT_TIMEOUT):
+        # Always sent, and the shadow is dropped first so a lost reply cannot leave stale state
+        if self.transport.shadow is not None:
+            self.transport.shadow.on_disable(self.motor_id)
+        return await self.transport.request(
+            self.transport.encoder.disable(self.motor_id), self._feedback_key(), timeout)
+
+    async def reset_position(self, timeout=DEFAULT_TIMEOUT):
+        if self.transport.shadow is not None:
+            self.transport.shadow.on_reset(self.motor_id)
+        return await self.transport.request(
+            self.transport.encoder.reset_position(self.motor_id), self._feedback_key(), timeout)
+
+    async def set_velocity(self, velocity, max_acc=codec.DEFAULT_MAX_ACC, max_current=codec.DEFAULT_MAX_CURRENT):
+        """
+        Same sequence as Motor::setVelocity in RobstrideControl.h.
+        """
+        await self.write(codec.RUN_MODE, codec.MODE_SPEED)
+        await self.enable()
+        await self.write(codec.SPEED_MAX_CURRENT, max_current)
+        await self.write(codec.SPEED_ACCELERATION, max_acc)
+        await self.write(codec.SPEED_TARGET, velocity)
+
+    async def set_position(self, position, speed=codec.DEFAULT_SPEED, max_acc=codec.DEFAULT_MAX_ACC):
+        """
+        Same sequence as Motor::setPosition in RobstrideControl.h, without the shortest-path remapping.
+        """
+        await self.write(codec.RUN_MODE, codec.MODE_POSITION)
+        await self.enable()
+        await self.write(codec.POSITION_SPEED_LIMIT, speed)
+        await self.write(codec.POSITION_03_SPEED, speed)
+        await self.write(codec.POSITION_ACCELERATION, max_acc)
+        await self.write(codec.POSITION_TARGET, position)
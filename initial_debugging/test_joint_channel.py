@@ -0,0 +1,82 @@
+import os
+import time
+
+import pytest
+import serial
+
+from arduino_stub import ArduinoStub
+from joint_channel import CommandChannel
+
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'openpty'), reason="ArduinoStub needs a pty")
+
+
+def run_until_idle(channel, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not channel.idle() and time.monotonic() < deadline:
+        channel.poll()
+        time.sleep(0.001)
+    return channel.idle()
+
+
+@pytest.fixture
+def make_stub():
+    stubs = []
+
+    def make(**kwargs):
+        stub = ArduinoStub(**kwargs)
+        stubs.append(stub)
+        return stub
+
+    yield make
+    for stub in stubs:
+        stub.close()
+
+
+def open_channel(stub, **kwargs):
+    ser = serial.Serial(stub.start(), 115200, timeout=0)
+    return ser, CommandChannel(ser, **kwargs)
+
+
+def test_lossy_link_delivers_final_commands(make_stub):
+    stub = make_stub(ack_delay=0.0, loss=0.2, seed=1)
+    ser, channel = open_channel(stub, ack_timeout=0.05, retry_limit=8)
+    actions = ("FWD", "STOP", "REV", "STOP")
+    final = {}
+    try:
+        for i in range(350):
+            joint = f"J{i % 7 + 1}"
+            command = f"{joint}_{actions[(i // 7) % len(actions)]}"
+            channel.send(command, key=joint)
+            final[joint] = command
+            channel.poll()
+        assert run_until_idle(channel)
+    finally:
+        ser.close()
+
+    assert stub.dropped > 0
+    assert channel.retransmits > 0
+    assert channel.failed == 0
+    # The last line the sketch saw for every joint is that joint's final command
+    last_received = {}
+    for line in stub.received:
+        command = line.partition('#')[0]
+        last_received[command.partition('_')[0]] = command
+    assert last_received == final
+
+
+def test_error_reply_fails_command_without_retry(make_stub):
+    stub = make_stub(ack_delay=0.0)
+    ser, channel = open_channel(stub, ack_timeout=0.05)
+    try:
+        channel.send("J9_FWD")
+        channel.send("J1_FWD")
+        assert run_until_idle(channel, timeout=1.0)
+    finally:
+        ser.close()
+
+    assert channel.rejected == 1
+    assert channel.failed == 1
+    assert channel.acked == 1
+    assert channel.retransmits == 0
+    assert [line.partition('#')[0] for line in stub.received] == ["J9_FWD", "J1_FWD"]
@@ -0,0 +1,62 @@
+import struct
+
+import numpy as np
+
+import robstride_codec as codec
+from robstride_analysis import load, request_latency, velocity_from_position
+from robstride_capture import RX, TX, CaptureWriter
+
+
+MOTOR = 21
+
+
+def read_request(motor_id, param):
+    return codec.can_id(codec.COMM_TYPE_READ, codec.HOST_CAN_ID, motor_id), struct.pack('>H6x', param.index)
+
+
+def read_reply(motor_id, param, value):
+    can_id = (codec.COMM_TYPE_READ << 24) | (motor_id << 8) | codec.HOST_CAN_ID
+    return can_id, struct.pack('>H2x', param.index) + struct.pack('<f', value)
+
+
+def write_capture(path, events):
+    """
+    events: (time, direction, value) for MECH_POS reads of MOTOR; value is ignored for requests.
+    """
+    writer = CaptureWriter(str(path))
+    for timestamp, direction, value in events:
+        if direction == TX:
+            can_id, data = read_request(MOTOR, codec.MECH_POS)
+        else:
+            can_id, data = read_reply(MOTOR, codec.MECH_POS, value)
+        writer.record(direction, can_id, data, timestamp)
+    writer.close()
+    return load(str(path))
+
+
+def test_request_latency_matches_replies_in_order(tmp_path):
+    events = [
+        # A reply from before the capture started, with no request in it
+        (0.9995, RX, 0.0),
+        # Two cycles whose replies both arrive after the next request was sent
+        (1.000, TX, 0), (1.010, TX, 0), (1.0102, RX, 0.0), (1.0110, RX, 0.0),
+        # A lost reply, then a normal cycle
+        (1.020, TX, 0), (3.000, TX, 0), (3.0008, RX, 0.0),
+    ]
+    decoded = write_capture(tmp_path / 'latency.cap', events)
+    latencies = request_latency(decoded)[(MOTOR, codec.MECH_POS.index)]
+    np.testing.assert_allclose(latencies, [0.0102, 0.0010, 0.0008], atol=1e-6)
+
+
+def test_velocity_from_position_merges_shared_timestamps():
+    # Samples parsed from one serial read share a time
+    times = np.array([0.0, 0.01, 0.01, 0.02, 0.03, 0.03])
+    positions = 2.0 * times
+    with np.errstate(all='raise'):
+        velocity = velocity_from_position(times, positions)
+    assert velocity.shape == times.shape
+    np.testing.assert_allclose(velocity, 2.0)
+
+
+def test_velocity_from_position_single_time():
+    np.testing.assert_array_equal(velocity_from_position(np.array([1.0, 1.0]), np.array([0.5, 0.7])), [0.0, 0.0])
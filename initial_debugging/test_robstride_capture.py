@@ -0,0 +1,80 @@
+import random
+
+import numpy as np
+import pytest
+
+import robstride_codec as codec
+from robstride_capture import INDEX, RX, TX, CaptureReader, CaptureWriter, encode, replay
+
+
+def capture_frames(path, count, index_interval=16, seed=0):
+    """
+    Record `count` read requests and replies, each reply recorded a little after a later
+    request as the transport does, and return them as (timestamp, direction, can_id, data).
+    """
+    rng = random.Random(seed)
+    writer = CaptureWriter(str(path), index_interval=index_interval)
+    frames = []
+    for i in range(count):
+        sent = 10.0 + i * 0.001
+        request = (sent, TX, codec.can_id(codec.COMM_TYPE_READ, codec.HOST_CAN_ID, 21),
+                   bytes([0x19, 0x70]) + bytes(6))
+        reply = (sent + rng.uniform(0.0001, 0.003), RX, (codec.COMM_TYPE_READ << 24) | (21 << 8) | codec.HOST_CAN_ID,
+                 bytes([0x19, 0x70, 0, 0]) + np.float32(i).tobytes())
+        frames += [request, reply]
+    # Recorded in the order they would be seen, not in time order
+    recorded = sorted(frames, key=lambda frame: frame[0] if frame[1] == TX else frame[0] + 0.002)
+    for timestamp, direction, can_id, data in recorded:
+        writer.record(direction, can_id, data, timestamp)
+    writer.close()
+    return sorted(frames, key=lambda frame: frame[0])
+
+
+def test_round_trip_keeps_true_timestamps_in_order(tmp_path):
+    frames = capture_frames(tmp_path / 'round.cap', 500)
+    reader = CaptureReader(str(tmp_path / 'round.cap'))
+    assert len(reader) == len(frames)
+    records = reader.between()
+    assert list(records['timestamp']) == [int(frame[0] * 1e9) for frame in frames]
+    assert list(records['direction']) == [frame[1] for frame in frames]
+    assert list(records['can_id']) == [frame[2] for frame in frames]
+    assert [bytes(data) for data in records['data']] == [frame[3] for frame in frames]
+    # Index records every index_interval frames, numbered by the frames before them
+    assert np.all(reader.index['direction'] == INDEX)
+    assert list(reader.index['data'][:, 0].astype(int) + (reader.index['data'][:, 1].astype(int) << 8)) == \
+        list(range(0, len(frames), reader.index_interval))
+
+
+@pytest.mark.parametrize('start, end', [(None, None), (10.0, 10.1), (10.2505, 10.3), (9.0, 10.0001),
+                                        (10.499, 20.0), (11.0, 12.0)])
+def test_between_and_seek(tmp_path, start, end):
+    frames = capture_frames(tmp_path / 'seek.cap', 500)
+    reader = CaptureReader(str(tmp_path / 'seek.cap'))
+    records = reader.between(start, end)
+    start_ns = int(start * 1e9) if start is not None else 0
+    end_ns = int(end * 1e9) if end is not None else 2 ** 63
+    expected = [int(frame[0] * 1e9) for frame in frames if start_ns <= int(frame[0] * 1e9) < end_ns]
+    assert list(records['timestamp']) == expected
+
+
+def test_time_range_and_replay(tmp_path):
+    frames = capture_frames(tmp_path / 'replay.cap', 50)
+    reader = CaptureReader(str(tmp_path / 'replay.cap'))
+    first, last = reader.time_range()
+    assert first == pytest.approx(frames[0][0])
+    assert last == pytest.approx(frames[-1][0])
+    record = reader.between()[1]
+    assert encode(record)[:2] == codec.FRAME_HEAD and encode(record)[-2:] == codec.FRAME_TAIL
+
+    replayed = []
+    replay(reader, replayed.append, speed=0)
+    replies = [frame for frame in frames if frame[1] == RX]
+    assert [frame.timestamp for frame in replayed] == pytest.approx([frame[0] for frame in replies])
+    assert [frame.data for frame in replayed] == [frame[3] for frame in replies]
+
+
+def test_empty_capture(tmp_path):
+    CaptureWriter(str(tmp_path / 'empty.cap')).close()
+    reader = CaptureReader(str(tmp_path / 'empty.cap'))
+    assert len(reader) == 0
+    assert reader.time_range() == (None, None)
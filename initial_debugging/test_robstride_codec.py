@@ -0,0 +1,81 @@
+import struct
+
+import pytest
+
+import robstride_codec as codec
+
+
+# build_command as the scripts had it before robstride_codec, kept as the reference encoding
+def baseline_extended_header(comm_type, host_can_id, motor_can_id):
+    binary = f'{comm_type:08b}{0:08b}{host_can_id:08b}{motor_can_id:08b}'
+    binary = binary + '100'
+    binary = binary[3:]
+    hex_value = f'{int(binary, 2):08x}'
+    return [int(hex_value[i:i+2], 16) for i in range(0, len(hex_value), 2)]
+
+
+def baseline_command(comm_type, param_index, value=None, motor_can_id=127, mode=0x01):
+    header = [0x41, 0x54]
+    tail = [0x0D, 0x0A]
+    extended_header = baseline_extended_header(comm_type, 253, motor_can_id)
+    data_length = [0x08]
+    if comm_type == 18:
+        param_index_bytes = [int(param_index[:2], 16), int(param_index[2:], 16)]
+        if value is not None:
+            ieee_value = struct.pack('<f', value).hex()
+            value_bytes = [int(ieee_value[i:i+2], 16) for i in range(0, len(ieee_value), 2)]
+            data_area = param_index_bytes + [0x00, 0x00] + value_bytes
+        else:
+            data_area = param_index_bytes + [0x00, 0x00, mode, 0x00, 0x00, 0x00]
+    elif comm_type == 6:
+        data_area = [0x01, 0x00] + [0x00] * 6
+    elif comm_type == 17:
+        param_index_bytes = [int(param_index[:2], 16), int(param_index[2:], 16)]
+        data_area = param_index_bytes + [0x00] * 6
+    else:
+        data_area = [0x00] * 8
+    return bytes(header + extended_header + data_length + data_area + tail)
+
+
+MOTOR_IDS = [1, 21, 127]
+FLOAT_PARAMS = [codec.SPEED_MAX_CURRENT, codec.SPEED_TARGET, codec.POSITION_SPEED_LIMIT,
+                codec.POSITION_TARGET, codec.SPEED_ACCELERATION, codec.POSITION_ACCELERATION]
+VALUES = [0.0, 1.0, -3.14159, 23.0, 44.0, -44.0, 1e-3]
+
+
+@pytest.mark.parametrize('motor_id', MOTOR_IDS)
+@pytest.mark.parametrize('param', FLOAT_PARAMS, ids=lambda param: param.name)
+@pytest.mark.parametrize('value', VALUES)
+def test_float_write_matches_baseline(motor_id, param, value):
+    expected = baseline_command(18, f'{param.index:04x}', value, motor_id)
+    assert codec.build_frame(codec.COMM_TYPE_WRITE, motor_id, param, value) == expected
+    assert bytes(codec.FrameEncoder().write(motor_id, param, value)) == expected
+
+
+@pytest.mark.parametrize('motor_id', MOTOR_IDS)
+@pytest.mark.parametrize('mode', [codec.MODE_POSITION, codec.MODE_SPEED])
+def test_run_mode_write_matches_baseline(motor_id, mode):
+    expected = baseline_command(18, '0570', None, motor_id, mode=mode)
+    assert codec.build_frame(codec.COMM_TYPE_WRITE, motor_id, codec.RUN_MODE, mode) == expected
+
+
+@pytest.mark.parametrize('motor_id', MOTOR_IDS)
+@pytest.mark.parametrize('param', [codec.MECH_POS, codec.MECH_VEL, codec.RUN_MODE], ids=lambda param: param.name)
+def test_read_matches_baseline(motor_id, param):
+    expected = baseline_command(17, f'{param.index:04x}', motor_can_id=motor_id)
+    assert codec.FrameEncoder().read(motor_id, param) == expected
+
+
+@pytest.mark.parametrize('motor_id', MOTOR_IDS)
+def test_static_commands_match_baseline(motor_id):
+    encoder = codec.FrameEncoder()
+    assert encoder.enable(motor_id) == baseline_command(3, None, motor_can_id=motor_id)
+    assert encoder.disable(motor_id) == baseline_command(4, None, motor_can_id=motor_id)
+    assert encoder.reset_position(motor_id) == baseline_command(6, None, motor_can_id=motor_id)
+
+
+def test_pack_write_into_batches_frames():
+    buffer = bytearray(2 * codec.FRAME_LENGTH)
+    codec.pack_write_into(buffer, 0, 21, codec.POSITION_TARGET, 1.5)
+    codec.pack_write_into(buffer, codec.FRAME_LENGTH, 22, codec.POSITION_TARGET, -1.5)
+    assert bytes(buffer) == (baseline_command(18, '1670', 1.5, 21) + baseline_command(18, '1670', -1.5, 22))
@@ -0,0 +1,77 @@
+import random
+import struct
+
+import pytest
+
+import robstride_codec as codec
+from robstride_parser import FrameParser, decode_value
+
+
+def read_reply(motor_id, param, value):
+    raw_can_id = (codec.COMM_TYPE_READ << 24) | (motor_id << 8) | codec.HOST_CAN_ID
+    data = struct.pack('>H2x', param.index) + struct.pack('<f', value)
+    return codec.FRAME_HEAD + codec.id_header(raw_can_id) + bytes([len(data)]) + data + codec.FRAME_TAIL
+
+
+def replies(count):
+    return [(21 + i % 7, [codec.MECH_POS, codec.MECH_VEL][i % 2], float(i)) for i in range(count)]
+
+
+def feed_in_chunks(parser, stream, rng, max_chunk):
+    frames = []
+    pos = 0
+    while pos < len(stream):
+        size = rng.randint(1, max_chunk)
+        frames += parser.feed(stream[pos:pos + size], 0.0)
+        pos += size
+    return frames
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_chunking(seed):
+    rng = random.Random(seed)
+    expected = replies(200)
+    stream = b''.join(read_reply(*reply) for reply in expected)
+    parser = FrameParser()
+    frames = feed_in_chunks(parser, stream, rng, 40)
+    assert [(frame.motor_id, frame.index, decode_value(frame)) for frame in frames] == \
+        [(motor_id, param.index, value) for motor_id, param, value in expected]
+    assert parser.dropped_bytes == 0
+    assert parser.pending() == 0
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_garbage_between_frames(seed):
+    rng = random.Random(seed)
+    expected = replies(200)
+    stream = bytearray()
+    for reply in expected:
+        # Noise that never contains a whole frame: random bytes, stray "A"s and broken frames
+        noise = rng.choice([
+            b'',
+            bytes(rng.randrange(256) for _ in range(rng.randint(1, 12))).replace(b'AT', b'xx'),
+            b'A',
+            b'AT\x00\x00',
+            read_reply(*reply)[:-3] + b'\x00\x00',  # Tail missing
+        ])
+        stream += noise + read_reply(*reply)
+    parser = FrameParser()
+    frames = feed_in_chunks(parser, bytes(stream), rng, 64)
+    assert [(frame.motor_id, frame.index, decode_value(frame)) for frame in frames] == \
+        [(motor_id, param.index, value) for motor_id, param, value in expected]
+
+
+def test_overflow_keeps_newest_bytes():
+    parser = FrameParser(capacity=64)
+    frames = parser.feed(b'\x00' * 1000 + read_reply(21, codec.MECH_POS, 1.5), 0.0)
+    assert [decode_value(frame) for frame in frames] == [1.5]
+    assert parser.dropped_bytes == 1000
+
+
+def test_decode_value_rejects_short_reply():
+    raw_can_id = (codec.COMM_TYPE_READ << 24) | (21 << 8) | codec.HOST_CAN_ID
+    data = struct.pack('>H2x', codec.MECH_POS.index)
+    stream = codec.FRAME_HEAD + codec.id_header(raw_can_id) + bytes([len(data)]) + data + codec.FRAME_TAIL
+    frame, = FrameParser().feed(stream, 0.0)
+    with pytest.raises(ValueError):
+        decode_value(frame)
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from robstride_planner import PROFILES, SCURVE, TRAPEZOID, plan_moves, sample_move
+
+
+RATE = 10000.0  # Hz, fine enough to check speed and acceleration by finite differences
+
+
+def random_moves(seed, count=20, joints=6):
+    rng = np.random.default_rng(seed)
+    start = rng.uniform(-3.0, 3.0, (count, joints))
+    goal = rng.uniform(-3.0, 3.0, (count, joints))
+    max_speed = rng.uniform(0.5, 10.0, joints)
+    max_acc = rng.uniform(1.0, 50.0, joints)
+    return start, goal, max_speed, max_acc
+
+
+@pytest.mark.parametrize('profile', PROFILES)
+@pytest.mark.parametrize('seed', range(5))
+def test_limits_and_synchronization(profile, seed):
+    start, goal, max_speed, max_acc = random_moves(seed)
+    plan = plan_moves(start, goal, max_speed, max_acc, profile)
+    assert np.all(plan.speed <= max_speed * (1 + 1e-9))
+    assert np.all(plan.acceleration <= max_acc * (1 + 1e-9))
+    # At least one joint is at one of its limits, or the move would not be the shortest
+    at_limit = np.isclose(plan.speed, max_speed) | np.isclose(plan.acceleration, max_acc)
+    assert np.all(at_limit.any(axis=1))
+    # Every joint covers its distance in the shared duration; both ramps average half the cruise speed
+    covered = plan.speed * (plan.duration - plan.accel_time)[:, None]
+    np.testing.assert_allclose(covered, np.abs(goal - start), rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize('profile', PROFILES)
+def test_sampled_move_stays_within_limits(profile):
+    start, goal, max_speed, max_acc = random_moves(7, count=3)
+    plan = plan_moves(start, goal, max_speed, max_acc, profile)
+    for index in range(3):
+        t, positions = sample_move(plan, index, RATE)
+        assert t[-1] == pytest.approx(plan.duration[index])
+        np.testing.assert_allclose(positions[0], start[index])
+        np.testing.assert_allclose(positions[-1], goal[index])
+        dt = 1.0 / RATE
+        velocity = np.diff(positions[:-1], axis=0) / dt
+        acceleration = np.diff(velocity, axis=0) / dt
+        assert np.all(np.abs(velocity).max(axis=0) <= max_speed * 1.001)
+        assert np.all(np.abs(acceleration).max(axis=0) <= max_acc * 1.01)
+        # All joints are the same fraction of the way at every sample: a straight line in joint space
+        moving = np.abs(goal[index] - start[index]) > 1e-9
+        fraction = (positions[:, moving] - start[index, moving]) / (goal[index, moving] - start[index, moving])
+        np.testing.assert_allclose(fraction, fraction[:, :1].repeat(moving.sum(), axis=1), atol=1e-9)
+
+
+def test_short_move_does_not_reach_cruise_speed():
+    plan = plan_moves([0.0], [0.1], max_speed=10.0, max_acc=10.0)
+    # Triangle profile: accelerate for half the move, decelerate for the other half
+    assert plan.accel_time[0] == pytest.approx(0.1)
+    assert plan.duration[0] == pytest.approx(0.2)
+    assert plan.speed[0, 0] == pytest.approx(1.0)
+
+
+def test_long_move_cruises_at_max_speed():
+    plan = plan_moves([0.0], [10.0], max_speed=2.0, max_acc=4.0)
+    assert plan.accel_time[0] == pytest.approx(0.5)
+    assert plan.duration[0] == pytest.approx(5.5)
+    assert plan.speed[0, 0] == pytest.approx(2.0)
+
+
+def test_scurve_takes_longer_for_the_same_peak_acceleration():
+    trapezoid = plan_moves([0.0], [10.0], max_speed=2.0, max_acc=4.0, profile=TRAPEZOID)
+    scurve = plan_moves([0.0], [10.0], max_speed=2.0, max_acc=4.0, profile=SCURVE)
+    assert scurve.accel_time[0] == pytest.approx(trapezoid.accel_time[0] * np.pi / 2)
+    assert scurve.acceleration[0, 0] == pytest.approx(4.0)
+
+
+def test_joint_that_does_not_move():
+    plan = plan_moves([[1.0, 2.0]], [[1.0, 3.0]], max_speed=1.0, max_acc=1.0)
+    assert plan.speed[0, 0] == 0.0
+    assert plan.acceleration[0, 0] == 0.0
+    t, positions = sample_move(plan, 0, 100.0)
+    np.testing.assert_allclose(positions[:, 0], 1.0)
+
+
+def test_no_move_at_all():
+    plan = plan_moves([[1.0, 2.0]], [[1.0, 2.0]], max_speed=1.0, max_acc=1.0)
+    assert plan.duration[0] == 0.0
+    t, positions = sample_move(plan, 0, 100.0)
+    np.testing.assert_allclose(positions, [[1.0, 2.0]] * len(t))
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError):
+        plan_moves([0.0], [1.0], 1.0, 1.0, profile='cubic')
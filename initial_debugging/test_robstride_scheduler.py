@@ -0,0 +1,54 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+import robstride_codec as codec
+from robstride_scheduler import PollScheduler, arm_targets, percentile
+from robstride_sim import VirtualBus
+from robstride_transport import Transport
+
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'openpty'), reason="VirtualBus needs a pty")
+
+
+def poll(duration, **bus_options):
+    bus = VirtualBus(codec.ARM_MOTOR_IDS, **bus_options)
+    bus.start()
+
+    async def main():
+        async with Transport.open(bus.port) as transport:
+            scheduler = PollScheduler(transport, arm_targets(), rate=100)
+            await scheduler.run(duration)
+            return scheduler, time.monotonic()
+
+    try:
+        return asyncio.run(main())
+    finally:
+        bus.stop()
+        os.close(bus.slave)
+        os.close(bus.master)
+
+
+def test_clean_link_has_no_timeouts():
+    scheduler, _ = poll(0.3, latency=0.0005)
+    assert scheduler.cycles > 20
+    assert scheduler.timeouts == 0
+    assert len(scheduler.latest) == len(scheduler.targets)
+
+
+def test_lost_replies_do_not_shift_later_samples():
+    scheduler, finished = poll(1.0, latency=0.0005, loss=0.05, seed=3)
+    assert scheduler.lost_replies > 0
+    assert scheduler.late_replies == 0
+    # Every read keeps getting answered by its own reply, with the link's latency
+    for key, sample in scheduler.latest.items():
+        assert finished - sample.timestamp < 0.2, key
+        assert percentile(scheduler.latencies[key], 0.5) < 0.005, key
+
+
+def test_percentile():
+    assert percentile([], 0.5) is None
+    assert percentile([3, 1, 2], 0.5) == 2
+    assert percentile([3, 1, 2], 1.0) == 3
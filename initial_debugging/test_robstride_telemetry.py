@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import robstride_telemetry as telemetry
+from robstride_telemetry import TelemetryReader, TelemetryWriter
+
+
+@pytest.fixture
+def name():
+    return f"robstride_test_{os.getpid()}_{threading.get_ident()}"
+
+
+@pytest.fixture
+def writer(name):
+    writer = TelemetryWriter(name, capacity=8)
+    yield writer
+    writer.close()
+
+
+@pytest.fixture
+def reader(writer, name):
+    reader = TelemetryReader(name)
+    yield reader
+    reader.close()
+
+
+def samples(start, count, motor_ids=(21, 22)):
+    return [(float(k), motor_ids[k % len(motor_ids)], float(k), -float(k)) for k in range(start, start + count)]
+
+
+def test_history_in_publish_order_across_the_wrap(writer, reader):
+    for start in range(0, 30, 3):
+        writer.publish(samples(start, 3))
+    assert list(reader.history(5)['timestamp']) == [25.0, 26.0, 27.0, 28.0, 29.0]
+    # The ring holds only the last capacity samples
+    assert list(reader.history(100)['timestamp']) == [float(k) for k in range(22, 30)]
+
+
+def test_batch_larger_than_the_ring_keeps_its_tail(writer, reader):
+    writer.publish(samples(0, 5))
+    writer.publish(samples(5, 20))
+    assert list(reader.history(8)['timestamp']) == [float(k) for k in range(17, 25)]
+    assert writer.samples_written == 25
+
+
+def test_latest_per_motor(writer, reader):
+    writer.publish(samples(0, 7))
+    latest = reader.latest()
+    assert list(latest['motor_id']) == [21, 22]
+    assert list(latest['timestamp']) == [6.0, 5.0]
+    assert reader.latest([22])['position'][0] == 5.0
+
+
+def test_new_samples_counts_what_the_writer_overwrote(writer, reader):
+    writer.publish(samples(0, 3))
+    assert list(reader.new_samples()['timestamp']) == [0.0, 1.0, 2.0]
+    assert len(reader.new_samples()) == 0
+    writer.publish(samples(3, 12))
+    assert list(reader.new_samples()['timestamp']) == [float(k) for k in range(7, 15)]
+    assert reader.lost == 4
+
+
+def test_read_during_an_unfinished_publish_times_out(writer, reader, monkeypatch):
+    monkeypatch.setattr(telemetry, 'READ_TIMEOUT', 0.01)
+    writer.publish(samples(0, 2))
+    writer.segment.header['sequence'] += 1  # As if the writer died mid-publish
+    with pytest.raises(TimeoutError):
+        reader.latest()
+    assert reader.retries > 0
+
+
+def test_concurrent_reads_never_see_a_torn_batch(writer, reader):
+    # Every batch holds one value for all of its samples, so a mixed history is a torn read
+    stop = threading.Event()
+
+    def publish():
+        value = 0
+        while not stop.is_set():
+            value += 1
+            writer.publish([(float(value), 21 + k, float(value), float(value)) for k in range(8)])
+            time.sleep(0.0001)  # Faster than a real poller, but leaves the reader a gap
+
+    thread = threading.Thread(target=publish)
+    thread.start()
+    try:
+        for _ in range(2000):
+            history = reader.history(8)
+            if len(history) == 8:
+                assert len(np.unique(history['position'])) == 1
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_second_writer_refused_while_the_first_is_alive(writer, name):
+    with pytest.raises(FileExistsError):
+        TelemetryWriter(name, capacity=8)
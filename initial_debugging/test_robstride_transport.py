@@ -0,0 +1,114 @@
+import asyncio
+import os
+
+import pytest
+
+import robstride_codec as codec
+from robstride_sim import VirtualBus
+from robstride_transport import OK, TIMEOUT, Transport
+
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'openpty'), reason="VirtualBus needs a pty")
+
+MOTOR_IDS = [21, 22, 23, 24, 25, 26, 127]
+
+
+@pytest.fixture
+def make_bus():
+    buses = []
+
+    def make(**kwargs):
+        bus = VirtualBus(MOTOR_IDS, **kwargs)
+        bus.start()
+        buses.append(bus)
+        return bus
+
+    yield make
+    for bus in buses:
+        bus.stop()
+        os.close(bus.slave)
+        os.close(bus.master)
+
+
+def run(bus, test):
+    async def main():
+        async with Transport.open(bus.port) as transport:
+            return await test(transport)
+    return asyncio.run(main())
+
+
+def test_replies_matched_by_motor_and_parameter(make_bus):
+    # Jitter reorders the replies of different motors
+    bus = make_bus(latency=0.0005, jitter=0.003, seed=1)
+
+    async def test(transport):
+        targets = {motor_id: motor_id / 10 for motor_id in MOTOR_IDS}
+        written = await transport.write_many([(motor_id, codec.POSITION_TARGET, value)
+                                              for motor_id, value in targets.items()])
+        assert {result.status for result in written.values()} == {OK}
+        for _ in range(5):
+            entries = [(motor_id, param) for motor_id in MOTOR_IDS
+                       for param in (codec.POSITION_TARGET, codec.RUN_MODE)]
+            results = await transport.read_many(entries, timeout=0.5)
+            for motor_id, value in targets.items():
+                assert results[(motor_id, 'POSITION_TARGET')].value == pytest.approx(value)
+                assert results[(motor_id, 'RUN_MODE')].value == 0
+        assert transport.unmatched == 0
+
+    run(bus, test)
+
+
+def test_same_key_answered_in_request_order(make_bus):
+    bus = make_bus(latency=0.001)
+
+    async def test(transport):
+        read = (transport.encoder.read(21, codec.POSITION_TARGET),
+                (codec.COMM_TYPE_READ, 21, codec.POSITION_TARGET.index))
+        write = (codec.build_frame(codec.COMM_TYPE_WRITE, 21, codec.POSITION_TARGET, 2.5),
+                 (codec.COMM_TYPE_FEEDBACK, 21, None))
+        futures = transport.request_many([read, write, read])
+        before, _, after = await asyncio.gather(*futures)
+        assert before.timestamp <= after.timestamp
+        return before, after
+
+    before, after = run(bus, test)
+    assert before.data[4:] == bytes(4)  # 0.0
+    assert after.data[4:] == codec.build_frame(codec.COMM_TYPE_WRITE, 21, codec.POSITION_TARGET, 2.5)[11:15]
+
+
+def test_missing_motor_times_out_without_holding_up_the_others(make_bus):
+    bus = make_bus()
+
+    async def test(transport):
+        results = await transport.read_many([(21, codec.MECH_POS), (99, codec.MECH_POS), (22, codec.MECH_POS)],
+                                            timeout=0.05, as_array=True)
+        assert list(results['ok']) == [True, False, True]
+        assert results['latency'][0] < 0.05
+
+    run(bus, test)
+
+
+def test_stop_reports_pending_reads_as_unanswered(make_bus):
+    bus = make_bus(latency=0.2)
+
+    async def test(transport):
+        task = asyncio.ensure_future(transport.read_many([(motor_id, codec.MECH_POS) for motor_id in MOTOR_IDS],
+                                                         timeout=1.0, window=2))
+        await asyncio.sleep(0.02)
+        transport.stop()
+        results = await task
+        assert {result.status for result in results.values()} == {TIMEOUT}
+
+    run(bus, test)
+
+
+def test_duplicate_entries_rejected(make_bus):
+    bus = make_bus()
+
+    async def test(transport):
+        with pytest.raises(ValueError):
+            await transport.read_many([(21, codec.MECH_POS), (21, codec.MECH_POS)])
+        with pytest.raises(ValueError):
+            await transport.write_many([(21, codec.POSITION_TARGET, 1.0), (21, codec.POSITION_TARGET, 2.0)])
+
+    run(bus, test)
@@ -0,0 +1,46 @@
+from launch import LaunchDescription
+from launch.actions import DeclareLaunchArgument
+from launch.conditions import IfCondition, UnlessCondition
+from launch.substitutions import LaunchConfiguration
+from launch_ros.actions import Node
+
+
+def generate_launch_description():
+    """Start the joystick driver and controller as two processes, or composed into one."""
+    composed = LaunchConfiguration('composed')
+    parameters = [{
+        'serial_port': LaunchConfiguration('serial_port'),
+        'feedback_port': LaunchConfiguration('feedback_port'),
+    }]
+
+    return LaunchDescription([
+        DeclareLaunchArgument(
+            'composed', default_value='true',
+            description='Run driver and controller in one process instead of two'),
+        DeclareLaunchArgument('serial_port', default_value='/dev/ttyACM0'),
+        DeclareLaunchArgument('feedback_port', default_value=''),
+
+        # Separate processes: every /joy message crosses the middleware
+        Node(
+            package='motor_position_control',
+            executable='pygame_joy',
+            output='screen',
+            condition=UnlessCondition(composed),
+        ),
+        Node(
+            package='motor_position_control',
+            executable='joystick_position_control',
+            parameters=parameters,
+            output='screen',
+            condition=UnlessCondition(composed),
+        ),
+
+        # One process: the driver hands each message to the controller directly
+        Node(
+            package='motor_position_control',
+            executable='joystick_position_container',
+            parameters=parameters,
+            output='screen',
+            condition=IfCondition(composed),
+        ),
+    ])
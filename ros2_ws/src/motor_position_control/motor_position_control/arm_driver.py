@@ -0,0 +1,230 @@
+import bisect
+import math
+
+import rclpy
+from rclpy.node import Node
+from sensor_msgs.msg import JointState
+from std_msgs.msg import Float64MultiArray
+from trajectory_msgs.msg import JointTrajectory
+
+from .qos import SENSOR_QOS
+from .robstride_link import (
+    ARM_MOTOR_IDS, COMM_TYPE_ENABLE, COMM_TYPE_READ, COMM_TYPE_WRITE, DEFAULT_MAX_ACC,
+    DEFAULT_SPEED, MECH_POS, MECH_VEL, MODE_POSITION, POSITION_03_SPEED, POSITION_ACCELERATION,
+    POSITION_SPEED_LIMIT, POSITION_TARGET, RUN_MODE, RobstrideLink, build_frame, decode_value,
+    reply_key)
+
+
+def _duration_seconds(duration):
+    return duration.sec + duration.nanosec * 1e-9
+
+
+class ActiveTrajectory:
+    """A received JointTrajectory mapped onto the driver's joints and sampled by time."""
+
+    def __init__(self, msg, joint_index, start_time, current_targets):
+        self.start_time = start_time
+        # Driver joint index for each column of the message; unknown joints are ignored
+        self.columns = [(column, joint_index[name]) for column, name in enumerate(msg.joint_names)
+                        if name in joint_index]
+        self.times = [_duration_seconds(point.time_from_start) for point in msg.points]
+        self.points = [list(point.positions) for point in msg.points]
+        if self.points:
+            # Start from the current targets at time 0 so the first segment is interpolated too
+            start = list(self.points[0])
+            for column, joint in self.columns:
+                if current_targets[joint] is not None:
+                    start[column] = current_targets[joint]
+            self.times.insert(0, 0.0)
+            self.points.insert(0, start)
+
+    def sample(self, now):
+        """Return [(joint, position)] linearly interpolated at time now, and whether it is done."""
+        t = now - self.start_time
+        if not self.points:
+            return [], True
+        segment = bisect.bisect_right(self.times, t)
+        if segment == 0:
+            # Stamped to start in the future: hold the current targets until then
+            return [(joint, self.points[0][column]) for column, joint in self.columns], False
+        if segment >= len(self.points):
+            return [(joint, self.points[-1][column]) for column, joint in self.columns], True
+        t0, t1 = self.times[segment - 1], self.times[segment]
+        alpha = (t - t0) / (t1 - t0) if t1 > t0 else 1.0
+        before, after = self.points[segment - 1], self.points[segment]
+        return [(joint, before[column] + alpha * (after[column] - before[column]))
+                for column, joint in self.columns], False
+
+
+class ArmDriver(Node):
+    """
+    Position driver for all arm joints over one USB-CAN adapter.
+
+    Targets come from a JointTrajectory on /joint_trajectory or a per-joint array on
+    /joint_commands (NaN leaves a joint unchanged). Every control tick sends the changed
+    POSITION_TARGET writes together with the MECH_POS/MECH_VEL reads for all joints in a
+    single serial write, then publishes /joint_states from the replies.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__('arm_driver', **kwargs)
+
+        self.declare_parameter('port', '/dev/ttyUSB0')
+        self.declare_parameter('baud_rate', 921600)
+        self.declare_parameter('motor_ids', ARM_MOTOR_IDS)
+        self.declare_parameter('joint_names', [f'joint{i + 1}' for i in range(len(ARM_MOTOR_IDS))])
+        self.declare_parameter('control_rate', 100.0)  # Hz
+        self.declare_parameter('send_threshold', 0.0005)  # rad; smaller changes are not resent
+        self.declare_parameter('max_speed', DEFAULT_SPEED)  # rad/s
+        self.declare_parameter('max_acceleration', DEFAULT_MAX_ACC)  # rad/s^2
+
+        self.motor_ids = list(self.get_parameter('motor_ids').value)
+        self.joint_names = list(self.get_parameter('joint_names').value)
+        if len(self.joint_names) != len(self.motor_ids):
+            raise ValueError('joint_names and motor_ids must have the same length')
+        self.joint_index = {name: i for i, name in enumerate(self.joint_names)}
+        self.send_threshold = self.get_parameter('send_threshold').value
+        period = 1.0 / self.get_parameter('control_rate').value
+        # Leave half a tick for the executor; a missing reply only costs one sample
+        self.reply_timeout = min(0.5 * period, 0.01)
+
+        count = len(self.motor_ids)
+        self.targets = [None] * count
+        self.sent_targets = [None] * count
+        self.positions = [math.nan] * count
+        self.velocities = [math.nan] * count
+        self.trajectory = None
+        self.ticks = 0
+        self.writes_sent = 0
+        self.missed_replies = 0
+
+        self.link = RobstrideLink.open(
+            self.get_parameter('port').value, self.get_parameter('baud_rate').value)
+        self.configure_motors()
+
+        self.state_publisher = self.create_publisher(JointState, '/joint_states', SENSOR_QOS)
+        self.trajectory_subscription = self.create_subscription(
+            JointTrajectory, '/joint_trajectory', self.trajectory_callback, 10)
+        self.command_subscription = self.create_subscription(
+            Float64MultiArray, '/joint_commands', self.command_callback, SENSOR_QOS)
+        self.timer = self.create_timer(period, self.control_tick)
+        self.get_logger().info(
+            f"Arm driver started for motors {self.motor_ids} at "
+            f"{self.get_parameter('control_rate').value:.0f} Hz")
+
+    def state_requests(self):
+        requests = []
+        for motor_id in self.motor_ids:
+            for param in (MECH_POS, MECH_VEL):
+                requests.append((build_frame(COMM_TYPE_READ, motor_id, param),
+                                 reply_key(COMM_TYPE_READ, motor_id, param)))
+        return requests
+
+    def configure_motors(self):
+        """Put every motor in position mode holding its current position, in two batches."""
+        self.store_state(self.link.exchange(self.state_requests(), timeout=0.1))
+        speed = self.get_parameter('max_speed').value
+        acceleration = self.get_parameter('max_acceleration').value
+        # The writes of Motor::setPosition in RobstrideControl.h, but with the limits and the
+        # target (the measured position) written before the enable, so enabling does not move
+        # the joint towards a stale target
+        requests = []
+        enabled = []
+        for i, motor_id in enumerate(self.motor_ids):
+            if math.isnan(self.positions[i]):
+                self.get_logger().error(
+                    f"Could not read the position of motor {motor_id}; leaving it disabled")
+                continue
+            requests.append((
+                build_frame(COMM_TYPE_WRITE, motor_id, RUN_MODE, MODE_POSITION), None))
+            for param, value in ((POSITION_SPEED_LIMIT, speed), (POSITION_03_SPEED, speed),
+                                 (POSITION_ACCELERATION, acceleration),
+                                 (POSITION_TARGET, self.positions[i])):
+                requests.append((build_frame(COMM_TYPE_WRITE, motor_id, param, value), None))
+            self.targets[i] = self.sent_targets[i] = self.positions[i]
+            requests.append((build_frame(COMM_TYPE_ENABLE, motor_id),
+                             reply_key(COMM_TYPE_ENABLE, motor_id)))
+            enabled.append(motor_id)
+        replies = self.link.exchange(requests, timeout=0.1)
+        for motor_id in enabled:
+            if reply_key(COMM_TYPE_ENABLE, motor_id) not in replies:
+                self.get_logger().warning(f"Motor {motor_id} did not answer during setup")
+
+    def trajectory_callback(self, msg):
+        start = msg.header.stamp.sec + msg.header.stamp.nanosec * 1e-9
+        now = self.get_clock().now().nanoseconds * 1e-9
+        # A zero stamp means "start now", as in JointTrajectoryController
+        self.trajectory = ActiveTrajectory(
+            msg, self.joint_index, start if start > 0 else now, self.targets)
+
+    def command_callback(self, msg):
+        if len(msg.data) != len(self.motor_ids):
+            self.get_logger().warning(
+                f"Ignoring joint command with {len(msg.data)} values for "
+                f"{len(self.motor_ids)} joints", throttle_duration_sec=1.0)
+            return
+        self.trajectory = None  # Direct commands replace a running trajectory
+        for i, value in enumerate(msg.data):
+            if not math.isnan(value):
+                self.targets[i] = value
+
+    def control_tick(self):
+        if self.trajectory is not None:
+            samples, done = self.trajectory.sample(self.get_clock().now().nanoseconds * 1e-9)
+            for joint, position in samples:
+                self.targets[joint] = position
+            if done:
+                self.trajectory = None
+
+        requests = []
+        for i, motor_id in enumerate(self.motor_ids):
+            target = self.targets[i]
+            sent = self.sent_targets[i]
+            if target is not None and (sent is None or abs(target - sent) >= self.send_threshold):
+                # The feedback reply to a write is not needed; the reads below report the state
+                requests.append((build_frame(COMM_TYPE_WRITE, motor_id, POSITION_TARGET, target),
+                                 None))
+                self.sent_targets[i] = target
+                self.writes_sent += 1
+        requests.extend(self.state_requests())
+        self.store_state(self.link.exchange(requests, timeout=self.reply_timeout))
+        self.ticks += 1
+        self.publish_state()
+
+    def store_state(self, replies):
+        for i, motor_id in enumerate(self.motor_ids):
+            position = replies.get(reply_key(COMM_TYPE_READ, motor_id, MECH_POS))
+            velocity = replies.get(reply_key(COMM_TYPE_READ, motor_id, MECH_VEL))
+            if position is None or velocity is None:
+                self.missed_replies += 1
+                continue
+            self.positions[i] = decode_value(position, MECH_POS)
+            self.velocities[i] = decode_value(velocity, MECH_VEL)
+
+    def publish_state(self):
+        msg = JointState()
+        msg.header.stamp = self.get_clock().now().to_msg()
+        msg.name = self.joint_names
+        msg.position = self.positions
+        msg.velocity = self.velocities
+        self.state_publisher.publish(msg)
+
+    def destroy_node(self):
+        self.link.close()
+        super().destroy_node()
+
+
+def main(args=None):
+    rclpy.init(args=args)
+    node = ArmDriver()
+    try:
+        rclpy.spin(node)
+    except KeyboardInterrupt:
+        node.get_logger().info("Node stopped cleanly")
+    finally:
+        node.destroy_node()
+        rclpy.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Background MECH_POS/MECH_VEL polling with a cache of the latest sample per motor."""
+
+from collections import namedtuple
+import threading
+import time
+
+from .robstride_link import MECH_POS, MECH_VEL
+
+
+FeedbackSample = namedtuple('FeedbackSample', ['position', 'velocity', 'stamp'])
+
+
+class JointFeedback:
+    """
+    Polls position and velocity of every motor at a fixed rate on its own thread.
+
+    Each cycle reads all motors in one RobstrideLink exchange and replaces the cached samples,
+    so callers get the latest values from latest() without touching the serial port.
+    on_cycle, if set, is called from the polling thread after every cycle.
+    """
+
+    def __init__(self, link, motor_ids, rate=100.0, timeout=0.02):
+        self.link = link
+        self.motor_ids = list(motor_ids)
+        self.period = 1.0 / rate
+        self.timeout = timeout
+        self.samples = {}
+        self.on_cycle = None
+        self.cycles = 0
+        self.missed = 0
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def latest(self, motor_id):
+        """Return the newest FeedbackSample for a motor, or None before its first reply."""
+        return self.samples.get(motor_id)
+
+    def poll_once(self):
+        values = self.link.read_many(self.motor_ids, (MECH_POS, MECH_VEL), self.timeout)
+        stamp = time.monotonic()
+        for motor_id in self.motor_ids:
+            position = values.get((motor_id, MECH_POS.name))
+            velocity = values.get((motor_id, MECH_VEL.name))
+            if position is None or velocity is None:
+                self.missed += 1
+                continue
+            # Replacing the whole entry keeps position and velocity from the same cycle together
+            self.samples[motor_id] = FeedbackSample(position, velocity, stamp)
+        self.cycles += 1
+
+    def _run(self):
+        next_time = time.monotonic()
+        while self._running:
+            try:
+                self.poll_once()
+            except (OSError, TypeError):
+                break  # Port closed during shutdown
+            if self.on_cycle is not None:
+                self.on_cycle()
+            # Fixed-rate schedule; skip ticks rather than bursting after a slow cycle
+            next_time += self.period
+            now = time.monotonic()
+            if next_time < now:
+                next_time = now
+            time.sleep(next_time - now)
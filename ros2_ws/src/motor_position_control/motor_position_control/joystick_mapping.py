@@ -0,0 +1,29 @@
+"""Stick-to-joint-angle mapping of the joystick node, free of ROS imports."""
+
+import math
+
+
+def compute_target_angle(x, y, current_angle, dead_zone):
+    """
+    Return (target_angle, final_target_angle) for a stick position.
+
+    target_angle is the stick direction in [0, 2pi). final_target_angle is the multi-turn
+    position nearest to current_angle with that direction, as Motor::setPosition in
+    RobstrideControl.h expects, so the joint never takes the long way across 0/2pi.
+    """
+    # Apply dead zone to avoid noise
+    if abs(x) < dead_zone and abs(y) < dead_zone:
+        x = 0.0
+        y = 0.0
+
+    # Calculate target angle in radians using atan2 and normalize to [0, 2π]
+    target_angle = math.atan2(y, x)  # Range: [-pi, pi]
+    if target_angle < 0:
+        target_angle += 2 * math.pi  # Normalize to [0, 2π]
+
+    # Shortest path from the current (multi-turn) angle, normalized to [-pi, pi)
+    delta_angle = (target_angle - current_angle + math.pi) % (2 * math.pi) - math.pi
+
+    # Final target on the same turn as the current angle; not wrapped to [0, 2π]
+    final_target_angle = current_angle + delta_angle
+    return target_angle, final_target_angle
@@ -0,0 +1,35 @@
+import rclpy
+from rclpy.executors import SingleThreadedExecutor
+from rclpy.parameter import Parameter
+
+from .joystick_position_control import JoystickPositionControl
+from .pygame_joy import PygameJoy
+
+
+def main(args=None):
+    """Run the joystick driver and the controller as components of one process."""
+    rclpy.init(args=args)
+    # rclpy has no intra-process transport, so the driver hands each Joy message straight to
+    # the controller; /joy is still published for other nodes
+    controller = JoystickPositionControl(
+        parameter_overrides=[Parameter('subscribe_joy', Parameter.Type.BOOL, False)])
+    joy = PygameJoy()
+    joy.listeners.append(controller.joystick_callback)
+
+    executor = SingleThreadedExecutor()
+    executor.add_node(joy)
+    executor.add_node(controller)
+    try:
+        executor.spin()
+    except KeyboardInterrupt:
+        controller.get_logger().info("Container stopped cleanly")
+    finally:
+        executor.shutdown()
+        joy.destroy_node()
+        controller.destroy_node()
+        controller.serial_port.close()
+        rclpy.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,103 +1,256 @@
 import rclpy
 from rclpy.node import Node
-from sensor_msgs.msg import Joy
+from sensor_msgs.msg import Joy, JointState
 from std_msgs.msg import Float32
 import math
+import queue
 import serial
 import threading
+import time
+
+from .joint_feedback import JointFeedback
+from .joystick_mapping import compute_target_angle
+from .qos import SENSOR_QOS
+from .robstride_link import RobstrideLink
 
 
 class JoystickPositionControl(Node):
-    def __init__(self):
-        super().__init__('joystick_position_control')
+    def __init__(self, **kwargs):
+        # kwargs go to Node (parameter_overrides, namespace, ...) so a container can build it
+        super().__init__('joystick_position_control', **kwargs)
 
-        # Subscribe to the joystick input topic
-        self.subscription = self.create_subscription(
-            Joy,
-            '/joy',
-            self.joystick_callback,
-            10
-        )
+        # Subscribe to the joystick input topic; best effort, newest sample only. A container
+        # that feeds joystick_callback directly turns this off with subscribe_joy:=false.
+        self.declare_parameter('subscribe_joy', True)
+        self.subscription = None
+        if self.get_parameter('subscribe_joy').value:
+            self.subscription = self.create_subscription(
+                Joy,
+                '/joy',
+                self.joystick_callback,
+                SENSOR_QOS
+            )
 
         # Publish the computed motor position
         self.publisher = self.create_publisher(Float32, '/motor_position', 10)
 
         # Setup serial communication with Arduino
-        self.serial_port = serial.Serial('/dev/ttyACM0', 115200, timeout=1)
+        self.declare_parameter('serial_port', '/dev/ttyACM0')
+        self.declare_parameter('baud_rate', 115200)
+        self.serial_port = serial.Serial(
+            self.get_parameter('serial_port').value,
+            self.get_parameter('baud_rate').value,
+            timeout=0.1)  # Bounds how long the reader takes to notice shutdown
 
-        # Start a separate thread to listen for Arduino responses
+        # Arduino responses are read on a separate thread that blocks in readline() and hands
+        # complete lines to the executor through a bounded queue and a guard condition
+        self.declare_parameter('echo_queue_size', 64)
+        self.echo_queue = queue.Queue(maxsize=self.get_parameter('echo_queue_size').value)
+        self.echo_dropped = 0
+        self.echo_ready = self.create_guard_condition(self.drain_arduino_echo)
+        self.reader_running = True
         self.serial_thread = threading.Thread(target=self.read_arduino_echo, daemon=True)
         self.serial_thread.start()
 
         self.dead_zone = 0.1  # Dead zone to filter noise
+
+        # /joy arrives at the controller's event rate; only the latest target is kept and it is
+        # sent on a fixed-rate control timer, so a burst never queues stale targets on the link
+        self.declare_parameter('control_rate', 50.0)  # Hz
+        self.declare_parameter('send_threshold', 0.002)  # rad; smaller moves are not resent
+        self.declare_parameter('log_period', 1.0)  # s between repeated log lines
+        self.send_threshold = self.get_parameter('send_threshold').value
+        self.log_period = self.get_parameter('log_period').value
+        self.last_logged = {}  # Log line name -> time.monotonic() it was last written
+        self.last_joystick = None  # (x, y, target, current, final) of the latest /joy message
+        self.pending_target = None
+        self.last_sent_target = None
+        self.commands_received = 0
+        self.commands_coalesced = 0
+        self.commands_skipped = 0
+        self.commands_sent = 0
+        # Joy header stamp to callback delay, for comparing standalone and composed runs
+        self.input_latency_max = 0.0
+        self.input_latency_total = 0.0
+        self.input_latency_count = 0
+        self.control_timer = self.create_timer(
+            1.0 / self.get_parameter('control_rate').value, self.control_timer_callback)
+
+        # Motor feedback from the RobStride USB-CAN adapter, polled in the background; the
+        # joystick callback only reads the cached sample. Disabled when feedback_port is empty.
+        self.declare_parameter('feedback_port', '')
+        self.declare_parameter('feedback_baud_rate', 921600)
+        self.declare_parameter('feedback_rate', 100.0)  # Hz
+        self.declare_parameter('motor_ids', [127])
+        self.declare_parameter('joint_names', ['joint_127'])
+        self.declare_parameter('controlled_motor_id', 127)
+        self.motor_ids = list(self.get_parameter('motor_ids').value)
+        self.joint_names = list(self.get_parameter('joint_names').value)
+        if len(self.joint_names) != len(self.motor_ids):
+            self.joint_names = [f'joint_{motor_id}' for motor_id in self.motor_ids]
+        self.controlled_motor_id = self.get_parameter('controlled_motor_id').value
+        self.feedback = None
+        self.joint_state_publisher = self.create_publisher(JointState, '/joint_states', SENSOR_QOS)
+        feedback_port = self.get_parameter('feedback_port').value
+        if feedback_port:
+            self.feedback = JointFeedback(
+                RobstrideLink.open(feedback_port, self.get_parameter('feedback_baud_rate').value),
+                self.motor_ids, rate=self.get_parameter('feedback_rate').value)
+            # Publish from the executor thread once per completed poll cycle
+            self.feedback_ready = self.create_guard_condition(self.publish_joint_states)
+            self.feedback.on_cycle = self.feedback_ready.trigger
+            self.feedback.start()
+
         self.get_logger().info("Joystick Position Control Node Started")
 
     def joystick_callback(self, msg):
+        stamp = msg.header.stamp
+        if stamp.sec or stamp.nanosec:
+            latency = (self.get_clock().now().nanoseconds
+                       - (stamp.sec * 1_000_000_000 + stamp.nanosec)) * 1e-9
+            self.input_latency_total += latency
+            self.input_latency_count += 1
+            self.input_latency_max = max(self.input_latency_max, latency)
+
         # Left joystick axes
         x = msg.axes[0]  # Horizontal axis
         y = msg.axes[1]  # Vertical axis
 
-        # Apply dead zone to avoid noise
-        if abs(x) < self.dead_zone and abs(y) < self.dead_zone:
-            x = 0.0
-            y = 0.0
-
-        # Calculate target angle in radians using atan2 and normalize to [0, 2π]
-        target_angle = math.atan2(y, x)  # Range: [-pi, pi]
-        if target_angle < 0:
-            target_angle += 2 * math.pi  # Normalize to [0, 2π]
-
-        # Current angle normalization (replace with actual motor feedback if available)
-        current_angle = 0.0  # Placeholder: replace with feedback from the motor
-        current_angle = current_angle % (2 * math.pi)  # Normalize to [0, 2π]
-
-        # Compute the shortest path to the target angle
-        delta_angle = target_angle - current_angle
+        # Current angle from the latest feedback sample; 0.0 until the first reply arrives
+        current_angle = self.current_angle()
+        target_angle, final_target_angle = compute_target_angle(
+            x, y, current_angle, self.dead_zone)
 
-        # Normalize delta_angle to [-pi, pi] to ensure shortest path
-        if delta_angle > math.pi:
-            delta_angle -= 2 * math.pi
-        elif delta_angle < -math.pi:
-            delta_angle += 2 * math.pi
+        # Only kept here; the control timer formats and logs it at most once per log_period
+        self.last_joystick = (x, y, target_angle, current_angle, final_target_angle)
 
-        # Compute the final target angle within [0, 2π]
-        final_target_angle = (current_angle + delta_angle) % (2 * math.pi)
+        # Keep only the latest target; the control timer sends it
+        self.commands_received += 1
+        if self.pending_target is not None:
+            self.commands_coalesced += 1
+        self.pending_target = final_target_angle
 
-        # Convert angles to degrees for logging
-        target_angle_degrees = math.degrees(target_angle)
-        current_angle_degrees = math.degrees(current_angle)
-        final_target_angle_degrees = math.degrees(final_target_angle)
+    def log_due(self, name):
+        """Whether the log line `name` is due again; checked before any formatting is done."""
+        now = time.monotonic()
+        if now - self.last_logged.get(name, -math.inf) < self.log_period:
+            return False
+        self.last_logged[name] = now
+        return True
 
+    def log_joystick(self):
+        x, y, target_angle, current_angle, final_target_angle = self.last_joystick
         # Log the angles in both radians and degrees
         self.get_logger().info(
             f"Joystick position: x={x:.2f}, y={y:.2f}, "
-            f"target_angle={target_angle:.2f} radians ({target_angle_degrees:.2f} degrees), "
-            f"current_angle={current_angle:.2f} radians ({current_angle_degrees:.2f} degrees), "
-            f"final_target_angle={final_target_angle:.2f} radians ({final_target_angle_degrees:.2f} degrees)"
-        )
+            f"target_angle={target_angle:.2f} radians ({math.degrees(target_angle):.2f} degrees), "
+            f"current_angle={current_angle:.2f} radians "
+            f"({math.degrees(current_angle):.2f} degrees), "
+            f"final_target_angle={final_target_angle:.2f} radians "
+            f"({math.degrees(final_target_angle):.2f} degrees)")
+
+    def current_angle(self):
+        if self.feedback is None:
+            return 0.0
+        sample = self.feedback.latest(self.controlled_motor_id)
+        return sample.position if sample is not None else 0.0
+
+    def publish_joint_states(self):
+        msg = JointState()
+        msg.header.stamp = self.get_clock().now().to_msg()
+        for name, motor_id in zip(self.joint_names, self.motor_ids):
+            sample = self.feedback.latest(motor_id)
+            if sample is None:
+                continue
+            msg.name.append(name)
+            msg.position.append(sample.position)
+            msg.velocity.append(sample.velocity)
+        if msg.name:
+            self.joint_state_publisher.publish(msg)
+
+    def control_timer_callback(self):
+        if self.last_joystick is not None and self.log_due('joystick'):
+            self.log_joystick()
+        if self.pending_target is None:
+            return
+        target = self.pending_target
+        self.pending_target = None
+
+        if self.last_sent_target is not None:
+            # Targets are multi-turn, so a full turn apart is a different target
+            if abs(target - self.last_sent_target) < self.send_threshold:
+                self.commands_skipped += 1
+                return
 
         # Publish the final target angle
         angle_msg = Float32()
-        angle_msg.data = final_target_angle
+        angle_msg.data = target
         self.publisher.publish(angle_msg)
 
         # Send the final target angle to the Arduino
-        self.send_to_arduino(final_target_angle)
-
+        self.send_to_arduino(target)
+        self.last_sent_target = target
+        self.commands_sent += 1
+        if not self.log_due('commands'):
+            return
+        self.get_logger().info(
+            f"Commands: received={self.commands_received}, "
+            f"coalesced={self.commands_coalesced}, skipped={self.commands_skipped}, "
+            f"sent={self.commands_sent}, echo_dropped={self.echo_dropped}, "
+            f"input_latency_mean="
+            f"{self.input_latency_total / max(1, self.input_latency_count) * 1000:.3f} ms, "
+            f"input_latency_max={self.input_latency_max * 1000:.3f} ms")
 
     def send_to_arduino(self, angle):
         # Format the angle as a string and send it over serial
         command = f"{angle:.4f}\n"
         self.serial_port.write(command.encode())
-        self.get_logger().info(f"Sent to Arduino: {command.strip()}")
+        if self.log_due('sent'):
+            self.get_logger().info(f"Sent to Arduino: {command.strip()}")
 
     def read_arduino_echo(self):
-        while rclpy.ok():
-            if self.serial_port.in_waiting > 0:
-                # Read the echo from Arduino
-                response = self.serial_port.readline().decode().strip()
+        while self.reader_running and rclpy.ok():
+            try:
+                # Sleeps in the kernel until a line arrives or the read timeout expires
+                line = self.serial_port.readline()
+            except (serial.SerialException, OSError, TypeError):
+                break  # Port closed during shutdown
+            if not line:
+                continue
+            response = line.decode(errors='replace').strip()
+            if self.echo_queue.full():
+                # Keep the newest replies; the oldest one is stale by now
+                try:
+                    self.echo_queue.get_nowait()
+                    self.echo_dropped += 1
+                except queue.Empty:
+                    pass
+            try:
+                self.echo_queue.put_nowait(response)
+            except queue.Full:
+                self.echo_dropped += 1
+                continue
+            self.echo_ready.trigger()
+
+    def drain_arduino_echo(self):
+        # Runs on the executor thread whenever the reader has queued at least one response
+        while True:
+            try:
+                response = self.echo_queue.get_nowait()
+            except queue.Empty:
+                return
+            if self.log_due('echo'):
                 self.get_logger().info(f"Echo from Arduino: {response}")
 
+    def destroy_node(self):
+        if self.feedback is not None:
+            self.feedback.stop()
+            self.feedback.link.close()
+        self.reader_running = False
+        if self.serial_thread.is_alive():
+            self.serial_thread.join(timeout=1.0)
+        super().destroy_node()
+
 
 def main(args=None):
     rclpy.init(args=args)
@@ -107,6 +260,7 @@ def main(args=None):
     except KeyboardInterrupt:
         node.get_logger().info("Node stopped cleanly")
     finally:
+        node.destroy_node()
         node.serial_port.close()
         rclpy.shutdown()
 
@@ -0,0 +1,87 @@
+import rclpy
+from rclpy.node import Node
+from sensor_msgs.msg import Joy
+
+from .qos import SENSOR_QOS
+
+
+class PygameJoy(Node):
+    """Publish sensor_msgs/Joy from a pygame joystick, in the layout of the joy package."""
+
+    def __init__(self, **kwargs):
+        super().__init__('pygame_joy', **kwargs)
+        # pygame is only needed when this node runs, not for the controller
+        import pygame
+        self.pygame = pygame
+
+        self.declare_parameter('device_id', 0)
+        self.declare_parameter('poll_rate', 250.0)  # Hz
+        self.declare_parameter('autorepeat_rate', 20.0)  # Hz; 0 publishes on change only
+
+        pygame.init()
+        pygame.joystick.init()
+        if pygame.joystick.get_count() == 0:
+            raise RuntimeError('No joystick detected. Please connect one and restart.')
+        self.joystick = pygame.joystick.Joystick(self.get_parameter('device_id').value)
+        self.joystick.init()
+
+        self.publisher = self.create_publisher(Joy, '/joy', SENSOR_QOS)
+        # In-process consumers called with every message, without going through the middleware
+        self.listeners = []
+        self.last_state = None
+        self.last_publish = 0.0
+        autorepeat_rate = self.get_parameter('autorepeat_rate').value
+        self.autorepeat_period = 1.0 / autorepeat_rate if autorepeat_rate > 0 else None
+        self.timer = self.create_timer(
+            1.0 / self.get_parameter('poll_rate').value, self.poll_joystick)
+        self.get_logger().info(f"Publishing /joy from {self.joystick.get_name()}")
+
+    def read_state(self):
+        joystick = self.joystick
+        axes = [joystick.get_axis(axis) for axis in range(joystick.get_numaxes())]
+        for hat in range(joystick.get_numhats()):
+            hat_x, hat_y = joystick.get_hat(hat)
+            # joy_node reports hats as two extra axes, with left positive
+            axes.extend((-float(hat_x), float(hat_y)))
+        buttons = [joystick.get_button(button) for button in range(joystick.get_numbuttons())]
+        return axes, buttons
+
+    def poll_joystick(self):
+        self.pygame.event.pump()
+        state = self.read_state()
+        now = self.get_clock().now()
+        seconds = now.nanoseconds * 1e-9
+        repeat_due = (self.autorepeat_period is not None
+                      and seconds - self.last_publish >= self.autorepeat_period)
+        if state == self.last_state and not repeat_due:
+            return
+        self.last_state = state
+        self.last_publish = seconds
+
+        msg = Joy()
+        msg.header.stamp = now.to_msg()
+        msg.header.frame_id = 'joy'
+        msg.axes, msg.buttons = state
+        for listener in self.listeners:
+            listener(msg)
+        self.publisher.publish(msg)
+
+    def destroy_node(self):
+        self.pygame.quit()
+        super().destroy_node()
+
+
+def main(args=None):
+    rclpy.init(args=args)
+    node = PygameJoy()
+    try:
+        rclpy.spin(node)
+    except KeyboardInterrupt:
+        node.get_logger().info("Node stopped cleanly")
+    finally:
+        node.destroy_node()
+        rclpy.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,12 @@
+"""QoS profiles shared by the package's nodes."""
+
+from rclpy.qos import HistoryPolicy, QoSProfile, ReliabilityPolicy
+
+
+# Joystick input and motor feedback: only the newest sample matters, so nothing is queued
+# or retransmitted behind it
+SENSOR_QOS = QoSProfile(
+    history=HistoryPolicy.KEEP_LAST,
+    depth=1,
+    reliability=ReliabilityPolicy.BEST_EFFORT,
+)
@@ -0,0 +1,196 @@
+"""Framing for the RobStride USB-CAN adapter and a blocking request/reply link over it."""
+
+from collections import namedtuple
+import struct
+import threading
+import time
+
+import serial
+
+
+# Same values as initial_debugging/robstride_codec.py and RobstrideControl.h
+HOST_CAN_ID = 253
+
+COMM_TYPE_FEEDBACK = 2
+COMM_TYPE_ENABLE = 3
+COMM_TYPE_DISABLE = 4
+COMM_TYPE_READ = 17
+COMM_TYPE_WRITE = 18
+
+FLOAT = 'float'
+INT8 = 'int8'
+
+Parameter = namedtuple('Parameter', ['name', 'index', 'type'])
+
+RUN_MODE = Parameter('RUN_MODE', 0x0570, INT8)
+POSITION_SPEED_LIMIT = Parameter('POSITION_SPEED_LIMIT', 0x1770, FLOAT)
+POSITION_TARGET = Parameter('POSITION_TARGET', 0x1670, FLOAT)
+MECH_POS = Parameter('MECH_POS', 0x1970, FLOAT)
+MECH_VEL = Parameter('MECH_VEL', 0x1B70, FLOAT)
+POSITION_03_SPEED = Parameter('POSITION_03_SPEED', 0x2470, FLOAT)
+POSITION_ACCELERATION = Parameter('POSITION_ACCELERATION', 0x2570, FLOAT)
+
+MODE_POSITION = 1
+
+ARM_MOTOR_IDS = [21, 22, 23, 24, 25, 26, 127]
+DEFAULT_SPEED = 10.0
+DEFAULT_MAX_ACC = 20.0
+
+# Frame layout: "AT" + 4-byte extended header + data length + 8 data bytes + "\r\n"
+FRAME_HEAD = b'AT'
+FRAME_TAIL = b'\r\n'
+FRAME_LENGTH = 17
+DATA_OFFSET = 7
+DATA_LENGTH = 8
+
+# A received frame; for replies the motor ID is in bits 8-15 of the CAN ID
+Frame = namedtuple('Frame', ['comm_type', 'motor_id', 'index', 'data', 'timestamp'])
+
+_ID = struct.Struct('>I')
+_INDEX = struct.Struct('>H')
+_VALUE = {FLOAT: struct.Struct('<f'), INT8: struct.Struct('<B')}
+
+
+def build_frame(comm_type, motor_id, param=None, value=None, host_can_id=HOST_CAN_ID):
+    """Build a host-to-motor frame for comm types 3, 4, 17 and 18."""
+    raw_can_id = (comm_type << 24) | (host_can_id << 8) | motor_id
+    data = bytearray(DATA_LENGTH)
+    if param is not None:
+        _INDEX.pack_into(data, 0, param.index)
+    if value is not None:
+        value_type = _VALUE[param.type]
+        data[4:4 + value_type.size] = value_type.pack(
+            value if param.type == FLOAT else int(value))
+    return (FRAME_HEAD + _ID.pack((raw_can_id << 3) | 0b100) + bytes([DATA_LENGTH])
+            + bytes(data) + FRAME_TAIL)
+
+
+def reply_key(comm_type, motor_id, param=None):
+    """Key of the reply a request is answered with (see Frame)."""
+    if comm_type == COMM_TYPE_READ:
+        return (COMM_TYPE_READ, motor_id, param.index)
+    # Enable, disable and writes are answered with a type 2 feedback frame
+    return (COMM_TYPE_FEEDBACK, motor_id, None)
+
+
+def decode_value(frame, param):
+    """Decode the value carried in bytes 4-7 of a parameter read reply."""
+    return _VALUE[param.type].unpack_from(frame.data, 4)[0]
+
+
+def parse_frames(buffer, timestamp):
+    """Extract complete frames from the front of buffer (a bytearray) and remove them."""
+    frames = []
+    pos = 0
+    end = len(buffer)
+    while True:
+        head = buffer.find(FRAME_HEAD, pos)
+        if head < 0:
+            # Keep a trailing "A" in case the next read starts with "T"
+            pos = end - 1 if end > pos and buffer[end - 1] == FRAME_HEAD[0] else end
+            break
+        pos = head
+        if end - pos < DATA_OFFSET:
+            break
+        data_length = buffer[pos + DATA_OFFSET - 1]
+        frame_end = pos + DATA_OFFSET + data_length + len(FRAME_TAIL)
+        if data_length > DATA_LENGTH:
+            pos += 1
+            continue
+        if frame_end > end:
+            break
+        if buffer[frame_end - 2:frame_end] != FRAME_TAIL:
+            pos += 1
+            continue
+        can_id = _ID.unpack_from(buffer, pos + 2)[0] >> 3
+        comm_type = can_id >> 24
+        data = bytes(buffer[pos + DATA_OFFSET:frame_end - 2])
+        index = None
+        if comm_type in (COMM_TYPE_READ, COMM_TYPE_WRITE) and data_length >= 2:
+            index = _INDEX.unpack_from(data)[0]
+        frames.append(Frame(comm_type, (can_id >> 8) & 0xFF, index, data, timestamp))
+        pos = frame_end
+    del buffer[:pos]
+    return frames
+
+
+class RobstrideLink:
+    """
+    Blocking request/reply access to the motors behind one USB-CAN adapter.
+
+    exchange() writes a batch of frames in one call and then reads until every expected
+    reply has arrived or the timeout expires, so the round trips for a batch overlap.
+    A lock serializes exchanges from different threads.
+    """
+
+    def __init__(self, ser, host_can_id=HOST_CAN_ID):
+        self.ser = ser
+        self.host_can_id = host_can_id
+        self.lock = threading.Lock()
+        self.rx_buffer = bytearray()
+        self.frames_sent = 0
+        self.timeouts = 0
+        self.late_replies = 0  # Replies that arrived after their exchange gave up on them
+
+    @classmethod
+    def open(cls, port, baud_rate=921600, **kwargs):
+        """Open the adapter's serial port; the read timeout bounds each wait in exchange()."""
+        return cls(serial.Serial(port, baud_rate, timeout=0.005), **kwargs)
+
+    def close(self):
+        self.ser.close()
+
+    def exchange(self, requests, timeout=0.05):
+        """
+        Send [(frame, key)] in one write and wait for the replies.
+
+        A key of None sends the frame without waiting for its reply. Returns {key: Frame};
+        keys that were not answered in time are missing.
+        """
+        with self.lock:
+            self._discard_late_replies()
+            self.ser.write(b''.join(frame for frame, _ in requests))
+            self.frames_sent += len(requests)
+            waiting = {key for _, key in requests if key is not None}
+            replies = {}
+            deadline = time.monotonic() + timeout
+            while waiting:
+                if time.monotonic() >= deadline:
+                    self.timeouts += len(waiting)
+                    break
+                # Block for the first byte, then take whatever else has arrived
+                chunk = self.ser.read(max(1, self.ser.in_waiting))
+                if not chunk:
+                    continue
+                self.rx_buffer += chunk
+                for frame in parse_frames(self.rx_buffer, time.monotonic()):
+                    key = (frame.comm_type, frame.motor_id, frame.index)
+                    if key in waiting:
+                        waiting.discard(key)
+                        replies[key] = frame
+            return replies
+
+    def _discard_late_replies(self):
+        # A reply that missed an earlier exchange's deadline would otherwise be taken as the
+        # answer to this exchange's request with the same key, e.g. last cycle's position
+        if self.ser.in_waiting:
+            self.rx_buffer += self.ser.read(self.ser.in_waiting)
+        self.late_replies += len(parse_frames(self.rx_buffer, time.monotonic()))
+        self.rx_buffer.clear()
+
+    def read_many(self, motor_ids, params, timeout=0.05):
+        """Read params from every motor; returns {(motor_id, param.name): value}."""
+        requests = []
+        for motor_id in motor_ids:
+            for param in params:
+                requests.append((
+                    build_frame(COMM_TYPE_READ, motor_id, param, host_can_id=self.host_can_id),
+                    reply_key(COMM_TYPE_READ, motor_id, param)))
+        replies = self.exchange(requests, timeout)
+        values = {}
+        for motor_id in motor_ids:
+            for param in params:
+                frame = replies.get(reply_key(COMM_TYPE_READ, motor_id, param))
+                if frame is not None:
+                    values[(motor_id, param.name)] = decode_value(frame, param)
+        return values
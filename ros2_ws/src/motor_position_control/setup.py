@@ -1,3 +1,5 @@
+from glob import glob
+
 from setuptools import setup
 
 package_name = 'motor_position_control'
@@ -6,6 +8,11 @@ setup(
     name=package_name,
     version='0.0.0',
     packages=[package_name],
+    data_files=[
+        ('share/ament_index/resource_index/packages', ['resource/' + package_name]),
+        ('share/' + package_name, ['package.xml']),
+        ('share/' + package_name + '/launch', glob('launch/*.launch.py')),
+    ],
     install_requires=['setuptools'],
     zip_safe=True,
     maintainer='your_name',
@@ -16,6 +23,10 @@ setup(
     entry_points={
         'console_scripts': [
             'joystick_position_control = motor_position_control.joystick_position_control:main',
+            'joystick_position_container = '
+            'motor_position_control.joystick_position_container:main',
+            'pygame_joy = motor_position_control.pygame_joy:main',
+            'arm_driver = motor_position_control.arm_driver:main',
         ],
     },
 )